@@ -0,0 +1,194 @@
+import mmap
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from network.messages import MAX_PAYLOAD, SECTOR_NUMBER_SIZE, DiskMessage
+
+
+class DiskBackend:
+    """
+    Magazyn jednego dysku macierzy adresowany bajtowo (przesunięcie w obrazie dysku).
+    Strategie RAID odwołują się do dysków wyłącznie przez ten interfejs, więc dyski
+    mogą być zarówno obrazami w pamięci procesu, jak i zdalnymi procesami.
+    """
+
+    # Zdalne magazyny mają duże opóźnienie pojedynczej operacji - kontroler wysyła
+    # wtedy części żądania do wszystkich dysków równolegle
+    remote = False
+
+    def read(self, offset: int, length: int) -> memoryview:
+        """
+        Odczytuje `length` bajtów od przesunięcia `offset`.
+        """
+        raise NotImplementedError
+
+    def write(self, offset: int, data) -> None:
+        """
+        Zapisuje dane od przesunięcia `offset`.
+
+        Raises:
+            IOError: Gdy zapis się nie powiódł
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """
+        Utrwala zapisane dane (jeśli magazyn tego wymaga).
+        """
+
+    def close(self):
+        """
+        Zwalnia zasoby magazynu.
+        """
+
+
+class MemoryBackend(DiskBackend):
+    """
+    Dysk jako bytearray w pamięci procesu lub obraz zmapowany z pliku (mmap).
+    Odczyt zwraca widok na obraz bez kopiowania danych.
+    """
+
+    def __init__(self, image: Union[bytearray, mmap.mmap]):
+        self.image = image
+        self._view = memoryview(image)
+
+    def read(self, offset: int, length: int) -> memoryview:
+        return self._view[offset:offset + length]
+
+    def write(self, offset: int, data) -> None:
+        self.image[offset:offset + len(data)] = data
+
+    def flush(self):
+        if isinstance(self.image, mmap.mmap):
+            self.image.flush()
+
+    def close(self):
+        self._view.release()
+        if isinstance(self.image, mmap.mmap):
+            self.image.close()
+
+
+class NetworkBackend(DiskBackend):
+    """
+    Dysk obsługiwany przez zdalny proces (NetworkedDisk) połączony z NetworkProtocol.
+
+    Zakres bajtów zamieniany jest na operacje wsadowe obejmujące wiele sektorów w jednej
+    ramce; przy bardzo długich zakresach wszystkie ramki wysyłane są od razu (potokowo),
+    a dopiero potem zbierane są odpowiedzi. Rozmiar sektora zdalnego dysku musi być
+    równy rozmiarowi sektora kontrolera.
+    """
+
+    remote = True
+
+    def __init__(self, protocol, disk_id: int, sector_size: int, timeout: float = 5.0, max_batch: int = 1024):
+        """
+        Args:
+            protocol: Uruchomiony NetworkProtocol, z którym połączony jest dysk
+            disk_id: Identyfikator dysku podany przez dysk w wiadomości 'hello'
+            sector_size: Rozmiar sektora w bajtach
+            timeout: Maksymalny czas oczekiwania na odpowiedź dysku (sekundy)
+            max_batch: Maksymalna liczba sektorów w jednej ramce (dodatkowo ograniczana tak,
+                aby ładunek ramki - dane i tablica numerów sektorów - mieścił się w MAX_PAYLOAD)
+        """
+        self.protocol = protocol
+        self.disk_id = disk_id
+        self.sector_size = sector_size
+        self.timeout = timeout
+        self.max_batch = min(max_batch, max(1, MAX_PAYLOAD // (sector_size + SECTOR_NUMBER_SIZE)))
+
+    def _batches(self, first: int, last: int) -> List[range]:
+        return [range(start, min(start + self.max_batch, last)) for start in range(first, last, self.max_batch)]
+
+    def _request(self, operation: str, sectors: range, data: Optional[bytes] = None) -> Tuple[int, Future]:
+        message = DiskMessage(operation, self.disk_id, data=data, sectors=list(sectors))
+        future = self.protocol.send_message(self.disk_id, message, timeout=self.timeout)
+        return message.request_id, future
+
+    def _responses(self, requests: List[Tuple[int, Future]]) -> Iterator[DiskMessage]:
+        """
+        Zwraca kolejne odpowiedzi na żądania, czekając łącznie najwyżej `timeout` sekund.
+        Gdy czekanie zostanie przerwane (limit czasu lub błąd), pozostałe żądania są
+        anulowane, aby nie zajmowały okna dysku.
+
+        Raises:
+            TimeoutError: Gdy dysk nie odpowiedział w wyznaczonym czasie
+        """
+        deadline = time.monotonic() + self.timeout
+        done = 0
+        try:
+            for request_id, future in requests:
+                try:
+                    response = future.result(max(0.0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    raise TimeoutError(f"Disk {self.disk_id} did not respond within {self.timeout}s") from None
+                done += 1
+                yield response
+        finally:
+            for request_id, _ in requests[done:]:
+                self.protocol.cancel(request_id)
+
+    def read(self, offset: int, length: int) -> memoryview:
+        size = self.sector_size
+        first, last = offset // size, -(-(offset + length) // size)
+        batches = self._batches(first, last)
+        requests = [self._request('read_batch', batch) for batch in batches]
+        buffer = bytearray((last - first) * size)
+        for batch, response in zip(batches, self._responses(requests)):
+            data = response.data
+            if not isinstance(data, bytes) or len(data) != len(batch) * size:
+                raise IOError(f"Disk {self.disk_id} returned a malformed response for sectors "
+                              f"{batch.start}-{batch.stop - 1}")
+            start = (batch.start - first) * size
+            buffer[start:start + len(batch) * size] = data
+        start = offset - first * size
+        return memoryview(buffer)[start:start + length]
+
+    def write(self, offset: int, data) -> None:
+        size = self.sector_size
+        end = offset + len(data)
+        first, last = offset // size, -(-end // size)
+        if offset % size or end % size:
+            # Dysk dopełnia krótszy zapis zerami, więc częściowo nadpisywane sektory
+            # trzeba najpierw odczytać i zapisać w całości
+            buffer = bytearray(self.read(first * size, (last - first) * size))
+            buffer[offset - first * size:end - first * size] = data
+            data = buffer
+        data = bytes(data)
+        batches = self._batches(first, last)
+        requests = [self._request('write_batch', batch,
+                                  data[(batch.start - first) * size:(batch.stop - first) * size])
+                    for batch in batches]
+        for batch, response in zip(batches, self._responses(requests)):
+            if response.data is not True:
+                raise IOError(f"Disk {self.disk_id} rejected write to sectors {batch.start}-{batch.stop - 1}")
+
+
+def network_backends(protocol, disk_ids: Iterable[int], sector_size: int, timeout: float = 5.0,
+                     connect_timeout: float = 10.0) -> List[NetworkBackend]:
+    """
+    Czeka, aż podane dyski połączą się z serwerem, i tworzy dla nich magazyny sieciowe.
+
+    Args:
+        protocol: Uruchomiony NetworkProtocol
+        disk_ids: Identyfikatory dysków w kolejności dysków macierzy
+        sector_size: Rozmiar sektora w bajtach
+        timeout: Maksymalny czas oczekiwania na odpowiedź dysku (sekundy)
+        connect_timeout: Maksymalny czas oczekiwania na połączenie dysków (sekundy)
+
+    Returns:
+        List[NetworkBackend]: Magazyny kolejnych dysków
+
+    Raises:
+        TimeoutError: Gdy któryś z dysków nie połączył się w wyznaczonym czasie
+    """
+    disk_ids = list(disk_ids)
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        missing = sorted(set(disk_ids) - set(protocol.connected_disks()))
+        if not missing:
+            break
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Disks {missing} did not connect")
+        time.sleep(0.05)
+    return [NetworkBackend(protocol, disk_id, sector_size, timeout) for disk_id in disk_ids]
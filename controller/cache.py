@@ -0,0 +1,365 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from controller.parity import as_bytes_array
+from stats.disk_stats import DiskStats
+
+
+class _CacheLine:
+    """
+    Linia pamięci podręcznej - jeden sektor logiczny (pełny pasek) wraz z maską
+    bajtów, które zostały zapisane przez użytkownika.
+    """
+    __slots__ = ('data', 'valid', 'dirty', 'version', 'dirty_since')
+
+    def __init__(self, size: int):
+        self.data = np.zeros(size, dtype=np.uint8)
+        self.valid = np.zeros(size, dtype=bool)
+        self.dirty = False
+        self.version = 0
+        self.dirty_since = 0.0
+
+
+class WriteBackCache:
+    """
+    Pamięć podręczna zapisu (write-back) przed strategiami RAID.
+
+    Zapisy trafiają najpierw do linii odpowiadających sektorom logicznym, dzięki czemu
+    kolejne małe zapisy do tego samego paska są łączone i parzystość liczona jest raz
+    na pasek przy opróżnianiu. Pamięć jest ograniczona do `max_lines` linii; czyste
+    linie usuwane są według LRU, a brudne opróżniane po przekroczeniu progu liczby
+    (`max_dirty_lines`) lub wieku (`max_age`), albo na żądanie przez flush().
+
+    Gdy opróżnianie zawodzi (np. po awarii dysku), pamięć nie rośnie ponad limit: zapis
+    do sektora bez linii przy pełnej pamięci wykonywany jest synchronicznie (write-through)
+    i zwraca wynik zapisu na dyski, a kolejna próba opróżnienia następuje dopiero po
+    `retry_interval` sekundach, a nie przy każdym zapisie.
+    """
+
+    def __init__(self, controller, max_lines: int = 1024, max_dirty_lines: Optional[int] = None,
+                 max_age: Optional[float] = None, retry_interval: float = 1.0):
+        """
+        Args:
+            controller: Kontroler RAID, do którego opróżniane są brudne linie
+            max_lines: Maksymalna liczba linii w pamięci podręcznej
+            max_dirty_lines: Liczba brudnych linii wyzwalająca opróżnienie (domyślnie połowa max_lines)
+            max_age: Maksymalny wiek brudnej linii w sekundach (None - bez limitu wieku)
+            retry_interval: Odstęp w sekundach przed ponownym opróżnieniem po nieudanej próbie
+        """
+        self.controller = controller
+        self.line_size = controller.logical_sector_size
+        self.max_lines = max_lines
+        self.max_dirty_lines = max_dirty_lines or max(1, max_lines // 2)
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+
+        self._lines: 'OrderedDict[int, _CacheLine]' = OrderedDict()
+        self._dirty_count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Chwila (time.monotonic()), przed którą zapisy nie wyzwalają opróżniania - ustawiana po nieudanym opróżnieniu
+        self._retry_at = 0.0
+
+        # Liczniki: zapisy przyjęte do pamięci oraz zapisy pasków wykonane przy opróżnianiu
+        self.cached_writes = 0
+        self.stripe_writes = 0
+        self.evictions = 0
+        self.write_throughs = 0
+
+        self._stop_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if max_age:
+            self._flusher = threading.Thread(target=self._flush_aged, name="write-cache-flusher", daemon=True)
+            self._flusher.start()
+
+    def write(self, sector_number: int, offset: int, data) -> bool:
+        """
+        Zapisuje dane do linii sektora. Opróżnia pamięć, jeśli przekroczono progi.
+        Gdy w pełnej pamięci nie da się zwolnić miejsca na nową linię, dane zapisywane
+        są od razu na dyski.
+
+        Returns:
+            bool: True - zapis został przyjęty (lub zapisany na dyski), False - zapis
+                synchroniczny się nie powiódł
+        """
+        needs_flush = self._insert(sector_number, offset, data)
+        if needs_flush is None and self._flush_due():
+            # Brak miejsca na nową linię - opróżniamy pamięć i próbujemy ponownie
+            self.flush()
+            needs_flush = self._insert(sector_number, offset, data)
+        if needs_flush is None:
+            # Pamięć pełna brudnych linii, których nie udało się zapisać: zamiast potwierdzać
+            # zapis, który mógłby przepaść, wykonujemy go synchronicznie
+            return self._write_through(sector_number, offset, data)
+        if needs_flush and self._flush_due():
+            self.flush()
+        return True
+
+    def _insert(self, sector_number: int, offset: int, data) -> Optional[bool]:
+        """
+        Wpisuje dane do linii sektora (tworząc ją, jeśli jest miejsce).
+
+        Returns:
+            Optional[bool]: None, gdy brak miejsca na nową linię; w przeciwnym razie
+                informacja, czy przekroczono próg brudnych linii
+        """
+        with self._lock:
+            line = self._lines.get(sector_number)
+            if line is None:
+                self._evict_clean(self.max_lines - 1)
+                if len(self._lines) >= self.max_lines:
+                    return None
+                line = self._lines[sector_number] = _CacheLine(self.line_size)
+            else:
+                self._lines.move_to_end(sector_number)
+
+            end = offset + len(data)
+            line.data[offset:end] = as_bytes_array(data)
+            line.valid[offset:end] = True
+            line.version += 1
+            if not line.dirty:
+                line.dirty = True
+                line.dirty_since = time.monotonic()
+                self._dirty_count += 1
+            self.cached_writes += 1
+            return self._dirty_count >= self.max_dirty_lines
+
+    def _flush_due(self) -> bool:
+        """
+        Czy zapis może wyzwolić opróżnianie (po nieudanej próbie dopiero po retry_interval).
+        """
+        return time.monotonic() >= self._retry_at
+
+    def _write_through(self, sector_number: int, offset: int, data) -> bool:
+        """
+        Zapisuje dane od razu na dyski z pominięciem pamięci podręcznej.
+        """
+        end = offset + len(data)
+        line = _CacheLine(self.line_size)
+        line.data[offset:end] = as_bytes_array(data)
+        line.valid[offset:end] = True
+        with self._lock:
+            self.write_throughs += 1
+        return self.controller._write_back([(sector_number, line.data, line.valid, line.version)])
+
+    def lookup(self, sector_number: int, out: memoryview) -> bool:
+        """
+        Kopiuje sektor do `out`, jeśli pamięć zawiera go w całości.
+
+        Returns:
+            bool: True przy trafieniu (cały sektor w pamięci)
+        """
+        with self._lock:
+            line = self._lines.get(sector_number)
+            if line is None or not line.valid.all():
+                return False
+            self._lines.move_to_end(sector_number)
+            out[:self.line_size] = memoryview(line.data)
+            return True
+
+    def overlay(self, sector_number: int, out: memoryview):
+        """
+        Nakłada na odczytany z dysków sektor bajty zapisane w pamięci podręcznej.
+        """
+        with self._lock:
+            line = self._lines.get(sector_number)
+            if line is not None:
+                target = as_bytes_array(out)
+                target[line.valid] = line.data[line.valid]
+
+    def cached_sectors(self, sectors: range) -> List[int]:
+        """
+        Zwraca sektory z podanego zakresu, które mają linię w pamięci podręcznej.
+        """
+        with self._lock:
+            if len(self._lines) < len(sectors):
+                return sorted(sector for sector in self._lines if sector in sectors)
+            return [sector for sector in sectors if sector in self._lines]
+
+    def __contains__(self, sector_number: int) -> bool:
+        return sector_number in self._lines
+
+    def flush(self, older_than: Optional[float] = None) -> bool:
+        """
+        Opróżnia brudne linie do macierzy (pełnymi paskami, gdy to możliwe).
+
+        Args:
+            older_than: Jeśli podany, opróżnia tylko linie brudne dłużej niż tyle sekund
+
+        Returns:
+            bool: True jeśli wszystkie opróżniane linie zostały zapisane
+        """
+        with self._flush_lock:
+            with self._lock:
+                now = time.monotonic()
+                batch = [
+                    (sector, line.data.copy(), line.valid.copy(), line.version)
+                    for sector, line in self._lines.items()
+                    if line.dirty and (older_than is None or now - line.dirty_since >= older_than)
+                ]
+            if not batch:
+                return True
+
+            success = self.controller._write_back(batch)
+            self.stripe_writes += len(batch)
+
+            with self._lock:
+                self._retry_at = 0.0 if success else time.monotonic() + self.retry_interval
+                self._evict_clean()
+            return success
+
+    def mark_clean(self, sector_number: int, version: int):
+        """
+        Oznacza linię jako czystą, o ile nie została zmieniona od chwili pobrania do zapisu.
+        Wywoływane przez kontroler po zapisie linii na dyski.
+        """
+        with self._lock:
+            line = self._lines.get(sector_number)
+            if line is not None and line.dirty and line.version == version:
+                line.dirty = False
+                self._dirty_count -= 1
+
+    def stats(self) -> dict:
+        """
+        Zwraca statystyki pamięci podręcznej.
+        """
+        with self._lock:
+            return {
+                'lines': len(self._lines),
+                'dirty_lines': self._dirty_count,
+                'cached_writes': self.cached_writes,
+                'stripe_writes': self.stripe_writes,
+                'evictions': self.evictions,
+                'write_throughs': self.write_throughs,
+            }
+
+    def close(self):
+        """
+        Zatrzymuje wątek opróżniający i opróżnia wszystkie brudne linie.
+        """
+        self._stop_event.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _evict_clean(self, limit: Optional[int] = None):
+        """
+        Usuwa najdawniej używane czyste linie, aż liczba linii zmieści się w limicie
+        (domyślnie max_lines). Wywoływane z zajętą blokadą.
+        """
+        excess = len(self._lines) - (self.max_lines if limit is None else limit)
+        if excess <= 0:
+            return
+        victims: List[int] = []
+        for sector, line in self._lines.items():
+            if len(victims) >= excess:
+                break
+            if not line.dirty:
+                victims.append(sector)
+        for sector in victims:
+            del self._lines[sector]
+        self.evictions += len(victims)
+
+    def _flush_aged(self):
+        """
+        Pętla wątku w tle opróżniającego linie starsze niż max_age.
+        """
+        while not self._stop_event.wait(self.max_age / 2):
+            try:
+                self.flush(older_than=self.max_age)
+            except Exception as e:
+                logging.error(f"Write cache background flush failed: {e}")
+
+
+class ReadCache:
+    """
+    Pamięć podręczna odczytu (LRU) przechowująca złożone sektory logiczne.
+
+    Trafienie zwraca sektor bez blokowania pasków i składania go z fragmentów dysków.
+    Każdy zapis unieważnia wpis sektora; wypełnienia rozpoczęte przed unieważnieniem
+    są odrzucane (`ticket`), aby nie zapamiętać nieaktualnych danych. Trafienia, chybienia
+    i usunięcia wpisów zliczane są w podanym obiekcie DiskStats.
+    """
+
+    def __init__(self, max_lines: int, stats: DiskStats):
+        """
+        Args:
+            max_lines: Maksymalna liczba sektorów w pamięci podręcznej
+            stats: Statystyki, do których trafiają liczniki pamięci podręcznej
+        """
+        self.max_lines = max_lines
+        self.stats = stats
+        self._lines: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, sector_number: int, out: memoryview) -> bool:
+        """
+        Kopiuje sektor do `out`, jeśli jest w pamięci podręcznej.
+
+        Returns:
+            bool: True przy trafieniu
+        """
+        with self._lock:
+            data = self._lines.get(sector_number)
+            self.stats.add_cache_access(data is not None)
+            if data is None:
+                return False
+            self._lines.move_to_end(sector_number)
+        out[:len(data)] = data
+        return True
+
+    def get(self, sector_number: int) -> Optional[bytes]:
+        """
+        Zwraca sektor z pamięci podręcznej lub None przy chybieniu.
+        """
+        with self._lock:
+            data = self._lines.get(sector_number)
+            self.stats.add_cache_access(data is not None)
+            if data is not None:
+                self._lines.move_to_end(sector_number)
+            return data
+
+    def ticket(self) -> int:
+        """
+        Zwraca znacznik pobierany przed odczytem z dysków i przekazywany do insert().
+        """
+        return self._generation
+
+    def insert(self, sector_number: int, data, ticket: int):
+        """
+        Zapamiętuje odczytany sektor, o ile od pobrania znacznika nic nie zostało unieważnione.
+        """
+        with self._lock:
+            if ticket != self._generation:
+                return
+            self._lines[sector_number] = bytes(data)
+            self._lines.move_to_end(sector_number)
+            evicted = 0
+            while len(self._lines) > self.max_lines:
+                self._lines.popitem(last=False)
+                evicted += 1
+            if evicted:
+                self.stats.add_cache_eviction(evicted)
+
+    def invalidate(self, sector_numbers: Iterable[int]):
+        """
+        Usuwa wpisy zapisywanych sektorów.
+        """
+        with self._lock:
+            self._generation += 1
+            for sector_number in sector_numbers:
+                self._lines.pop(sector_number, None)
+
+    def clear(self):
+        """
+        Usuwa wszystkie wpisy.
+        """
+        with self._lock:
+            self._generation += 1
+            self._lines.clear()
@@ -0,0 +1,237 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import List, Optional, Union
+
+import numpy as np
+
+from controller.storage import open_disk_image
+
+
+class ChecksumError(IOError):
+    """
+    Zawartość fragmentu sektora nie zgadza się z zapisaną sumą kontrolną (cicha korupcja danych).
+    """
+
+
+def fragment_checksum(data) -> int:
+    """
+    Suma kontrolna CRC-32 pojedynczego fragmentu (zgodna z crc32_rows).
+    """
+    return zlib.crc32(data)
+
+
+def crc32_rows(rows: np.ndarray) -> np.ndarray:
+    """
+    Oblicza CRC-32 każdego wiersza tablicy (np. kolejnych sektorów odczytanych jednym
+    ruchem). Każdy wiersz liczony jest przez zlib.crc32 bez kopiowania danych.
+
+    Args:
+        rows: Tablica uint8 o kształcie (liczba_sektorów, rozmiar_sektora)
+
+    Returns:
+        np.ndarray: Sumy kontrolne (uint32), po jednej na wiersz
+    """
+    rows = np.ascontiguousarray(rows)
+    return np.fromiter((zlib.crc32(row) for row in rows), dtype=np.uint32, count=rows.shape[0])
+
+
+class ChecksumTable:
+    """
+    Sumy kontrolne fragmentów wszystkich dysków (dysk x sektor) wraz z bitmapą
+    sektorów zapisanych przez kontroler.
+
+    Fragment, który nie był jeszcze zapisany, powinien zawierać same zera (obrazy są
+    rzadkimi plikami lub świeżymi buforami), więc jego oczekiwaną sumą jest suma pustego
+    sektora - przy starcie nie trzeba czytać ani liczyć danych dysków. Przy podanym
+    katalogu tablica każdego dysku jest plikiem disk<N>.crc mapowanym przez mmap obok
+    obrazu dysku: sumy przetrwają restart, a zmiany danych dokonane, gdy macierz była
+    wyłączona, są wykrywane jako korupcja.
+
+    Dysk, którego zawartość nie jest znana (zdalny dysk lub obraz sprzed utworzenia
+    tablicy), działa w trybie uczenia: suma niezapisanego fragmentu jest zapamiętywana
+    przy pierwszym odczycie, a sprawdzana przy kolejnych.
+    """
+
+    MAGIC = b'RCRC'
+    # Nagłówek pliku: znacznik, flagi, liczba sektorów, rozmiar sektora
+    HEADER = struct.Struct('<4sIII')
+    LEARN = 1
+
+    def __init__(self, num_disks: int, num_sectors: int, sector_size: int, storage_dir: Optional[str] = None,
+                 learn: Optional[List[bool]] = None):
+        """
+        Args:
+            num_disks: Liczba dysków
+            num_sectors: Liczba sektorów na dysk
+            sector_size: Rozmiar sektora (fragmentu) w bajtach
+            storage_dir: Katalog na pliki disk<N>.crc; None - tablica tylko w pamięci procesu
+            learn: Dla każdego dysku: czy jego niezapisane sektory mogą zawierać dane; ma znaczenie
+                tylko przy tworzeniu tablicy dysku (w istniejącym pliku tryb jest już zapisany)
+        """
+        self.num_sectors = num_sectors
+        self.sector_size = sector_size
+        self.empty_checksum = fragment_checksum(bytes(sector_size))
+        learn = learn or [False] * num_disks
+        self._buffers: List[Union[bytearray, mmap.mmap]] = []
+        self._sums: List[np.ndarray] = []
+        self._bitmaps: List[np.ndarray] = []
+        # Te same tablice jako memoryview - szybszy dostęp do pojedynczych elementów
+        # niż przez NumPy, który używany jest tylko do operacji na całych zakresach
+        self._sum_views: List[memoryview] = []
+        self._bitmap_views: List[memoryview] = []
+        self._flags: List[int] = []
+        self._used: List[int] = []
+        self._lock = threading.Lock()
+        bitmap_offset = self.HEADER.size + 4 * num_sectors
+        size = bitmap_offset + (num_sectors + 7) // 8
+        for disk_id in range(num_disks):
+            if storage_dir is not None:
+                buffer = open_disk_image(os.path.join(storage_dir, f"disk{disk_id}.crc"), size)
+            else:
+                buffer = bytearray(size)
+            flags = self.LEARN if learn[disk_id] else 0
+            magic, stored_flags, sectors, stored_size = self.HEADER.unpack_from(buffer)
+            if magic == self.MAGIC and (sectors, stored_size) == (num_sectors, sector_size):
+                flags = stored_flags
+            else:
+                if magic == self.MAGIC:
+                    logging.warning(f"Checksum table of disk {disk_id} has a different geometry, "
+                                    f"checksums will be learned from the disk")
+                    flags = self.LEARN
+                buffer[:size] = bytes(size)
+                self.HEADER.pack_into(buffer, 0, self.MAGIC, flags, num_sectors, sector_size)
+            self._buffers.append(buffer)
+            self._flags.append(flags)
+            self._sums.append(np.frombuffer(buffer, dtype=np.uint32, count=num_sectors, offset=self.HEADER.size))
+            self._bitmaps.append(np.frombuffer(buffer, dtype=np.uint8, count=(num_sectors + 7) // 8,
+                                               offset=bitmap_offset))
+            view = memoryview(buffer)
+            self._sum_views.append(view[self.HEADER.size:bitmap_offset].cast('I'))
+            self._bitmap_views.append(view[bitmap_offset:size])
+            self._used.append(int(np.unpackbits(self._bitmaps[-1]).sum()))
+
+    def _is_written(self, disk_id: int, sector_number: int) -> bool:
+        return bool(self._bitmap_views[disk_id][sector_number >> 3] & (1 << (sector_number & 7)))
+
+    def _written_mask(self, disk_id: int, start: int, stop: int) -> np.ndarray:
+        bits = np.unpackbits(self._bitmaps[disk_id][start >> 3:(stop + 7) >> 3], bitorder='little')
+        return bits[start & 7:(start & 7) + stop - start].astype(bool)
+
+    def update(self, disk_id: int, sector_number: int, checksum: int):
+        """
+        Zapisuje sumę kontrolną fragmentu po jego zapisie.
+        """
+        self._sum_views[disk_id][sector_number] = checksum
+        if not self._is_written(disk_id, sector_number):
+            self._mark_written(disk_id, sector_number)
+
+    def update_stripe(self, sector_number: int, disk_ids: List[int], checksums: List[int]):
+        """
+        Zapisuje sumy kontrolne fragmentów jednego sektora zapisanych na kilku dyskach
+        (np. całego paska z parzystością).
+        """
+        byte, bit = sector_number >> 3, 1 << (sector_number & 7)
+        for disk_id, checksum in zip(disk_ids, checksums):
+            self._sum_views[disk_id][sector_number] = checksum
+            if not self._bitmap_views[disk_id][byte] & bit:
+                self._mark_written(disk_id, sector_number)
+
+    def update_rows(self, disk_id: int, start: int, checksums: np.ndarray):
+        """
+        Zapisuje sumy kontrolne kolejnych fragmentów od sektora `start` (np. po zapisie
+        ciągłego zakresu sektorów).
+        """
+        stop = start + len(checksums)
+        self._sums[disk_id][start:stop] = checksums
+        with self._lock:
+            bitmap = self._bitmaps[disk_id][start >> 3:(stop + 7) >> 3]
+            bits = np.unpackbits(bitmap, bitorder='little')
+            written = bits[start & 7:(start & 7) + stop - start]
+            self._used[disk_id] += int(written.size - np.count_nonzero(written))
+            written[:] = 1
+            bitmap[:] = np.packbits(bits, bitorder='little')
+
+    def _mark_written(self, disk_id: int, sector_number: int):
+        # Kilka sektorów dzieli bajt bitmapy, a blokady pasków chronią tylko własne sektory
+        byte, bit = sector_number >> 3, 1 << (sector_number & 7)
+        with self._lock:
+            bitmap = self._bitmap_views[disk_id]
+            if not bitmap[byte] & bit:
+                bitmap[byte] |= bit
+                self._used[disk_id] += 1
+
+    def verify(self, disk_id: int, sector_number: int, checksum: int) -> bool:
+        """
+        Sprawdza sumę kontrolną odczytanego fragmentu.
+
+        Returns:
+            bool: True jeśli fragment jest poprawny (lub jego suma została właśnie poznana)
+        """
+        if self._is_written(disk_id, sector_number):
+            return checksum == self._sum_views[disk_id][sector_number]
+        if checksum == self.empty_checksum:
+            return True
+        if self._flags[disk_id] & self.LEARN:
+            self.update(disk_id, sector_number, checksum)
+            return True
+        return False
+
+    def verify_rows(self, disk_id: int, start: int, checksums: np.ndarray) -> np.ndarray:
+        """
+        Sprawdza sumy kontrolne kolejnych fragmentów od sektora `start` jednym przebiegiem.
+
+        Returns:
+            np.ndarray: Indeksy (względem `start`) fragmentów niezgodnych z sumą kontrolną
+        """
+        stop = start + len(checksums)
+        written = self._written_mask(disk_id, start, stop)
+        expected = np.where(written, self._sums[disk_id][start:stop], np.uint32(self.empty_checksum))
+        mismatched = checksums != expected
+        if self._flags[disk_id] & self.LEARN:
+            # Puste fragmenty nie są zapamiętywane - nie różnią się od niezapisanych
+            for k in np.flatnonzero(~written & mismatched):
+                self.update(disk_id, start + int(k), int(checksums[k]))
+            mismatched &= written
+        return np.flatnonzero(mismatched)
+
+    def written_sectors(self, disk_id: int) -> int:
+        """
+        Liczba zajętych sektorów dysku: zapisanych przez kontroler (oraz, w trybie uczenia,
+        niepustych sektorów poznanych przy odczycie).
+        """
+        return self._used[disk_id]
+
+    def reset(self, disk_id: int):
+        """
+        Opisuje dysk jako pusty (np. po wymianie i wyzerowaniu).
+        """
+        with self._lock:
+            self._bitmaps[disk_id][:] = 0
+            self._used[disk_id] = 0
+            self._flags[disk_id] = 0
+            self.HEADER.pack_into(self._buffers[disk_id], 0, self.MAGIC, 0, self.num_sectors, self.sector_size)
+
+    def flush(self):
+        """
+        Utrwala tablice zapisane w plikach.
+        """
+        for buffer in self._buffers:
+            if isinstance(buffer, mmap.mmap):
+                buffer.flush()
+
+    def close(self):
+        """
+        Utrwala i zamyka pliki tablic.
+        """
+        self.flush()
+        buffers = self._buffers
+        for view in self._sum_views + self._bitmap_views:
+            view.release()
+        self._buffers, self._sums, self._bitmaps, self._sum_views, self._bitmap_views = [], [], [], [], []
+        for buffer in buffers:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
@@ -0,0 +1,211 @@
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
+from controller.backend import DiskBackend
+from stats.disk_stats import DiskStats
+
+# Co która operacja (lub etap) ma mierzone i rejestrowane opóźnienie
+SAMPLE_EVERY = 16
+
+
+class OperationRecorder:
+    """
+    Lekki rejestrator operacji przed DiskStats.
+
+    Liczniki operacji i bajtów zbierane są lokalnie i przekazywane do statystyk partiami
+    (co `sample_every` operacji oraz przy zmianie sekundy). Partia obejmuje operacje
+    z jednej sekundy i trafia do statystyk z czasem tej sekundy, więc szybkości w oknach
+    czasowych pozostają dokładne. Opóźnienie rejestrowane jest tylko dla co
+    `sample_every`-tej operacji, z wagą całej partii, więc histogramy i średnie są
+    wyznaczane z próbki, a koszt pojedynczej operacji ogranicza się do kilku dodawań.
+
+    Operacje mogą być rejestrowane równolegle z wielu wątków; partie przekazywane są
+    do statystyk pod blokadą rejestratora, w kolejności ich zebrania.
+    """
+
+    def __init__(self, stats: DiskStats, sample_every: int = SAMPLE_EVERY):
+        """
+        Args:
+            stats: Statystyki, do których trafiają operacje
+            sample_every: Co która operacja ma rejestrowane opóźnienie
+        """
+        self.stats = stats
+        self.sample_every = sample_every
+        self._pending: Dict[str, List[int]] = {}
+        self._count = 0
+        self._second = 0
+        self._lock = threading.Lock()
+
+    def add(self, op_type: str, size: int, latency: float):
+        """
+        Rejestruje operację.
+
+        Args:
+            op_type: Typ operacji ('read' lub 'write')
+            size: Rozmiar danych w bajtach
+            latency: Opóźnienie operacji w sekundach
+        """
+        now = time.time()
+        with self._lock:
+            if int(now) != self._second:
+                # Operacje z poprzedniej sekundy trafiają do statystyk z jej czasem
+                self._flush_pending()
+                self._second = int(now)
+            pending = self._pending.get(op_type)
+            if pending is None:
+                pending = self._pending[op_type] = [0, 0]
+            pending[0] += 1
+            pending[1] += size
+            self._count += 1
+            if self._count % self.sample_every == 0:
+                self._flush_pending(now)
+                self.stats.add_latency(op_type, latency, self.sample_every, now)
+
+    def _flush_pending(self, now: Optional[float] = None):
+        """
+        Przekazuje zebraną partię do statystyk (wywoływane pod blokadą rejestratora).
+        """
+        for op_type, (count, size) in self._pending.items():
+            self.stats.add_operations(op_type, count, size, self._second if now is None else now)
+        self._pending = {}
+
+    def flush(self):
+        """
+        Przekazuje do statystyk operacje zebrane od ostatniej partii.
+        """
+        with self._lock:
+            self._flush_pending()
+
+    def clear(self):
+        """
+        Porzuca operacje zebrane od ostatniej partii (np. przy zerowaniu statystyk).
+        """
+        with self._lock:
+            self._pending = {}
+
+
+class InstrumentedBackend(DiskBackend):
+    """
+    Magazyn dysku rejestrujący operacje (rozmiar i czas) w statystykach dysku
+    przez OperationRecorder.
+
+    Kontroler owija nim magazyny tylko przy włączonej instrumentacji, więc przy
+    wyłączonej operacje dyskowe nie ponoszą żadnego dodatkowego kosztu.
+    """
+
+    def __init__(self, backend: DiskBackend, stats: DiskStats, sample_every: int = SAMPLE_EVERY):
+        """
+        Args:
+            backend: Owijany magazyn dysku
+            stats: Statystyki dysku, do których trafiają operacje
+            sample_every: Co która operacja ma rejestrowane opóźnienie
+        """
+        self.backend = backend
+        self.stats = stats
+        self.recorder = OperationRecorder(stats, sample_every)
+        self.remote = backend.remote
+
+    def read(self, offset: int, length: int) -> memoryview:
+        start = time.perf_counter()
+        try:
+            data = self.backend.read(offset, length)
+        except Exception:
+            self.stats.add_error('io_error', time.time())
+            raise
+        self.recorder.add('read', length, time.perf_counter() - start)
+        return data
+
+    def write(self, offset: int, data) -> None:
+        start = time.perf_counter()
+        try:
+            self.backend.write(offset, data)
+        except Exception:
+            self.stats.add_error('io_error', time.time())
+            raise
+        self.recorder.add('write', memoryview(data).nbytes, time.perf_counter() - start)
+
+    def flush(self):
+        self.backend.flush()
+
+    def close(self):
+        self.recorder.flush()
+        self.backend.close()
+
+
+class StageSampler:
+    """
+    Wybiera, które wystąpienia etapu (np. oczekiwania na blokadę) są mierzone:
+    co `sample_every`-te wystąpienie każdego etapu, liczone osobno dla każdej nazwy.
+    """
+
+    def __init__(self, sample_every: int = SAMPLE_EVERY):
+        self.sample_every = sample_every
+        self._counters: Dict[str, itertools.count] = {}
+
+    def due(self, name: str) -> bool:
+        """
+        Czy bieżące wystąpienie etapu `name` ma zostać zmierzone.
+        """
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters.setdefault(name, itertools.count(1))
+        return next(counter) % self.sample_every == 0
+
+
+class TimedSection:
+    """
+    Blok `with` mierzący swój czas trwania i rejestrujący go jako etap w statystykach.
+    """
+
+    __slots__ = ('stats', 'name', 'count', '_start')
+
+    def __init__(self, stats: DiskStats, name: str, count: int = 1):
+        """
+        Args:
+            stats: Statystyki, do których trafia czas etapu
+            name: Nazwa etapu (np. 'parity')
+            count: Liczba wystąpień etapu, które reprezentuje pomiar
+        """
+        self.stats = stats
+        self.name = name
+        self.count = count
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_timing(self.name, time.perf_counter() - self._start, self.count)
+
+
+class TimedAcquire:
+    """
+    Owija blokadę (menedżer kontekstu) i rejestruje czas oczekiwania na jej zajęcie.
+    Czas trzymania blokady nie jest mierzony.
+    """
+
+    __slots__ = ('lock', 'stats', 'name', 'count')
+
+    def __init__(self, lock, stats: DiskStats, name: str = 'lock_wait', count: int = 1):
+        """
+        Args:
+            lock: Menedżer kontekstu zajmujący blokadę
+            stats: Statystyki, do których trafia czas oczekiwania
+            name: Nazwa etapu
+            count: Liczba wystąpień etapu, które reprezentuje pomiar
+        """
+        self.lock = lock
+        self.stats = stats
+        self.name = name
+        self.count = count
+
+    def __enter__(self):
+        start = time.perf_counter()
+        result = self.lock.__enter__()
+        self.stats.add_timing(self.name, time.perf_counter() - start, self.count)
+        return result
+
+    def __exit__(self, *exc_info):
+        return self.lock.__exit__(*exc_info)
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterable, List, Optional
+
+
+class StripeLockTable:
+    """
+    Tablica blokad zakresów sektorów (paskowanie blokad).
+
+    Każdy sektor logiczny odpowiada jednemu paskowi rozłożonemu na wszystkie dyski,
+    więc blokowany jest pasek, a nie dysk. Sektory są mapowane na stałą liczbę
+    blokad (sektor % num_locks), dzięki czemu operacje na niezwiązanych sektorach
+    nie czekają na siebie, a pamięć tablicy jest ograniczona.
+    """
+
+    def __init__(self, num_locks: int = 64):
+        """
+        Args:
+            num_locks: Liczba blokad w tablicy
+        """
+        self.num_locks = num_locks
+        self._locks: List[Lock] = [Lock() for _ in range(num_locks)]
+
+    def _lock_indices(self, sectors: Optional[Iterable[int]]) -> List[int]:
+        """
+        Zwraca posortowane indeksy blokad dla sektorów - stała kolejność zajmowania
+        blokad chroni przed zakleszczeniem między operacjami wielosektorowymi.
+        """
+        if sectors is None or (isinstance(sectors, range) and len(sectors) >= self.num_locks):
+            return list(range(self.num_locks))
+        return sorted({sector % self.num_locks for sector in sectors})
+
+    @contextmanager
+    def locked(self, sectors: Optional[Iterable[int]] = None):
+        """
+        Blokuje paski podanych sektorów na czas bloku `with`.
+
+        Args:
+            sectors: Numery sektorów; None blokuje całą macierz
+        """
+        indices = self._lock_indices(sectors)
+        for index in indices:
+            self._locks[index].acquire()
+        try:
+            yield
+        finally:
+            for index in reversed(indices):
+                self._locks[index].release()
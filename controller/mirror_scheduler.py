@@ -0,0 +1,102 @@
+import itertools
+from contextlib import contextmanager, nullcontext
+from threading import Lock
+from typing import List
+
+# Pusty blok `with` dla polityk, które nie korzystają z liczników trwających odczytów
+_UNTRACKED = nullcontext()
+
+
+class MirrorReadScheduler:
+    """
+    Planista odczytów dla RAID1 - rozkłada odczyty na lustra zamiast czytać zawsze z pierwszego dysku.
+
+    Dostępne polityki:
+      - 'first': zawsze pierwsze dostępne lustro (dotychczasowe zachowanie),
+      - 'round_robin': kolejne odczyty trafiają na kolejne lustra,
+      - 'least_outstanding': lustro z najmniejszą liczbą trwających odczytów
+        (remisy rozstrzygane po kolei). Działa tylko wtedy, gdy odczyty nakładają się
+        w czasie, czyli w trybie współbieżności 'stripe' kontrolera. W trybie 'disk'
+        odczyty wykonywane są po kolei pod blokadą macierzy, więc w chwili wyboru
+        żadne lustro nie ma trwających odczytów i polityka zachowuje się jak 'round_robin',
+      - 'affinity': zakres sektorów przypisany na stałe do jednego lustra, dzięki czemu
+        ten sam obszar czytany jest zawsze z tego samego dysku.
+    """
+
+    POLICIES = ('first', 'round_robin', 'least_outstanding', 'affinity')
+
+    def __init__(self, num_disks: int, policy: str = 'round_robin', affinity_span: int = 64):
+        """
+        Args:
+            num_disks: Liczba luster
+            policy: Polityka wyboru lustra
+            affinity_span: Liczba kolejnych sektorów przypisanych do jednego lustra w polityce 'affinity'
+        """
+        self.num_disks = num_disks
+        self.policy = policy
+        self.affinity_span = affinity_span
+        self._outstanding: List[int] = [0] * num_disks
+        self._lock = Lock()
+        self._counter = itertools.count()
+
+    @property
+    def policy(self) -> str:
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy: str):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unsupported mirror read policy: {policy}")
+        self._policy = policy
+
+    def queue_depths(self) -> List[int]:
+        """
+        Zwraca bieżącą liczbę trwających odczytów na każdym lustrze
+        (zliczanych tylko w polityce 'least_outstanding').
+        """
+        return list(self._outstanding)
+
+    def order(self, sector_number: int, candidates: List[int]) -> List[int]:
+        """
+        Zwraca kolejność prób odczytu: najpierw lustro wybrane przez politykę,
+        potem pozostałe jako zapasowe.
+
+        Args:
+            sector_number: Numer odczytywanego sektora
+            candidates: Dostępne (sprawne) lustra
+
+        Returns:
+            List[int]: Lustra w kolejności prób
+        """
+        if len(candidates) < 2 or self._policy == 'first':
+            return candidates
+
+        if self._policy == 'round_robin':
+            start = next(self._counter) % len(candidates)
+        elif self._policy == 'affinity':
+            start = (sector_number // self.affinity_span) % len(candidates)
+        else:
+            offset = next(self._counter)
+            start = min(range(len(candidates)),
+                        key=lambda k: (self._outstanding[candidates[k]], (k - offset) % len(candidates)))
+        return candidates[start:] + candidates[:start]
+
+    def track(self, disk_id: int):
+        """
+        Zwraca blok `with`, na czas którego odczyt liczony jest jako trwający na danym
+        lustrze. Liczniki potrzebne są tylko polityce 'least_outstanding' - dla pozostałych
+        zwracany jest pusty blok, więc odczyt nie płaci za dwie blokady.
+        """
+        if self._policy != 'least_outstanding':
+            return _UNTRACKED
+        return self._tracked(disk_id)
+
+    @contextmanager
+    def _tracked(self, disk_id: int):
+        with self._lock:
+            self._outstanding[disk_id] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._outstanding[disk_id] -= 1
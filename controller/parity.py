@@ -0,0 +1,169 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def as_bytes_array(buffer) -> np.ndarray:
+    """
+    Zwraca widok NumPy (uint8) na bufor bez kopiowania danych.
+
+    Args:
+        buffer: Dowolny obiekt wspierający protokół bufora (bytes, bytearray, memoryview)
+
+    Returns:
+        np.ndarray: Jednowymiarowy widok bajtów
+    """
+    return np.frombuffer(buffer, dtype=np.uint8)
+
+
+def _wide_view(stripes: np.ndarray) -> np.ndarray:
+    """
+    Jeśli to możliwe, traktuje paski jako słowa 64-bitowe, dzięki czemu XOR
+    wykonuje ośmiokrotnie mniej operacji niż na pojedynczych bajtach.
+    """
+    if stripes.shape[-1] % 8 == 0 and stripes.flags.c_contiguous:
+        return stripes.view(np.uint64)
+    return stripes
+
+
+def xor_stripes(stripes: np.ndarray) -> np.ndarray:
+    """
+    Oblicza XOR wszystkich wierszy tablicy pasków jednym wywołaniem.
+
+    Args:
+        stripes: Tablica o kształcie (liczba_pasków, rozmiar_paska) lub
+            (liczba_pasków, liczba_sektorów, rozmiar_paska)
+
+    Returns:
+        np.ndarray: Parzystość jako tablica uint8 o kształcie stripes bez pierwszego wymiaru
+    """
+    if stripes.shape[0] == 0:
+        return np.zeros(stripes.shape[-1], dtype=np.uint8)
+    return np.bitwise_xor.reduce(_wide_view(stripes), axis=0).view(np.uint8)
+
+
+def _build_gf_tables():
+    """
+    Buduje tablice arytmetyki w ciele GF(2^8) z wielomianem 0x11d (jak w RAID6 w Linuksie):
+    potęgi generatora g=2, logarytmy oraz pełną tablicę mnożenia 256x256 używaną
+    do wektorowego mnożenia całych pasków przez stałą.
+    """
+    exp = np.zeros(510, dtype=np.uint8)
+    log = np.zeros(256, dtype=np.int32)
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x11d
+    exp[255:510] = exp[:255]
+
+    mul = np.zeros((256, 256), dtype=np.uint8)
+    nonzero_log = log[1:]
+    mul[1:, 1:] = exp[nonzero_log[:, np.newaxis] + nonzero_log[np.newaxis, :]]
+    return exp, log, mul
+
+
+GF_EXP, GF_LOG, GF_MUL = _build_gf_tables()
+
+
+def gf_inverse(value: int) -> int:
+    """
+    Zwraca odwrotność niezerowego elementu ciała GF(2^8).
+    """
+    return int(GF_EXP[255 - GF_LOG[value]])
+
+
+def gf_scale(coefficient: int, data: np.ndarray) -> np.ndarray:
+    """
+    Mnoży cały pasek przez stałą w GF(2^8) jednym przeszukaniem tablicy.
+    """
+    return GF_MUL[coefficient][data]
+
+
+def compute_pq(stripes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Oblicza parzystość P (XOR) i Q (kod Reeda-Solomona: suma g^j * D_j w GF(2^8))
+    dla wszystkich pasków danych jednocześnie.
+
+    Args:
+        stripes: Tablica o kształcie (liczba_dysków_danych, rozmiar_paska) lub, dla wielu
+            sektorów naraz, (liczba_dysków_danych, liczba_sektorów, rozmiar_paska)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Parzystość P i Q (kształt bez pierwszego wymiaru)
+    """
+    coefficients = GF_EXP[:stripes.shape[0]].reshape((-1,) + (1,) * (stripes.ndim - 1))
+    return xor_stripes(stripes), xor_stripes(GF_MUL[coefficients, stripes])
+
+
+def parity_delta(deltas: np.ndarray, indices: List[int], with_q: bool) -> Tuple[np.ndarray, ...]:
+    """
+    Oblicza zmianę parzystości dla zapisu typu read-modify-write: nowa parzystość
+    to stara parzystość XOR zmiana, gdzie zmiana zależy tylko od modyfikowanych pasków.
+
+    Args:
+        deltas: Tablica (liczba_zmienionych_pasków, rozmiar_paska) z XOR starych i nowych danych
+        indices: Indeksy zmienionych pasków w obrębie paska danych
+        with_q: Czy liczyć również zmianę parzystości Q (RAID6)
+
+    Returns:
+        Tuple[np.ndarray, ...]: Zmiana P oraz, dla with_q, zmiana Q
+    """
+    if not with_q:
+        return (xor_stripes(deltas),)
+    coefficients = GF_EXP[np.asarray(indices)]
+    return xor_stripes(deltas), xor_stripes(GF_MUL[coefficients[:, np.newaxis], deltas])
+
+
+def _syndromes(stripes: np.ndarray, missing: List[int], p, q) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Usuwa z P i Q wkład pasków, które są dostępne; zostaje wkład tylko brakujących.
+    """
+    present = np.ones(stripes.shape[0], dtype=bool)
+    present[missing] = False
+    survivors = stripes[present]
+    p_rest = q_rest = None
+    if p is not None:
+        p_rest = xor_stripes(survivors) ^ as_bytes_array(p)
+    if q is not None:
+        coefficients = GF_EXP[np.flatnonzero(present)]
+        q_rest = xor_stripes(GF_MUL[coefficients[:, np.newaxis], survivors]) ^ as_bytes_array(q)
+    return p_rest, q_rest
+
+
+def recover_stripes(stripes: np.ndarray, missing: List[int], p=None, q=None):
+    """
+    Odtwarza brakujące paski danych w miejscu, korzystając z dostępnych parzystości.
+
+    Obsługiwane przypadki: jeden brakujący pasek z P (XOR) lub z samego Q,
+    oraz dwa brakujące paski z P i Q.
+
+    Args:
+        stripes: Tablica (liczba_dysków_danych, rozmiar_paska); brakujące wiersze są nadpisywane
+        missing: Indeksy brakujących pasków
+        p: Parzystość P lub None, jeśli niedostępna
+        q: Parzystość Q lub None, jeśli niedostępna
+
+    Raises:
+        ValueError: Gdy dostępnych parzystości jest za mało do odtworzenia danych
+    """
+    if not missing:
+        return
+    p_rest, q_rest = _syndromes(stripes, missing, p, q)
+
+    if len(missing) == 1 and p_rest is not None:
+        stripes[missing[0]] = p_rest
+    elif len(missing) == 1 and q_rest is not None:
+        stripes[missing[0]] = gf_scale(gf_inverse(int(GF_EXP[missing[0]])), q_rest)
+    elif len(missing) == 2 and p_rest is not None and q_rest is not None:
+        x, y = sorted(missing)
+        # D_x = (g^-x * Qxy ^ g^(y-x) * Pxy) / (g^(y-x) ^ 1), D_y = Pxy ^ D_x
+        a = int(GF_EXP[y - x])
+        denominator = gf_inverse(a ^ 1)
+        numerator = gf_scale(gf_inverse(int(GF_EXP[x])), q_rest) ^ gf_scale(a, p_rest)
+        stripes[x] = gf_scale(denominator, numerator)
+        stripes[y] = p_rest ^ stripes[x]
+    else:
+        raise ValueError(f"Cannot recover {len(missing)} missing stripes with available parity")
@@ -1,69 +1,293 @@
 import logging
-from typing import List, Optional, Dict
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Iterable, List, Optional, Dict, Set, Tuple, TypeVar, Union
 import threading
-from threading import Semaphore, Lock
+import time
+from threading import Lock
 import numpy as np
 
+from controller.backend import DiskBackend, MemoryBackend
+from controller.cache import ReadCache, WriteBackCache
+from controller.checksum import ChecksumError, ChecksumTable, crc32_rows, fragment_checksum
+from controller.instrumentation import (SAMPLE_EVERY, InstrumentedBackend, OperationRecorder, StageSampler,
+                                        TimedAcquire, TimedSection)
+from controller.locking import StripeLockTable
+from controller.mirror_scheduler import MirrorReadScheduler
+from controller.parity import as_bytes_array, compute_pq, parity_delta, recover_stripes, xor_stripes
+from controller.rebuild import RebuildEngine
+from controller.scrub import Scrubber
+from controller.storage import open_disk_image
+from stats.disk_stats import DiskStats
+
+T = TypeVar('T')
+
+# Stany dysków zwracane przez get_disk_state
+DISK_ONLINE = 'online'
+DISK_FAILED = 'failed'
+DISK_REBUILDING = 'rebuilding'
+
+# Liczba dysków parzystości w każdym pasku oraz minimalna liczba dysków dla poziomów z parzystością
+PARITY_DISKS: Dict[str, int] = {'RAID3': 1, 'RAID5': 1, 'RAID6': 2}
+MIN_DISKS: Dict[str, int] = {'RAID3': 2, 'RAID5': 3, 'RAID6': 4}
+
+# Pusty blok `with` używany zamiast pomiaru czasu przy wyłączonej instrumentacji
+_UNTIMED = nullcontext()
+
+# Najmniejszy sektor, przy którym w trybie 'stripe' części żądania na lokalnych dyskach
+# wysyłane są do puli wątków - przy mniejszych koszt przekazania zadania do wątku
+# przewyższa czas kopiowania fragmentu
+PARALLEL_IO_MIN_SECTOR = 64 * 1024
+
 
 class RAIDController:
     """
-    Kontroler macierzy RAID obsługujący różne poziomy RAID (0, 1, 3).
+    Kontroler macierzy RAID obsługujący różne poziomy RAID (0, 1, 3, 5, 6).
     Zarządza dyskami i operacjami I/O, implementując różne strategie zapisywania danych.
     """
 
-    def __init__(self, raid_type: str, num_disks: int = 4, sector_size: int = 32, num_sectors: int = 128):
+    def __init__(self, raid_type: str, num_disks: int = 4, sector_size: int = 32, num_sectors: int = 128,
+                 storage_dir: Optional[str] = None, concurrency: str = 'disk', io_workers: Optional[int] = None,
+                 mirror_read_policy: str = 'round_robin', write_cache_lines: int = 0,
+                 write_cache_max_dirty: Optional[int] = None, write_cache_max_age: Optional[float] = None,
+                 read_cache_sectors: int = 0, backends: Optional[List[DiskBackend]] = None,
+                 instrumentation: bool = False):
         """
         Inicjalizacja kontrolera RAID.
 
         Args:
-            raid_type: Typ RAID ('RAID0', 'RAID1', 'RAID3')
+            raid_type: Typ RAID ('RAID0', 'RAID1', 'RAID3', 'RAID5', 'RAID6')
             num_disks: Liczba dysków w macierzy
             sector_size: Rozmiar sektora w bajtach
             num_sectors: Liczba sektorów na każdy dysk
+            storage_dir: Katalog na obrazy dysków; jeśli podany, każdy dysk jest rzadkim plikiem
+                mapowanym przez mmap zamiast bytearray w pamięci procesu
+            concurrency: Tryb współbieżności: 'disk' (jedna blokada macierzy, operacje wykonywane
+                po kolei) lub 'stripe' (blokady zakresów sektorów, operacje na różnych paskach
+                wykonywane współbieżnie; części żądania na zdalnych dyskach lub przy sektorach
+                od PARALLEL_IO_MIN_SECTOR bajtów wykonywane równolegle w puli wątków)
+            io_workers: Liczba wątków puli I/O (domyślnie liczba dysków)
+            mirror_read_policy: Polityka rozkładania odczytów RAID1 na lustra
+                ('first', 'round_robin', 'least_outstanding', 'affinity'); 'least_outstanding'
+                różni się od 'round_robin' tylko w trybie 'stripe', w którym odczyty się nakładają
+            write_cache_lines: Pojemność pamięci podręcznej zapisu (write-back) w sektorach
+                logicznych; 0 wyłącza pamięć podręczną i zapisy trafiają od razu na dyski
+            write_cache_max_dirty: Liczba brudnych sektorów wyzwalająca opróżnienie pamięci
+                (domyślnie połowa pojemności)
+            write_cache_max_age: Maksymalny czas w sekundach, przez jaki zapis może czekać
+                w pamięci podręcznej (None - bez limitu)
+            read_cache_sectors: Pojemność pamięci podręcznej odczytu (LRU) w sektorach logicznych;
+                0 wyłącza pamięć podręczną odczytu
+            backends: Magazyny dysków (np. NetworkBackend dla zdalnych NetworkedDisk); jeśli podane,
+                liczba dysków wynika z ich liczby, a storage_dir jest ignorowany
+            instrumentation: Czy rejestrować operacje dysków i macierzy, czasy oczekiwania na
+                blokady i liczenia parzystości oraz odtworzenia danych w statystykach
+                (domyślnie wyłączone; można przełączać w trakcie pracy przez set_instrumentation)
         """
         self.raid_type = raid_type
+        self.instrumented = False
         self.sector_size = sector_size
         self.num_sectors = num_sectors
-        self.num_disks = num_disks
+        self.num_disks = len(backends) if backends is not None else num_disks
+        # Rozmieszczenie pasków powtarza się co num_disks sektorów, więc liczone jest raz
+        self._layouts = [self._compute_layout(residue) for residue in range(self.num_disks)]
 
         # Zamiast multiprocessing.Array używamy po prostu listy bajtów lub bytearray.
-        # Każdy "dysk" jest reprezentowany przez tablicę znaków (bajtów).
-        self.shared_memory: List[bytearray] = [
-            bytearray(sector_size * num_sectors) for _ in range(num_disks)
-        ]
+        # Każdy "dysk" jest reprezentowany przez tablicę znaków (bajtów) albo, przy
+        # podanym storage_dir, przez zmapowany plik o takim samym interfejsie wycinków.
+        # Strategie RAID odwołują się do dysków przez magazyny (DiskBackend); lokalne obrazy
+        # zwracają przy odczycie widoki bez kopiowania, a zdalne dyski obsługiwane są przez sieć.
+        # Przy podanych z zewnątrz magazynach lista shared_memory pozostaje pusta.
+        self.storage_dir = storage_dir if backends is None else None
+        self.shared_memory: List[Union[bytearray, mmap.mmap]] = []
+        # Dyski, których zawartość nie jest znana kontrolerowi (zdalne lub obrazy sprzed utworzenia
+        # tablicy sum kontrolnych) - ich sumy kontrolne są poznawane przy pierwszym odczycie
+        unknown_contents = [backends is not None] * self.num_disks
+        if backends is not None:
+            self.backends: List[DiskBackend] = list(backends)
+        else:
+            if storage_dir is not None:
+                os.makedirs(storage_dir, exist_ok=True)
+                unknown_contents = [os.path.exists(os.path.join(storage_dir, f"disk{i}.img")) for i in range(num_disks)]
+                self.shared_memory = [
+                    open_disk_image(os.path.join(storage_dir, f"disk{i}.img"), sector_size * num_sectors)
+                    for i in range(num_disks)
+                ]
+            else:
+                self.shared_memory = [bytearray(sector_size * num_sectors) for _ in range(num_disks)]
+            self.backends = [MemoryBackend(image) for image in self.shared_memory]
+
+        # Sumy kontrolne CRC-32 każdego fragmentu (dysk x sektor), przy storage_dir zapisane
+        # w plikach obok obrazów; przy starcie nie są czytane żadne dane dysków. Fragmenty,
+        # których zawartość nie zgadza się z sumą, trafiają na listę uszkodzonych i są
+        # pomijane przy odczycie aż do ponownego zapisu (naprawy)
+        self._checksums = ChecksumTable(self.num_disks, num_sectors, sector_size, storage_dir=self.storage_dir,
+                                        learn=unknown_contents)
+        self._bad_fragments: Set[Tuple[int, int]] = set()
+
+        # W trybie 'disk' każda operacja zajmuje całą macierz jedną blokadą. Blokada
+        # zajmowana jest przez metody publiczne (raz na operację), strategie zakładają,
+        # że jest już zajęta.
+        self._array_lock = Lock()
 
-        # Każdy dysk ma własną semaforę do ochrony zapisu.
-        self.semaphores: List[Semaphore] = [Semaphore(value=1) for _ in range(num_disks)]
+        # W trybie 'stripe' blokadę macierzy zastępuje tablica blokad pasków. Części żądania
+        # przypadające na poszczególne dyski trafiają do wspólnej puli wątków przy zdalnych
+        # dyskach (w obu trybach, aby żądania do dysków były wysyłane równolegle) oraz
+        # w trybie 'stripe' przy dużych sektorach.
+        if concurrency not in ('disk', 'stripe'):
+            raise ValueError(f"Unsupported concurrency mode: {concurrency}")
+        self.concurrency = concurrency
+        self._stripe_locks: Optional[StripeLockTable] = None
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        if concurrency == 'stripe':
+            self._stripe_locks = StripeLockTable()
+        if any(backend.remote for backend in self.backends) or \
+                (concurrency == 'stripe' and sector_size >= PARALLEL_IO_MIN_SECTOR):
+            self._io_pool = ThreadPoolExecutor(max_workers=io_workers or self.num_disks,
+                                               thread_name_prefix="raid-io")
 
         # Słownik mapujący typy RAID na odpowiednie metody
         self.write_strategies: Dict[str, callable] = {
             'RAID0': self._write_raid0,
             'RAID1': self._write_raid1,
-            'RAID3': self._write_raid3
+            'RAID3': self._write_raid3,
+            'RAID5': self._write_raid5,
+            'RAID6': self._write_raid6
         }
 
         self.read_strategies: Dict[str, callable] = {
             'RAID0': self._read_raid0,
             'RAID1': self._read_raid1,
-            'RAID3': self._read_raid3
+            'RAID3': self._read_raid3,
+            'RAID5': self._read_raid5,
+            'RAID6': self._read_raid6
         }
 
-        logging.info(f"Initialized {raid_type} controller with {num_disks} disks")
+        # Planista odczytów RAID1 rozkładający odczyty na lustra
+        self.mirror_scheduler = MirrorReadScheduler(self.num_disks, mirror_read_policy)
+
+        # Stan dysków: uszkodzone dyski oraz statystyki każdego dysku
+        self._failed_disks: Set[int] = set()
+        self.disk_stats: List[DiskStats] = [DiskStats() for _ in range(self.num_disks)]
+
+        # Trwające lub przerwane odbudowy dysków (numer dysku -> silnik odbudowy)
+        self._rebuilds: Dict[int, RebuildEngine] = {}
+        self._restore_rebuilds()
+        self._scrubber: Optional[Scrubber] = None
+
+        # Pamięć podręczna zapisu łącząca małe zapisy w pełne paski (opcjonalna)
+        self.write_cache: Optional[WriteBackCache] = None
+        if write_cache_lines:
+            self.write_cache = WriteBackCache(self, write_cache_lines, max_dirty_lines=write_cache_max_dirty,
+                                              max_age=write_cache_max_age)
+
+        # Pamięć podręczna odczytu często czytanych sektorów; jej liczniki trafiają do
+        # statystyk całej macierzy (array_stats), a nie pojedynczych dysków
+        self.array_stats = DiskStats()
+        self.read_cache: Optional[ReadCache] = None
+        if read_cache_sectors:
+            self.read_cache = ReadCache(read_cache_sectors, self.array_stats)
+
+        # Operacje macierzy i etapy rejestrowane są z próbkowaniem (patrz OperationRecorder)
+        self._array_recorder = OperationRecorder(self.array_stats)
+        self._stages = StageSampler()
+        self.set_instrumentation(instrumentation)
+        logging.info(f"Initialized {raid_type} controller with {self.num_disks} disks")
+
+    @property
+    def logical_sector_size(self) -> int:
+        """
+        Rozmiar logicznego sektora macierzy, czyli liczba bajtów danych użytkownika
+        przypadająca na jeden numer sektora.
+        """
+        if self.raid_type == 'RAID0':
+            return self.sector_size * self.num_disks
+        if self.raid_type in PARITY_DISKS:
+            return self.sector_size * (self.num_disks - PARITY_DISKS[self.raid_type])
+        return self.sector_size
+
+    def _get_strategy(self, strategies: Dict[str, callable]) -> callable:
+        """
+        Zwraca strategię dla bieżącego typu RAID lub zgłasza błąd dla nieobsługiwanego typu.
+        """
+        strategy = strategies.get(self.raid_type)
+        if strategy is None:
+            raise ValueError(f"Unsupported RAID type: {self.raid_type}")
+        return strategy
+
+    def _locked(self, sectors: Optional[Iterable[int]] = None):
+        """
+        Zwraca blokadę właściwą dla trybu współbieżności: w trybie 'stripe' tylko paski
+        podanych sektorów, w trybie 'disk' blokadę całej macierzy (na czas całej
+        operacji - również wielosektorowej).
+
+        Args:
+            sectors: Numery sektorów objętych operacją; None oznacza całą macierz
+        """
+        if self._stripe_locks is not None:
+            lock = self._stripe_locks.locked(sectors)
+        else:
+            lock = self._array_lock
+        if self.instrumented and self._stages.due('lock_wait'):
+            return TimedAcquire(lock, self.array_stats, count=SAMPLE_EVERY)
+        return lock
 
     def write_data(self, data: bytes, sector_number: int) -> bool:
         """
         Zapisuje dane do macierzy RAID używając odpowiedniej strategii.
 
+        Args:
+            data: Dane do zapisania (najwyżej logical_sector_size bajtów)
+            sector_number: Numer sektora docelowego
+
+        Returns:
+            bool: True jeśli zapis się powiódł, False w przeciwnym razie
+
+        Raises:
+            ValueError: Gdy dane są dłuższe niż sektor logiczny
+        """
+        strategy = self._get_strategy(self.write_strategies)
+        self._check_write_size(data)
+        start = time.perf_counter()
+        if self.write_cache is not None:
+            return self._finish('write', len(data), start, self._cache_write(data, sector_number, 0))
+        with self._locked((sector_number,)):
+            self._invalidate_read_cache((sector_number,))
+            return self._finish('write', len(data), start, strategy(data, sector_number))
+
+    def write_partial(self, data: bytes, sector_number: int, offset: int = 0) -> bool:
+        """
+        Zapisuje fragment sektora logicznego, zaczynając od podanego przesunięcia.
+        Pozostałe dane sektora i jego parzystość pozostają spójne.
+
         Args:
             data: Dane do zapisania
             sector_number: Numer sektora docelowego
+            offset: Przesunięcie w bajtach wewnątrz sektora logicznego
 
         Returns:
             bool: True jeśli zapis się powiódł, False w przeciwnym razie
         """
-        if self.raid_type not in self.write_strategies:
-            raise ValueError(f"Unsupported RAID type: {self.raid_type}")
-        return self.write_strategies[self.raid_type](data, sector_number)
+        if offset < 0 or offset + len(data) > self.logical_sector_size:
+            raise ValueError(f"Partial write [{offset}, {offset + len(data)}) "
+                             f"exceeds sector size {self.logical_sector_size}")
+        self._get_strategy(self.write_strategies)
+        start = time.perf_counter()
+        if self.write_cache is not None:
+            return self._finish('write', len(data), start, self._cache_write(data, sector_number, offset))
+        with self._locked((sector_number,)):
+            self._invalidate_read_cache((sector_number,))
+            return self._finish('write', len(data), start, self._write_partial(data, sector_number, offset))
+
+    def _check_write_size(self, data):
+        """
+        Odrzuca dane dłuższe niż sektor logiczny - nadmiar trafiłby na dysku do
+        kolejnego sektora z pominięciem jego sumy kontrolnej i parzystości.
+        """
+        if len(data) > self.logical_sector_size:
+            raise ValueError(f"Write of {len(data)} bytes exceeds sector size {self.logical_sector_size}")
 
     def read_data(self, sector_number: int) -> Optional[bytes]:
         """
@@ -75,218 +299,1338 @@ class RAIDController:
         Returns:
             Optional[bytes]: Odczytane dane lub None w przypadku błędu
         """
-        if self.raid_type not in self.read_strategies:
-            raise ValueError(f"Unsupported RAID type: {self.raid_type}")
-        return self.read_strategies[self.raid_type](sector_number)
+        buffer = bytearray(self.logical_sector_size)
+        if not self.readinto(sector_number, buffer):
+            return None
+        return bytes(buffer)
+
+    def readinto(self, sector_number: int, buffer) -> int:
+        """
+        Odczytuje sektor bezpośrednio do bufora dostarczonego przez wywołującego,
+        bez alokowania pośrednich kopii.
+
+        Args:
+            sector_number: Numer sektora do odczytu
+            buffer: Zapisywalny bufor (bytearray, memoryview, mmap) o rozmiarze co najmniej logical_sector_size
+
+        Returns:
+            int: Liczba odczytanych bajtów lub 0 w przypadku błędu
+        """
+        strategy = self._get_strategy(self.read_strategies)
+        size = self.logical_sector_size
+        out = memoryview(buffer).cast('B')
+        if len(out) < size:
+            raise ValueError(f"Buffer too small: {len(out)} < {size}")
+        start = time.perf_counter()
+        if self.read_cache is not None and self.read_cache.lookup(sector_number, out):
+            return self._finish('read', size, start, size)
+        if self.write_cache is not None and self.write_cache.lookup(sector_number, out):
+            return self._finish('read', size, start, size)
+        ticket = self.read_cache.ticket() if self.read_cache is not None else None
+        with self._locked((sector_number,)):
+            if not strategy(sector_number, out[:size]):
+                return self._finish('read', size, start, 0)
+            if self.write_cache is not None:
+                self.write_cache.overlay(sector_number, out[:size])
+            if self.read_cache is not None:
+                self.read_cache.insert(sector_number, out[:size], ticket)
+            return self._finish('read', size, start, size)
+
+    def read_views(self, sector_number: int) -> List[memoryview]:
+        """
+        Zwraca sektor jako listę widoków (tylko do odczytu) na fragmenty obrazów dysków,
+        w kolejności logicznej - bez kopiowania danych.
+
+        Widoki pokazują bieżącą zawartość dysków, więc późniejszy zapis do tego samego
+        sektora będzie w nich widoczny. Dopóki widoki istnieją, obrazów dysków nie można
+        zamknąć.
+
+        Args:
+            sector_number: Numer sektora do odczytu
+
+        Returns:
+            List[memoryview]: Kolejne fragmenty danych sektora (pusta lista w przypadku błędu)
+        """
+        strategy = self._get_strategy(self.read_strategies)
+        start = time.perf_counter()
+        if self.read_cache is not None:
+            data = self.read_cache.get(sector_number)
+            if data is not None:
+                return self._finish('read', len(data), start, [memoryview(data)])
+        with self._locked((sector_number,)):
+            data_ids = self._stripe_layout(sector_number)[0]
+            # Aktualne dane sektora mogą być (choćby częściowo) tylko w pamięci podręcznej zapisu
+            cached = self.write_cache is not None and sector_number in self.write_cache
+            if not cached and not self._unreadable(data_ids, sector_number):
+                return self._finish('read', self.logical_sector_size, start,
+                                    [self._disk_fragment(disk_id, sector_number).toreadonly() for disk_id in data_ids])
+
+            # Sektor niedostępny bezpośrednio (np. w trakcie odbudowy) - odtwarzamy go do nowego bufora
+            buffer = bytearray(self.logical_sector_size)
+            if not strategy(sector_number, memoryview(buffer)):
+                return self._finish('read', len(buffer), start, [])
+            if cached:
+                self.write_cache.overlay(sector_number, memoryview(buffer))
+            return self._finish('read', len(buffer), start, [memoryview(buffer).toreadonly()])
 
     # -----------------------
-    # Metody zapisu
+    # Operacje wielosektorowe
     # -----------------------
 
-    def _write_raid0(self, data: bytes, sector_number: int) -> bool:
+    def write_range(self, data: bytes, start_sector: int) -> bool:
         """
-        Implementacja zapisu dla RAID0 (striping).
-        Dane są dzielone równo między wszystkie dyski.
+        Zapisuje ciągły obszar kolejnych sektorów logicznych w jednym przebiegu.
+        Strategia jest wybierana raz, a blokada zajmowana raz na całą operację.
+        Pełne sektory na macierzy bez awarii zapisywane są całym zakresem naraz
+        (patrz _write_stripes).
+
+        Args:
+            data: Dane do zapisania (kolejne sektory logiczne jeden za drugim)
+            start_sector: Numer pierwszego sektora docelowego
+
+        Returns:
+            bool: True jeśli zapis wszystkich sektorów się powiódł
+        """
+        strategy = self._get_strategy(self.write_strategies)
+        size = self.logical_sector_size
+        view = memoryview(data).cast('B')
+        count, tail = divmod(len(view), size)
+        if self.write_cache is not None or tail or count < 2:
+            return self.writev(
+                (start_sector + k, view[offset:offset + size])
+                for k, offset in enumerate(range(0, len(view), size))
+            )
+        start = time.perf_counter()
+        sectors = range(start_sector, start_sector + count)
+        with self._locked(sectors):
+            self._invalidate_read_cache(sectors)
+            if self._whole_stripes(start_sector, count):
+                success = self._write_stripes(start_sector, as_bytes_array(view).reshape(count, size))
+            else:
+                success = all([strategy(view[k * size:(k + 1) * size], sector_number)
+                               for k, sector_number in enumerate(sectors)])
+        return self._finish('write', len(view), start, success)
+
+    def read_range(self, start_sector: int, count: int) -> Optional[bytes]:
+        """
+        Odczytuje ciągły obszar kolejnych sektorów logicznych w jednym przebiegu.
+
+        Args:
+            start_sector: Numer pierwszego sektora
+            count: Liczba sektorów do odczytu
+
+        Returns:
+            Optional[bytes]: Połączone dane lub None, jeśli odczyt któregokolwiek sektora się nie powiódł
+        """
+        buffer = bytearray(count * self.logical_sector_size)
+        if not self.readinto_range(start_sector, count, buffer):
+            return None
+        return bytes(buffer)
+
+    def readinto_range(self, start_sector: int, count: int, buffer) -> int:
+        """
+        Odczytuje ciągły obszar sektorów do bufora wywołującego. Pętla odczytu nie
+        alokuje żadnych buforów - dane trafiają wprost do kolejnych wycinków `buffer`.
+        Odczyty sekwencyjne omijają pamięć podręczną odczytu, aby nie wypierały z niej
+        często czytanych sektorów.
+
+        Args:
+            start_sector: Numer pierwszego sektora
+            count: Liczba sektorów do odczytu
+            buffer: Zapisywalny bufor o rozmiarze co najmniej count * logical_sector_size
+
+        Returns:
+            int: Liczba odczytanych bajtów lub 0, jeśli odczyt któregokolwiek sektora się nie powiódł
         """
+        strategy = self._get_strategy(self.read_strategies)
+        size = self.logical_sector_size
+        out = memoryview(buffer).cast('B')
+        if len(out) < count * size:
+            raise ValueError(f"Buffer too small: {len(out)} < {count * size}")
+        start = time.perf_counter()
         success = True
-        stripe_size = len(data) // self.num_disks if self.num_disks > 0 else len(data)
+        with self._locked(range(start_sector, start_sector + count)):
+            if self.raid_type == 'RAID1' and count > 1:
+                success = self._read_raid1_range(start_sector, count, out)
+            elif count > 1 and self._whole_stripes(start_sector, count):
+                success = self._read_stripes(start_sector, count, out, strategy)
+            else:
+                for k in range(count):
+                    success &= strategy(start_sector + k, out[k * size:(k + 1) * size])
+            if success and self.write_cache is not None:
+                for sector_number in self.write_cache.cached_sectors(range(start_sector, start_sector + count)):
+                    k = sector_number - start_sector
+                    self.write_cache.overlay(sector_number, out[k * size:(k + 1) * size])
+        return self._finish('read', count * size, start, count * size if success else 0)
 
-        for i in range(self.num_disks):
-            start = i * stripe_size
-            end = start + stripe_size
-            stripe_data = data[start:end]
+    def writev(self, requests: Iterable[Tuple[int, bytes]]) -> bool:
+        """
+        Zapis typu scatter: lista par (numer_sektora, dane) obsługiwana w jednym przebiegu.
 
-            self.semaphores[i].acquire()
-            try:
-                start_idx = sector_number * self.sector_size
-                self.shared_memory[i][start_idx:start_idx + len(stripe_data)] = stripe_data
-            except Exception as e:
-                success = False
-                logging.error(f"RAID0 write failed on disk {i}: {e}")
-            finally:
-                self.semaphores[i].release()
+        Args:
+            requests: Pary (numer sektora, dane do zapisania)
+
+        Returns:
+            bool: True jeśli wszystkie zapisy się powiodły
+
+        Raises:
+            ValueError: Gdy dane któregoś zapisu są dłuższe niż sektor logiczny (nic nie jest zapisywane)
+        """
+        strategy = self._get_strategy(self.write_strategies)
+        requests = list(requests)
+        for _, data in requests:
+            self._check_write_size(data)
+        start = time.perf_counter()
+        size = sum(len(data) for _, data in requests) if self.instrumented else 0
+        if self.write_cache is not None:
+            return self._finish('write', size, start,
+                                all([self._cache_write(data, sector_number, 0) for sector_number, data in requests]))
+        success = True
+        with self._locked(sector_number for sector_number, _ in requests):
+            self._invalidate_read_cache(sector_number for sector_number, _ in requests)
+            for sector_number, data in requests:
+                success &= strategy(data, sector_number)
+        return self._finish('write', size, start, success)
+
+    def readv(self, sectors: Iterable[int]) -> List[Optional[bytes]]:
+        """
+        Odczyt typu gather: odczytuje wskazane sektory w jednym przebiegu.
 
+        Args:
+            sectors: Numery sektorów do odczytu
+
+        Returns:
+            List[Optional[bytes]]: Dane kolejnych sektorów (None dla sektorów, których nie udało się odczytać)
+        """
+        strategy = self._get_strategy(self.read_strategies)
+        size = self.logical_sector_size
+        buffer = bytearray(size)
+        out = memoryview(buffer)
+        sectors = list(sectors)
+        results = []
+        start = time.perf_counter()
+        with self._locked(sectors):
+            for sector_number in sectors:
+                if ((self.read_cache is not None and self.read_cache.lookup(sector_number, out)) or
+                        (self.write_cache is not None and self.write_cache.lookup(sector_number, out))):
+                    results.append(bytes(buffer))
+                    continue
+                ticket = self.read_cache.ticket() if self.read_cache is not None else None
+                if strategy(sector_number, out):
+                    if self.write_cache is not None:
+                        self.write_cache.overlay(sector_number, out)
+                    if self.read_cache is not None:
+                        self.read_cache.insert(sector_number, out, ticket)
+                    results.append(bytes(buffer))
+                else:
+                    results.append(None)
+        self._finish('read', size * len(sectors), start, None not in results)
+        return results
+
+    # -----------------------
+    # Pamięć podręczna zapisu
+    # -----------------------
+
+    def flush(self) -> bool:
+        """
+        Opróżnia pamięć podręczną zapisu: wszystkie zbuforowane zapisy trafiają na dyski,
+        pełne sektory logiczne jako zapisy całych pasków (parzystość liczona raz na pasek).
+        W odróżnieniu od sync() nie zrzuca obrazów dysków do plików.
+
+        Returns:
+            bool: True jeśli wszystkie zbuforowane zapisy zostały zapisane na dyski
+        """
+        if self.write_cache is None:
+            return True
+        return self.write_cache.flush()
+
+    def _cache_write(self, data: bytes, sector_number: int, offset: int) -> bool:
+        """
+        Przyjmuje zapis do pamięci podręcznej zapisu. Dane są adresowane bajtowo
+        w obrębie sektora logicznego, tak jak przy zapisie bezpośrednio na dyski
+        (długość sprawdzają metody publiczne).
+        """
+        if not 0 <= sector_number < self.num_sectors:
+            logging.error(f"Write failed: sector {sector_number} out of range")
+            return False
+        success = self.write_cache.write(sector_number, offset, memoryview(data).cast('B'))
+        self._invalidate_read_cache((sector_number,))
         return success
 
-    def _write_raid1(self, data: bytes, sector_number: int) -> bool:
+    def _invalidate_read_cache(self, sector_numbers: Iterable[int]):
         """
-        Implementacja zapisu dla RAID1 (mirroring).
-        Dane są powielane na wszystkich dyskach.
+        Unieważnia wpisy zapisywanych sektorów w pamięci podręcznej odczytu.
         """
-        success = True
+        if self.read_cache is not None:
+            self.read_cache.invalidate(sector_numbers)
 
-        for i in range(self.num_disks):
-            self.semaphores[i].acquire()
-            try:
-                start_idx = sector_number * self.sector_size
-                self.shared_memory[i][start_idx:start_idx + len(data)] = data
-            except Exception as e:
-                success = False
-                logging.error(f"RAID1 write failed on disk {i}: {e}")
-            finally:
-                self.semaphores[i].release()
+    def _write_back(self, lines: List[Tuple[int, np.ndarray, np.ndarray, int]]) -> bool:
+        """
+        Zapisuje na dyski linie opróżniane z pamięci podręcznej zapisu
+        (numer sektora, dane, maska zapisanych bajtów, wersja linii).
 
+        Linia zapisana w całości trafia na dyski jednym zapisem pełnego paska. Linia
+        z jednym ciągłym zapisanym obszarem idzie ścieżką zapisu częściowego (RMW/RCW),
+        a pozostałe są uzupełniane odczytem sektora i zapisywane jako pełny pasek.
+        """
+        write = self._get_strategy(self.write_strategies)
+        read = self._get_strategy(self.read_strategies)
+        success = True
+        with self._locked(sector_number for sector_number, *_ in lines):
+            for sector_number, data, valid, version in lines:
+                written = np.flatnonzero(valid)
+                first, end = int(written[0]), int(written[-1]) + 1
+                if len(written) == len(valid):
+                    ok = write(memoryview(data), sector_number)
+                elif end - first == len(written):
+                    ok = self._write_partial(memoryview(data)[first:end], sector_number, first)
+                else:
+                    buffer = bytearray(self.logical_sector_size)
+                    ok = read(sector_number, memoryview(buffer))
+                    if ok:
+                        as_bytes_array(buffer)[valid] = data[valid]
+                        ok = write(buffer, sector_number)
+                if ok:
+                    self.write_cache.mark_clean(sector_number, version)
+                else:
+                    logging.error(f"Write cache flush failed for sector {sector_number}")
+                success &= ok
         return success
 
+    def _stripe_layout(self, sector_number: int) -> Tuple[List[int], List[int]]:
+        """
+        Zwraca rozmieszczenie paska sektora: dyski z kolejnymi fragmentami danych
+        (w kolejności logicznej) oraz dyski parzystości (P, a dla RAID6 również Q).
+
+        RAID3 trzyma parzystość na ostatnim dysku. W RAID5 i RAID6 parzystość rotuje
+        co sektor (układ left-asymmetric), więc zapisy rozkładają się na wszystkie dyski.
+        Zwracane listy są współdzielone między wywołaniami i nie mogą być modyfikowane.
+        """
+        return self._layouts[sector_number % self.num_disks]
+
+    def _compute_layout(self, sector_number: int) -> Tuple[List[int], List[int]]:
+        """
+        Wylicza rozmieszczenie paska sektora (patrz _stripe_layout).
+        """
+        if self.raid_type == 'RAID1':
+            return [0], []
+        if self.raid_type not in PARITY_DISKS:
+            return list(range(self.num_disks)), []
+
+        if self.raid_type == 'RAID3':
+            parity_ids = [self.num_disks - 1]
+        else:
+            p_disk = self.num_disks - 1 - sector_number % self.num_disks
+            parity_ids = [p_disk, (p_disk + 1) % self.num_disks][:PARITY_DISKS[self.raid_type]]
+        data_ids = [i for i in range(self.num_disks) if i not in parity_ids]
+        return data_ids, parity_ids
+
+    def _stripe_disks(self, start_sector: int, count: int) -> np.ndarray:
+        """
+        Rozmieszczenie pasków sektorów [start_sector, start_sector + count) jako tablica
+        (count, num_disks): wiersz k to dyski kolejnych fragmentów danych sektora
+        start_sector + k, a po nich dyski parzystości (jak w _stripe_layout).
+        """
+        table = np.array([data_ids + parity_ids for data_ids, parity_ids in self._layouts], dtype=np.intp)
+        return table[np.arange(start_sector, start_sector + count) % self.num_disks]
+
+    def _whole_stripes(self, start_sector: int, count: int) -> bool:
+        """
+        Czy zakres sektorów można obsłużyć całymi paskami naraz: macierz nie ma awarii,
+        uszkodzonych fragmentów ani trwających odbudów, a zakres mieści się na dyskach.
+        """
+        if self._failed_disks or self._bad_fragments or self._rebuilding():
+            return False
+        return self.num_disks >= MIN_DISKS.get(self.raid_type, 1) and \
+            0 <= start_sector and start_sector + count <= self.num_sectors
+
+    # -----------------------
+    # Metody zapisu
+    # -----------------------
+
+    def _write_raid0(self, data: bytes, sector_number: int) -> bool:
+        """
+        Implementacja zapisu dla RAID0 (striping).
+        Dane są dzielone między wszystkie dyski po jednym fragmencie sektora.
+        Dane krótsze niż sektor logiczny są zapisywane jako zapis częściowy.
+        """
+        if len(data) < self.logical_sector_size:
+            return self._write_partial(data, sector_number, 0)
+        if self._failed_disks:
+            logging.error(f"RAID0 write failed: disks {self.failed_disks()} failed")
+            return False
+        stripe_size = self.sector_size
+        view = memoryview(data)
+        return self._write_fragments(sector_number, {i: view[i * stripe_size:(i + 1) * stripe_size]
+                                                     for i in range(self.num_disks)}, [])
+
+    def _write_raid1(self, data: bytes, sector_number: int) -> bool:
+        """
+        Implementacja zapisu dla RAID1 (mirroring).
+        Dane są powielane na wszystkich sprawnych dyskach.
+        Dane krótsze niż sektor są zapisywane jako zapis częściowy.
+        """
+        if len(data) < self.sector_size:
+            return self._write_partial(data, sector_number, 0)
+        if len(self._failed_disks) == self.num_disks:
+            logging.error("RAID1 write failed: no functional disks")
+            return False
+        return self._write_fragments(sector_number, dict.fromkeys(range(self.num_disks), data), [])
+
     def _write_raid3(self, data: bytes, sector_number: int) -> bool:
         """
         Implementacja zapisu dla RAID3 (striping z dedykowaną parzystością).
         Ostatni dysk w tablicy to dysk parzystości.
         """
-        success = True
-        if self.num_disks < 2:
-            logging.error("RAID3 requires at least 2 disks.")
+        return self._write_with_parity(data, sector_number)
+
+    def _write_raid5(self, data: bytes, sector_number: int) -> bool:
+        """
+        Implementacja zapisu dla RAID5 (striping z rotującą parzystością).
+        Dysk parzystości zmienia się co sektor, więc żaden dysk nie jest wąskim gardłem.
+        """
+        return self._write_with_parity(data, sector_number)
+
+    def _write_raid6(self, data: bytes, sector_number: int) -> bool:
+        """
+        Implementacja zapisu dla RAID6 (striping z podwójną parzystością P+Q).
+        Q to kod Reeda-Solomona w GF(2^8), co pozwala przetrwać awarię dwóch dysków.
+        """
+        return self._write_with_parity(data, sector_number)
+
+    def _write_with_parity(self, data: bytes, sector_number: int) -> bool:
+        """
+        Wspólny zapis pełnego paska dla poziomów z parzystością (RAID3/5/6).
+        Parzystość (P lub P+Q) liczona jest wektorowo dla wszystkich pasków naraz.
+        Dane krótsze niż sektor logiczny są zapisywane jako zapis częściowy.
+        """
+        if self.num_disks < MIN_DISKS[self.raid_type]:
+            logging.error(f"{self.raid_type} requires at least {MIN_DISKS[self.raid_type]} disks.")
             return False
+        if len(data) < self.logical_sector_size:
+            return self._write_partial(data, sector_number, 0)
+
+        data_ids, parity_ids = self._stripe_layout(sector_number)
+        if len(self._failed_disks) > len(parity_ids):
+            logging.error(f"{self.raid_type} write failed: disks {self.failed_disks()} failed")
+            return False
+        data_disks = len(data_ids)
+        stripe_size = self.sector_size
 
-        data_disks = self.num_disks - 1
-        stripe_size = len(data) // data_disks if data_disks > 0 else len(data)
+        view = memoryview(data).cast('B')[:data_disks * stripe_size]
+        stripes = as_bytes_array(view).reshape(data_disks, stripe_size)
+        with self._timed('parity'):
+            parities = compute_pq(stripes) if len(parity_ids) == 2 else (xor_stripes(stripes),)
+
+        # Fragmenty danych zapisywane są wprost z bufora wywołującego (bez wierszy NumPy)
+        payload = {disk: view[j * stripe_size:(j + 1) * stripe_size] for j, disk in enumerate(data_ids)}
+        payload.update(zip(parity_ids, parities))
+        return self._write_fragments(sector_number, payload, parity_ids)
+
+    def _write_partial(self, data: bytes, sector_number: int, offset: int) -> bool:
+        """
+        Zapis fragmentu sektora logicznego [offset, offset + len(data)).
+
+        Dla poziomów z parzystością wybierana jest tańsza z dwóch metod aktualizacji
+        parzystości, mierzona liczbą operacji dyskowych:
+          - read-modify-write: odczyt starych danych zmienianych pasków i starej parzystości,
+            nowa parzystość = stara parzystość ^ stare dane ^ nowe dane
+            (koszt: 2 * (zmienione paski + dyski parzystości)),
+          - reconstruct-write: odczyt niezmienianych (i częściowo nadpisywanych) pasków
+            i wyliczenie parzystości od nowa
+            (koszt: odczyty pozostałych pasków + zapis zmienionych pasków i parzystości).
+        """
+        stripe_size = self.sector_size
+        start_idx = sector_number * stripe_size
+        end = offset + len(data)
+        if end <= offset:
+            return True
 
-        # Bufor na parzystość
-        parity = bytearray(stripe_size)
+        if self.raid_type == 'RAID1':
+            mirrors = self._writable_disks(range(self.num_disks))
+            if not mirrors:
+                logging.error("RAID1 write failed: no functional disks")
+                return False
 
-        # Zapis + obliczanie parzystości
-        for i in range(data_disks):
-            start = i * stripe_size
-            end = start + stripe_size
-            stripe_data = data[start:end]
+            def write_disk(i: int) -> bool:
+                try:
+                    self.backends[i].write(start_idx + offset, data)
+                    self._update_checksum(i, sector_number)
+                    return True
+                except Exception as e:
+                    logging.error(f"RAID1 write failed on disk {i}: {e}")
+                    return False
 
-            # XOR do parzystości
-            for j in range(len(stripe_data)):
-                parity[j] ^= stripe_data[j]
+            return all(self._for_each_disk(write_disk, mirrors))
 
-            self.semaphores[i].acquire()
+        data_ids, parity_ids = self._stripe_layout(sector_number)
+
+        def rewrite_stripe() -> bool:
+            # Pasek niekompletny: odtwarzamy go odczytem z parzystością i zapisujemy w całości
+            buffer = bytearray(self.logical_sector_size)
+            if not self._read_with_parity(sector_number, memoryview(buffer)):
+                return False
+            buffer[offset:end] = data
+            return self._write_with_parity(buffer, sector_number)
+
+        if parity_ids and self._unreadable(data_ids + parity_ids, sector_number):
+            return rewrite_stripe()
+
+        first, last = offset // stripe_size, (end - 1) // stripe_size
+        touched = list(range(first, last + 1))
+        # Paski nadpisywane tylko częściowo wymagają odczytu starej zawartości w obu metodach
+        partial = [j for j in touched if j * stripe_size < offset or (j + 1) * stripe_size > end]
+
+        new = np.zeros((len(data_ids), stripe_size), dtype=np.uint8)
+        if not parity_ids:
+            # RAID0 nie ma redundancji - zapis na uszkodzony dysk byłby utracony
+            failed = [data_ids[j] for j in touched if data_ids[j] in self._failed_disks]
+            if failed:
+                logging.error(f"RAID0 write failed: disks {failed} failed")
+                return False
+            if not self._read_rows(sector_number, data_ids, partial, new):
+                return False
+            new.reshape(-1)[offset:end] = as_bytes_array(data)
+            return self._write_fragments(sector_number, {data_ids[j]: new[j] for j in touched}, [])
+
+        rmw_cost = 2 * (len(touched) + len(parity_ids))
+        rcw_cost = (len(data_ids) - len(touched) + len(partial)) + len(touched) + len(parity_ids)
+
+        if rmw_cost < rcw_cost:
+            # read-modify-write: parzystość aktualizowana o zmianę danych
+            self._record_event('rmw')
+            parity_rows = np.zeros((len(parity_ids), stripe_size), dtype=np.uint8)
+            if not (self._read_rows(sector_number, data_ids, touched, new) and
+                    self._read_rows(sector_number, parity_ids, range(len(parity_ids)), parity_rows)):
+                # Fragment okazał się nieczytelny (np. błąd sumy kontrolnej) - zapis przez odtworzenie paska
+                return rewrite_stripe()
+            old = new[touched].copy()
+            new.reshape(-1)[offset:end] = as_bytes_array(data)
+            with self._timed('parity'):
+                deltas = parity_delta(old ^ new[touched], touched, with_q=len(parity_ids) == 2)
+                parities = [parity_rows[k] ^ delta for k, delta in enumerate(deltas)]
+        else:
+            # reconstruct-write: parzystość liczona od nowa z pełnego paska
+            self._record_event('rcw')
+            untouched = [j for j in range(len(data_ids)) if j not in touched]
+            if not self._read_rows(sector_number, data_ids, untouched + partial, new):
+                return rewrite_stripe()
+            new.reshape(-1)[offset:end] = as_bytes_array(data)
+            with self._timed('parity'):
+                parities = compute_pq(new) if len(parity_ids) == 2 else (xor_stripes(new),)
+
+        payload = {data_ids[j]: new[j] for j in touched}
+        payload.update(zip(parity_ids, parities))
+        return self._write_fragments(sector_number, payload, parity_ids)
+
+    def _read_rows(self, sector_number: int, disk_ids: List[int], rows: Iterable[int], out: np.ndarray) -> bool:
+        """
+        Wczytuje fragmenty sektora z dysków `disk_ids[j]` do wierszy `out[j]` dla podanych j.
+        """
+        def read_row(j: int) -> bool:
             try:
-                start_idx = sector_number * self.sector_size
-                self.shared_memory[i][start_idx:start_idx + len(stripe_data)] = stripe_data
+                out[j] = as_bytes_array(self._disk_fragment(disk_ids[j], sector_number))
+                return True
             except Exception as e:
-                success = False
-                logging.error(f"RAID3 write failed on disk {i}: {e}")
-            finally:
-                self.semaphores[i].release()
-
-        # Zapis dysku parzystości (ostatni dysk)
-        parity_disk = self.num_disks - 1
-        self.semaphores[parity_disk].acquire()
-        try:
-            start_idx = sector_number * self.sector_size
-            self.shared_memory[parity_disk][start_idx:start_idx + len(parity)] = parity
-        except Exception as e:
-            success = False
-            logging.error(f"RAID3 parity write failed: {e}")
-        finally:
-            self.semaphores[parity_disk].release()
+                logging.error(f"{self.raid_type} read failed on disk {disk_ids[j]}: {e}")
+                return False
 
-        return success
+        return all(self._for_each_disk(read_row, rows))
+
+    def _write_fragments(self, sector_number: int, payload: Dict[int, np.ndarray], parity_ids: List[int]) -> bool:
+        """
+        Zapisuje fragmenty sektora na dyski (numer dysku -> zawartość fragmentu).
+        Dyski parzystości zapisywane są razem z dyskami danych, a uszkodzone dyski są
+        pomijane (zapis w trybie zdegradowanym). Sumy kontrolne zapisanych fragmentów
+        aktualizowane są po zapisie, jednym wywołaniem dla całego paska.
+        """
+        start_idx = sector_number * self.sector_size
+        disk_ids = self._writable_disks(payload) if self._failed_disks else list(payload)
+
+        def write_disk(i: int) -> bool:
+            try:
+                self.backends[i].write(start_idx, memoryview(payload[i]))
+                return True
+            except Exception as e:
+                label = f"parity disk {i}" if i in parity_ids else f"disk {i}"
+                logging.error(f"{self.raid_type} write failed on {label}: {e}")
+                return False
+
+        results = self._for_each_disk(write_disk, disk_ids)
+        written = [i for i, ok in zip(disk_ids, results) if ok]
+        self._checksums.update_stripe(sector_number, written, [fragment_checksum(payload[i]) for i in written])
+        if self._bad_fragments:
+            for i in written:
+                self._bad_fragments.discard((i, sector_number))
+        return all(results)
+
+    def _write_stripes(self, start_sector: int, rows: np.ndarray) -> bool:
+        """
+        Zapisuje kolejne pełne sektory logiczne (wiersze `rows`) od sektora `start_sector`
+        na macierz bez awarii. Parzystość liczona jest raz dla wszystkich pasków zakresu,
+        a każdy dysk dostaje jeden ciągły zapis i jedną wektorową aktualizację sum kontrolnych.
+        """
+        count = rows.shape[0]
+        if self.raid_type == 'RAID1':
+            regions = [rows] * self.num_disks
+            mirrored = crc32_rows(rows)
+        else:
+            parity_disks = PARITY_DISKS.get(self.raid_type, 0)
+            stripes = rows.reshape(count, self.num_disks - parity_disks, self.sector_size)
+            if parity_disks:
+                by_disk = np.ascontiguousarray(stripes.transpose(1, 0, 2))
+                with self._timed('parity'):
+                    parities = compute_pq(by_disk) if parity_disks == 2 else (xor_stripes(by_disk),)
+                stripes = np.concatenate([stripes, np.stack(parities, axis=1)], axis=1)
+            regions = np.empty((self.num_disks, count, self.sector_size), dtype=np.uint8)
+            regions[self._stripe_disks(start_sector, count), np.arange(count)[:, np.newaxis]] = stripes
+            mirrored = None
+        start_idx = start_sector * self.sector_size
+
+        def write_disk(i: int) -> bool:
+            try:
+                self.backends[i].write(start_idx, memoryview(regions[i]).cast('B'))
+                return True
+            except Exception as e:
+                logging.error(f"{self.raid_type} range write failed on disk {i}: {e}")
+                return False
+
+        results = self._for_each_disk(write_disk, range(self.num_disks))
+        for i, ok in enumerate(results):
+            if ok:
+                self._checksums.update_rows(i, start_sector, mirrored if mirrored is not None
+                                            else crc32_rows(regions[i]))
+        return all(results)
 
     # -----------------------
     # Metody odczytu
     # -----------------------
 
-    def _read_raid0(self, sector_number: int) -> Optional[bytes]:
+    def _read_raid0(self, sector_number: int, out: memoryview) -> bool:
         """
         Implementacja odczytu dla RAID0.
-        Odczytuje dane z wszystkich dysków i je scala.
+        Odczytuje dane z wszystkich dysków i składa je bezpośrednio w buforze `out`.
         """
-        success = True
-        result = bytearray()
+        unavailable = self._unreadable(range(self.num_disks), sector_number)
+        if unavailable:
+            logging.error(f"RAID0 read failed: disks {unavailable} unavailable")
+            return False
 
-        for i in range(self.num_disks):
-            self.semaphores[i].acquire()
+        def read_disk(i: int) -> bool:
             try:
-                start_idx = sector_number * self.sector_size
-                part = self.shared_memory[i][start_idx:start_idx + self.sector_size]
-                result.extend(part)
+                offset = i * self.sector_size
+                out[offset:offset + self.sector_size] = self._disk_fragment(i, sector_number)
+                return True
             except Exception as e:
-                success = False
                 logging.error(f"RAID0 read failed on disk {i}: {e}")
-            finally:
-                self.semaphores[i].release()
+                return False
 
-        return bytes(result) if success else None
+        return all(self._for_each_disk(read_disk, range(self.num_disks)))
 
-    def _read_raid1(self, sector_number: int) -> Optional[bytes]:
+    def _read_raid1(self, sector_number: int, out: memoryview) -> bool:
         """
         Implementacja odczytu dla RAID1.
-        Dane są odczytywane z pierwszego dostępnego (nieuszkodzonego) dysku.
+        Lustro wybiera planista odczytów (mirror_scheduler); pozostałe sprawne lustra
+        są próbowane tylko w razie błędu, a uszkodzone dyski pomijane bez prób odczytu.
         """
-        for i in range(self.num_disks):
-            self.semaphores[i].acquire()
+        unavailable = self._unreadable(range(self.num_disks), sector_number)
+        candidates = [i for i in range(self.num_disks) if i not in unavailable] if unavailable else \
+            list(range(self.num_disks))
+        for i in self.mirror_scheduler.order(sector_number, candidates):
             try:
-                start_idx = sector_number * self.sector_size
-                data = bytes(self.shared_memory[i][start_idx:start_idx + self.sector_size])
-                return data
+                with self.mirror_scheduler.track(i):
+                    out[:self.sector_size] = self._disk_fragment(i, sector_number)
+                return True
             except Exception as e:
                 logging.warning(f"RAID1 read failed on disk {i}: {e}")
-            finally:
-                self.semaphores[i].release()
 
         logging.error("RAID1 read failed: no functional disks")
-        return None
+        return False
+
+    def _read_raid1_range(self, start_sector: int, count: int, out: memoryview) -> bool:
+        """
+        Odczyt sekwencyjny dla RAID1 podzielony na ciągłe fragmenty, po jednym na każde
+        sprawne lustro. Każdy fragment kopiowany jest jedną operacją, a fragmenty czytane
+        są równolegle (w trybie 'stripe'), więc przepustowość rośnie z liczbą luster.
+        """
+        size = self.sector_size
+        sectors = range(start_sector, start_sector + count)
+        mirrors = [i for i in range(self.num_disks)
+                   if self._is_readable(i, sectors[0]) and self._is_readable(i, sectors[-1])]
+        mirrors = self.mirror_scheduler.order(start_sector, mirrors)
+        if len(mirrors) < 2:
+            return all([self._read_raid1(sector, out[k * size:(k + 1) * size]) for k, sector in enumerate(sectors)])
+
+        chunk = -(-count // len(mirrors))
+
+        def read_chunk(m: int) -> bool:
+            first = m * chunk
+            last = min(first + chunk, count)
+            if first >= last:
+                return True
+            disk_id = mirrors[m]
+            try:
+                with self.mirror_scheduler.track(disk_id):
+                    out[first * size:last * size] = self.backends[disk_id].read((start_sector + first) * size,
+                                                                                (last - first) * size)
+                # Sumy kontrolne całego fragmentu sprawdzane są jednym przebiegiem wektorowym;
+                # sektory z błędem czytane są ponownie z innych luster
+                rows = as_bytes_array(out[first * size:last * size]).reshape(last - first, size)
+                corrupted = self._checksums.verify_rows(disk_id, start_sector + first, crc32_rows(rows))
+                for k in corrupted:
+                    self._mark_bad(disk_id, start_sector + first + int(k))
+                return all([self._read_raid1(start_sector + first + int(k),
+                                             out[(first + k) * size:(first + k + 1) * size]) for k in corrupted])
+            except Exception as e:
+                # Fragment, którego nie udało się odczytać jednym ruchem, czytamy sektor po sektorze
+                logging.warning(f"RAID1 range read failed on disk {disk_id}: {e}")
+                return all([self._read_raid1(start_sector + k, out[k * size:(k + 1) * size])
+                            for k in range(first, last)])
+
+        return all(self._for_each_disk(read_chunk, range(len(mirrors))))
+
+    def _read_stripes(self, start_sector: int, count: int, out: memoryview,
+                      strategy: Callable[[int, memoryview], bool]) -> bool:
+        """
+        Odczyt sekwencyjny dla RAID0/3/5/6 na macierzy bez awarii: każdy dysk z danymi
+        czytany jest jednym ciągłym odczytem, a sumy kontrolne sprawdzane jednym przebiegiem
+        wektorowym. Sektory z uszkodzonym fragmentem (lub z dysku, którego nie udało się
+        odczytać) czytane są ponownie strategią sektorową, która odtwarza je z parzystości.
+        """
+        size = self.sector_size
+        data_disks = self.num_disks - PARITY_DISKS.get(self.raid_type, 0)
+        layout = self._stripe_disks(start_sector, count)[:, :data_disks]
+        regions = np.empty((self.num_disks, count, size), dtype=np.uint8)
+        start_idx = start_sector * size
+
+        def read_disk(i: int) -> Optional[np.ndarray]:
+            try:
+                regions[i] = as_bytes_array(self.backends[i].read(start_idx, count * size)).reshape(count, size)
+                return self._checksums.verify_rows(i, start_sector, crc32_rows(regions[i]))
+            except Exception as e:
+                logging.warning(f"{self.raid_type} range read failed on disk {i}: {e}")
+                return None
 
-    def _read_raid3(self, sector_number: int) -> Optional[bytes]:
+        disk_ids = np.unique(layout).tolist()
+        results = self._for_each_disk(read_disk, disk_ids)
+        rows = as_bytes_array(out[:count * self.logical_sector_size]).reshape(count, data_disks, size)
+        rows[:] = regions[layout, np.arange(count)[:, np.newaxis]]
+
+        retry = set()
+        for i, corrupted in zip(disk_ids, results):
+            if corrupted is None:
+                retry.update(range(count))
+                continue
+            for k in corrupted:
+                self._mark_bad(i, start_sector + int(k))
+                retry.add(int(k))
+        logical = self.logical_sector_size
+        return all([strategy(start_sector + k, out[k * logical:(k + 1) * logical]) for k in sorted(retry)])
+
+    def _read_raid3(self, sector_number: int, out: memoryview) -> bool:
         """
         Implementacja odczytu dla RAID3.
         Odczyt danych z dysków, regeneracja w razie potrzeby.
         Ostatni dysk jest dyskiem parzystości.
         """
-        if self.num_disks < 2:
-            logging.error("RAID3 requires at least 2 disks.")
-            return None
+        return self._read_with_parity(sector_number, out)
 
-        data_disks = self.num_disks - 1
-        stripe_size = self.sector_size
+    def _read_raid5(self, sector_number: int, out: memoryview) -> bool:
+        """
+        Implementacja odczytu dla RAID5.
+        Przy awarii jednego dysku dane odtwarzane są z rotującej parzystości.
+        """
+        return self._read_with_parity(sector_number, out)
+
+    def _read_raid6(self, sector_number: int, out: memoryview) -> bool:
+        """
+        Implementacja odczytu dla RAID6.
+        Przy awarii do dwóch dysków dane odtwarzane są z parzystości P i Q.
+        """
+        return self._read_with_parity(sector_number, out)
 
-        parity = bytearray(stripe_size)
-        result = bytearray()
-        failed_disk_idx = -1
+    def _read_with_parity(self, sector_number: int, out: memoryview) -> bool:
+        """
+        Wspólny odczyt dla poziomów z parzystością (RAID3/5/6).
+        Odczyt jest planowany z góry: niedostępne dyski są pomijane, a brakujące
+        paski odtwarzane w całości jednym przebiegiem wektorowym.
+        """
+        if self.num_disks < MIN_DISKS[self.raid_type]:
+            logging.error(f"{self.raid_type} requires at least {MIN_DISKS[self.raid_type]} disks.")
+            return False
 
-        # Najpierw wczytujemy dane z dysków „danych”
-        for i in range(data_disks):
-            self.semaphores[i].acquire()
+        data_ids, parity_ids = self._stripe_layout(sector_number)
+        stripe_size = self.sector_size
+
+        def read_disk(j: int) -> bool:
             try:
-                start_idx = sector_number * stripe_size
-                stripe_data = self.shared_memory[i][start_idx:start_idx + stripe_size]
-                result.extend(stripe_data)
-                # XOR w locie do parzystości
-                for j in range(stripe_size):
-                    parity[j] ^= stripe_data[j]
+                offset = j * stripe_size
+                out[offset:offset + stripe_size] = self._disk_fragment(data_ids[j], sector_number)
+                return True
             except Exception as e:
-                failed_disk_idx = i
-                logging.warning(f"RAID3 read: disk {i} failed during read: {e}")
-                # Zapisz informację, który dysk padł i spróbujemy zrekonstruować
-            finally:
-                self.semaphores[i].release()
-
-        # Jeśli któryś dysk danych jest uszkodzony, odczytujemy parzystość i rekonstruujemy
-        if failed_disk_idx != -1:
-            parity_disk = self.num_disks - 1
-            self.semaphores[parity_disk].acquire()
+                logging.warning(f"{self.raid_type} read: disk {data_ids[j]} failed during read: {e}")
+                return False
+
+        # Plan odczytu: dyski uszkodzone lub w odbudowie są od razu traktowane jako brakujące
+        unavailable = self._unreadable(data_ids, sector_number)
+        missing = [j for j, disk in enumerate(data_ids) if disk in unavailable]
+        if len(missing) > len(parity_ids):
+            logging.error(f"{self.raid_type} read failed: disks {[data_ids[j] for j in missing]} unavailable")
+            return False
+
+        # Wczytujemy dane z dostępnych dysków „danych”; nieoczekiwane błędy też trafiają do brakujących
+        present = [j for j in range(len(data_ids)) if j not in missing]
+        results = self._for_each_disk(read_disk, present)
+        missing += [j for j, ok in zip(present, results) if not ok]
+        if not missing:
+            return True
+        if len(missing) > len(parity_ids):
+            logging.error(f"{self.raid_type} read failed: disks {[data_ids[j] for j in missing]} unavailable")
+            return False
+
+        # Parzystość czytamy tylko wtedy, gdy trzeba coś odtworzyć
+        parities = []
+        for disk in parity_ids:
             try:
-                start_idx = sector_number * stripe_size
-                parity_data = self.shared_memory[parity_disk][start_idx:start_idx + stripe_size]
-                # Miejsce w result, gdzie powinna być partia z failed_disk_idx
-                offset = failed_disk_idx * stripe_size
-                # Nadpisz surowe dane w result danymi z parzystości
-                for j in range(stripe_size):
-                    # Startowo przypisz bajt z parzystości
-                    result[offset + j] = parity_data[j]
-                    # XOR z innymi dyskami (oprócz uszkodzonego), żeby odtworzyć oryginał
-                    for k in range(data_disks):
-                        if k != failed_disk_idx:
-                            idx_k = k * stripe_size + j
-                            result[offset + j] ^= result[idx_k]
+                parities.append(self._disk_fragment(disk, sector_number) if self._is_readable(disk, sector_number) else None)
             except Exception as e:
-                logging.error(f"RAID3 read failed during parity reconstruction: {e}")
-                return None
-            finally:
-                self.semaphores[parity_disk].release()
+                logging.warning(f"{self.raid_type} read: parity disk {disk} failed during read: {e}")
+                parities.append(None)
+        parities += [None] * (2 - len(parities))
+
+        try:
+            # Całe paski odtwarzane naraz z parzystości i pozostałych dysków
+            stripes = as_bytes_array(out).reshape(len(data_ids), stripe_size)
+            with self._timed('reconstruction'):
+                recover_stripes(stripes, missing, *parities)
+            self._record_event('reconstructions', [data_ids[j] for j in missing])
+        except Exception as e:
+            logging.error(f"{self.raid_type} read failed during parity reconstruction: {e}")
+            return False
+
+        return True
+
+    def _unreadable(self, disk_ids: Iterable[int], sector_number: int) -> List[int]:
+        """
+        Zwraca te z dysków, których fragment sektora nie jest czytelny (patrz _is_readable).
+        W macierzy bez awarii, uszkodzonych fragmentów i trwających odbudów nie sprawdza
+        dysków po kolei.
+        """
+        if not (self._failed_disks or self._bad_fragments or self._rebuilding()):
+            return []
+        return [i for i in disk_ids if not self._is_readable(i, sector_number)]
+
+    def _rebuilding(self) -> bool:
+        """
+        Czy któryś dysk ma niedokończoną (trwającą lub przerwaną) odbudowę.
+        """
+        return bool(self._rebuilds) and any(engine.state != 'completed' for engine in self._rebuilds.values())
+
+    def _is_readable(self, disk_id: int, sector_number: int) -> bool:
+        """
+        Sprawdza, czy fragment sektora na dysku zawiera aktualne dane. Uszkodzony dysk
+        nie jest czytelny, a dysk w trakcie odbudowy tylko dla sektorów już odbudowanych.
+        """
+        if disk_id in self._failed_disks:
+            return False
+        if self._bad_fragments and (disk_id, sector_number) in self._bad_fragments:
+            return False
+        engine = self._rebuilds.get(disk_id)
+        return engine is None or engine.is_rebuilt(sector_number)
+
+    def _writable_disks(self, disk_ids: Iterable[int]) -> List[int]:
+        """
+        Zwraca dyski, na które można zapisywać (wszystkie poza uszkodzonymi; dyski
+        w odbudowie przyjmują zapisy, aby odbudowana część pozostała aktualna).
+        """
+        return [i for i in disk_ids if i not in self._failed_disks]
+
+    def _disk_fragment(self, disk_id: int, sector_number: int) -> memoryview:
+        """
+        Zwraca widok (bez kopiowania) na fragment sektora przechowywany na dysku.
+
+        Raises:
+            IOError: Gdy fragment nie zawiera jeszcze aktualnych danych
+            ChecksumError: Gdy zawartość fragmentu nie zgadza się z sumą kontrolną
+        """
+        degraded = self._failed_disks or self._bad_fragments or self._rebuilds
+        if degraded and not self._is_readable(disk_id, sector_number):
+            if (disk_id, sector_number) in self._bad_fragments:
+                raise ChecksumError(f"disk {disk_id} sector {sector_number} is corrupted")
+            raise IOError(f"disk {disk_id} is {self.get_disk_state(disk_id)}")
+        start_idx = sector_number * self.sector_size
+        fragment = self.backends[disk_id].read(start_idx, self.sector_size)
+        if not self._checksums.verify(disk_id, sector_number, fragment_checksum(fragment)):
+            self._mark_bad(disk_id, sector_number)
+            raise ChecksumError(f"disk {disk_id} sector {sector_number}: checksum mismatch")
+        return fragment
+
+    def _update_checksum(self, disk_id: int, sector_number: int, fragment=None):
+        """
+        Przelicza sumę kontrolną fragmentu po zapisie; zapisany fragment przestaje być uszkodzony.
+
+        Args:
+            fragment: Pełna zapisana zawartość fragmentu; jeśli nie podano (zapis części
+                fragmentu), fragment jest odczytywany z dysku
+        """
+        if fragment is None:
+            fragment = self.backends[disk_id].read(sector_number * self.sector_size, self.sector_size)
+        self._checksums.update(disk_id, sector_number, fragment_checksum(fragment))
+        self._bad_fragments.discard((disk_id, sector_number))
+
+    def _mark_bad(self, disk_id: int, sector_number: int):
+        """
+        Dopisuje fragment do listy uszkodzonych i rejestruje błąd w statystykach dysku.
+        """
+        if (disk_id, sector_number) not in self._bad_fragments:
+            self._bad_fragments.add((disk_id, sector_number))
+            self.disk_stats[disk_id].add_error('checksum_mismatch', time.time())
+            logging.warning(f"Checksum mismatch on disk {disk_id}, sector {sector_number}")
 
-        return bytes(result)
+    def _for_each_disk(self, operation: Callable[[int], T], disk_ids: Iterable[int]) -> List[T]:
+        """
+        Wykonuje operację dla każdego z dysków. Przy zdalnych dyskach (lub dużych sektorach
+        w trybie 'stripe') części żądania przypadające na poszczególne dyski wykonywane są
+        równolegle w puli wątków.
+
+        Args:
+            operation: Funkcja przyjmująca numer dysku
+            disk_ids: Numery dysków
+
+        Returns:
+            List: Wyniki operacji w kolejności dysków
+        """
+        if self._io_pool is None:
+            return [operation(i) for i in disk_ids]
+        return list(self._io_pool.map(operation, disk_ids))
+
+    # -----------------------
+    # Instrumentacja
+    # -----------------------
+
+    def set_instrumentation(self, enabled: bool):
+        """
+        Włącza lub wyłącza instrumentację w trakcie pracy kontrolera.
+
+        Włączona instrumentacja owija magazyny dysków (InstrumentedBackend), więc operacje
+        dyskowe trafiają do disk_stats, a operacje macierzy, czasy oczekiwania na blokady
+        i liczenia parzystości oraz odtworzenia danych z parzystości - do array_stats.
+        Liczniki operacji i bajtów są dokładne, a opóźnienia i czasy etapów mierzone dla
+        co SAMPLE_EVERY-tego wystąpienia (z odpowiednią wagą). Po wyłączeniu magazyny
+        wracają do pierwotnych, a pomiary czasu są pomijane, więc ścieżki I/O nie ponoszą
+        ich kosztu.
+
+        Args:
+            enabled: True, aby rejestrować statystyki
+        """
+        self._flush_recorders()
+        backends = [backend.backend if isinstance(backend, InstrumentedBackend) else backend
+                    for backend in self.backends]
+        if enabled:
+            backends = [InstrumentedBackend(backend, stats) for backend, stats in zip(backends, self.disk_stats)]
+        self.backends = backends
+        self.instrumented = enabled
+
+    def get_instrumentation(self) -> dict:
+        """
+        Zwraca migawkę statystyk: całej macierzy (operacje logiczne, czasy etapów,
+        zdarzenia) oraz każdego dysku.
+
+        Returns:
+            dict: Klucze 'enabled', 'timestamp', 'array' i 'disks' (lista w kolejności dysków)
+        """
+        self._flush_recorders()
+        return {
+            'enabled': self.instrumented,
+            'timestamp': time.time(),
+            'array': self.array_stats.get_stats(),
+            'disks': [stats.get_stats() for stats in self.disk_stats],
+        }
+
+    def reset_instrumentation(self):
+        """
+        Zeruje statystyki macierzy i wszystkich dysków.
+        """
+        self._array_recorder.clear()
+        for backend in self.backends:
+            if isinstance(backend, InstrumentedBackend):
+                backend.recorder.clear()
+        self.array_stats.reset()
+        for stats in self.disk_stats:
+            stats.reset()
+
+    def _flush_recorders(self):
+        """
+        Przekazuje do statystyk operacje zebrane w rejestratorach od ostatniej partii.
+        """
+        self._array_recorder.flush()
+        for backend in self.backends:
+            if isinstance(backend, InstrumentedBackend):
+                backend.recorder.flush()
+
+    def _timed(self, name: str):
+        """
+        Zwraca blok `with` mierzący czas etapu `name` w array_stats (dla co
+        SAMPLE_EVERY-tego wystąpienia; w pozostałych i przy wyłączonej instrumentacji pusty).
+        """
+        if self.instrumented and self._stages.due(name):
+            return TimedSection(self.array_stats, name, SAMPLE_EVERY)
+        return _UNTIMED
+
+    def _record_event(self, name: str, disk_ids: Iterable[int] = ()):
+        """
+        Zlicza zdarzenie w statystykach macierzy oraz podanych dysków.
+        """
+        if self.instrumented:
+            self.array_stats.add_event(name)
+            for disk_id in disk_ids:
+                self.disk_stats[disk_id].add_event(name)
+
+    def _finish(self, op_type: str, size: int, start: float, result: T) -> T:
+        """
+        Rejestruje zakończoną operację macierzy (rozpoczętą w chwili `start` według
+        time.perf_counter()) i zwraca jej wynik; nieudana operacja liczona jest jako błąd.
+        """
+        if self.instrumented:
+            if result:
+                self._array_recorder.add(op_type, size, time.perf_counter() - start)
+            else:
+                self.array_stats.add_error(f'{op_type}_failed', time.time())
+        return result
+
+    # -----------------------
+    # Stan dysków
+    # -----------------------
+
+    def get_disk_state(self, disk_id: int) -> str:
+        """
+        Zwraca stan dysku: 'failed', 'rebuilding' lub 'online'.
+        """
+        if disk_id in self._failed_disks:
+            return DISK_FAILED
+        engine = self._rebuilds.get(disk_id)
+        if engine is not None and engine.state != 'completed':
+            return DISK_REBUILDING
+        return DISK_ONLINE
+
+    def failed_disks(self) -> List[int]:
+        """
+        Zwraca numery uszkodzonych dysków.
+        """
+        return sorted(self._failed_disks)
+
+    def inject_disk_error(self, disk_id: int, error_type: str = "disk_failure"):
+        """
+        Wstrzykuje awarię dysku. Dysk przechodzi w stan 'failed': odczyty i zapisy
+        go pomijają, a dane odtwarzane są z redundancji aż do wywołania repair_disk.
+
+        Args:
+            disk_id: Numer dysku
+            error_type: Typ błędu zapisywany w statystykach dysku
+        """
+        if not 0 <= disk_id < self.num_disks:
+            raise ValueError(f"Invalid disk id: {disk_id}")
+        self.stop_rebuild(disk_id)
+        # Zmiana stanu pod blokadą całej macierzy, aby trwające operacje widziały spójny zbiór uszkodzonych dysków
+        with self._locked():
+            self._failed_disks.add(disk_id)
+        self.disk_stats[disk_id].add_error(error_type, time.time())
+        logging.warning(f"Disk {disk_id} failed ({error_type})")
+
+    def inject_corruption(self, disk_id: int, sector_number: int):
+        """
+        Symuluje cichą korupcję danych: odwraca bity fragmentu sektora na dysku bez
+        aktualizacji sumy kontrolnej. Błąd wykrywany jest przy odczycie lub przeglądzie.
+
+        Args:
+            disk_id: Numer dysku
+            sector_number: Numer sektora
+        """
+        if not 0 <= disk_id < self.num_disks:
+            raise ValueError(f"Invalid disk id: {disk_id}")
+        start_idx = sector_number * self.sector_size
+        with self._locked((sector_number,)):
+            fragment = as_bytes_array(self.backends[disk_id].read(start_idx, self.sector_size)) ^ 0xFF
+            self.backends[disk_id].write(start_idx, memoryview(fragment))
+        logging.warning(f"Corruption injected on disk {disk_id}, sector {sector_number}")
+
+    def get_disk_status(self) -> List[dict]:
+        """
+        Zwraca stan wszystkich dysków: stan, flagę awarii, postęp odbudowy, liczbę zajętych
+        (zapisanych) sektorów oraz statystyki.
+        """
+        return [
+            {
+                'disk_id': disk_id,
+                'state': self.get_disk_state(disk_id),
+                'is_failed': disk_id in self._failed_disks,
+                'rebuild': self.get_rebuild_progress(disk_id),
+                'used_sectors': self._checksums.written_sectors(disk_id),
+                'stats': self.disk_stats[disk_id].get_stats(),
+            }
+            for disk_id in range(self.num_disks)
+        ]
+
+    # -----------------------
+    # Odbudowa dysków
+    # -----------------------
+
+    def repair_disk(self, disk_id: int, max_bytes_per_sec: Optional[float] = None,
+                    max_iops: Optional[float] = None, batch_sectors: int = 8) -> bool:
+        """
+        Uruchamia w tle odbudowę zawartości (wymienionego) dysku z luster lub parzystości.
+        Uszkodzony dysk traktowany jest jako wymieniony na nowy i przechodzi w stan
+        'rebuilding'. Jeśli istnieje punkt kontrolny przerwanej odbudowy, jest ona wznawiana.
+        W RAID0 (bez redundancji) dysk jest wymieniany na pusty, a jego dane są tracone.
+
+        Args:
+            disk_id: Numer dysku do odbudowy
+            max_bytes_per_sec: Limit przepustowości odbudowy (None - bez limitu)
+            max_iops: Limit odbudowywanych sektorów na sekundę (None - bez limitu)
+            batch_sectors: Liczba sektorów odbudowywanych pod jedną blokadą
+
+        Returns:
+            bool: True jeśli odbudowa została uruchomiona (lub już trwa) albo dysk RAID0 wymieniony
+        """
+        if self.raid_type == 'RAID0':
+            return self._replace_disk(disk_id)
+
+        previous = self._rebuilds.get(disk_id)
+        if previous is not None and previous.is_alive():
+            logging.info(f"Rebuild of disk {disk_id} already running")
+            return True
+
+        # Wznawiamy od miejsca przerwania poprzedniej (niezakończonej) odbudowy;
+        # po awarii dysku (wymiana) odbudowa zaczyna się od początku
+        start_sector = 0
+        if previous is not None and previous.state in ('stopped', 'failed') and disk_id not in self._failed_disks:
+            start_sector = previous.cursor
+
+        engine = RebuildEngine(self, disk_id, start_sector=start_sector, batch_sectors=batch_sectors,
+                               max_bytes_per_sec=max_bytes_per_sec, max_iops=max_iops,
+                               checkpoint_path=self._rebuild_checkpoint_path(disk_id))
+        with self._locked():
+            self._rebuilds[disk_id] = engine
+            self._failed_disks.discard(disk_id)
+        engine.start()
+        return True
+
+    def _replace_disk(self, disk_id: int) -> bool:
+        """
+        Wymiana dysku RAID0: bez redundancji nie ma czego odbudować, więc dysk jest
+        zerowany (jak nowy) i wraca do pracy, a dane macierzy z niego pochodzące są tracone.
+        """
+        if disk_id not in self._failed_disks:
+            logging.info(f"Disk {disk_id} is not failed, nothing to replace")
+            return True
+        size = self.sector_size * self.num_sectors
+        zeros = bytes(min(size, 1 << 20))
+        with self._locked():
+            for offset in range(0, size, len(zeros)):
+                self.backends[disk_id].write(offset, zeros[:size - offset])
+            self._checksums.reset(disk_id)
+            self._bad_fragments = {fragment for fragment in self._bad_fragments if fragment[0] != disk_id}
+            self._failed_disks.discard(disk_id)
+        logging.error(f"RAID0 has no redundancy: disk {disk_id} replaced with an empty disk, its data is lost")
+        return True
+
+    def stop_rebuild(self, disk_id: int):
+        """
+        Przerywa odbudowę dysku; można ją wznowić kolejnym wywołaniem repair_disk.
+        """
+        engine = self._rebuilds.get(disk_id)
+        if engine is not None and engine.is_alive():
+            engine.stop()
+            engine.join()
+
+    def get_rebuild_progress(self, disk_id: int) -> Optional[dict]:
+        """
+        Zwraca postęp odbudowy dysku (stan, procent, szybkość, ETA) lub None,
+        jeśli dysk nie był odbudowywany.
+        """
+        engine = self._rebuilds.get(disk_id)
+        return engine.progress() if engine is not None else None
+
+    def _rebuild_checkpoint_path(self, disk_id: int) -> Optional[str]:
+        if self.storage_dir is None:
+            return None
+        return os.path.join(self.storage_dir, f"disk{disk_id}.rebuild.json")
+
+    def _restore_rebuilds(self):
+        """
+        Odtwarza przerwane odbudowy z punktów kontrolnych - niedokończone sektory
+        pozostają niedostępne do odczytu, dopóki repair_disk nie wznowi odbudowy.
+        """
+        for disk_id in range(self.num_disks):
+            path = self._rebuild_checkpoint_path(disk_id)
+            engine = RebuildEngine.from_checkpoint(self, path) if path and os.path.exists(path) else None
+            if engine is not None:
+                self._rebuilds[disk_id] = engine
+                logging.info(f"Disk {disk_id} rebuild interrupted at sector {engine.cursor}, call repair_disk to resume")
+
+    def _rebuild_sector(self, disk_id: int, sector_number: int) -> bool:
+        """
+        Odtwarza fragment sektora na odbudowywanym dysku. Sektor jest czytany zwykłą
+        ścieżką odczytu (dysk w odbudowie jest w niej pomijany, a brakujące dane
+        odtwarzane wektorowo), po czym zapisywany jest tylko fragment tego dysku.
+        Wywoływane z zajętą blokadą sektora.
+        """
+        if disk_id in self._failed_disks:
+            return False
+        if self.raid_type == 'RAID1':
+            buffer = bytearray(self.sector_size)
+            if not self._read_raid1(sector_number, memoryview(buffer)):
+                return False
+            return self._write_fragments(sector_number, {disk_id: buffer}, [])
+
+        buffer = bytearray(self.logical_sector_size)
+        if not self._read_with_parity(sector_number, memoryview(buffer)):
+            return False
+        data_ids, parity_ids = self._stripe_layout(sector_number)
+        stripes = as_bytes_array(buffer).reshape(len(data_ids), self.sector_size)
+        if disk_id in data_ids:
+            fragment = stripes[data_ids.index(disk_id)]
+        else:
+            with self._timed('parity'):
+                parities = compute_pq(stripes) if len(parity_ids) == 2 else (xor_stripes(stripes),)
+            fragment = parities[parity_ids.index(disk_id)]
+        return self._write_fragments(sector_number, {disk_id: fragment}, parity_ids)
+
+    # -----------------------
+    # Przegląd macierzy (scrubbing)
+    # -----------------------
+
+    def start_scrub(self, max_bytes_per_sec: Optional[float] = None, max_iops: Optional[float] = None,
+                    batch_sectors: int = 32, continuous: bool = False, interval: float = 60.0) -> bool:
+        """
+        Uruchamia w tle przegląd macierzy: weryfikację sum kontrolnych i parzystości
+        oraz naprawę uszkodzonych fragmentów z redundancji.
+
+        Args:
+            max_bytes_per_sec: Limit przepustowości przeglądu (None - bez limitu)
+            max_iops: Limit sprawdzanych sektorów na sekundę (None - bez limitu)
+            batch_sectors: Liczba sektorów sprawdzanych pod jedną blokadą
+            continuous: Czy powtarzać przebiegi co `interval` sekund
+            interval: Przerwa między przebiegami w trybie ciągłym
+
+        Returns:
+            bool: True jeśli przegląd został uruchomiony (lub już trwa)
+        """
+        if self._scrubber is not None and self._scrubber.is_alive():
+            logging.info("Scrub already running")
+            return True
+        self._scrubber = Scrubber(self, batch_sectors=batch_sectors, max_bytes_per_sec=max_bytes_per_sec,
+                                  max_iops=max_iops, continuous=continuous, interval=interval)
+        self._scrubber.start()
+        return True
+
+    def stop_scrub(self):
+        """
+        Przerywa przegląd macierzy.
+        """
+        if self._scrubber is not None and self._scrubber.is_alive():
+            self._scrubber.stop()
+            self._scrubber.join()
+
+    def get_scrub_progress(self) -> Optional[dict]:
+        """
+        Zwraca postęp przeglądu i liczniki błędów lub None, jeśli przegląd nie był uruchamiany.
+        """
+        return self._scrubber.progress() if self._scrubber is not None else None
+
+    def _scrub_sectors(self, sectors: range) -> dict:
+        """
+        Sprawdza partię sektorów (wywoływane przez Scrubber z zajętą blokadą).
+
+        Sumy kontrolne liczone są wektorowo dla całej partii na każdym dysku. Fragmenty
+        z błędem sumy są odtwarzane z redundancji, a w paskach z poprawnymi sumami
+        sprawdzana jest zgodność parzystości - niezgodna parzystość jest przeliczana
+        z danych (które sumy kontrolne potwierdziły).
+        """
+        result = {'checksum_errors': 0, 'parity_errors': 0, 'repaired': 0, 'unrepaired': 0}
+        size = self.sector_size
+        corrupted: Dict[int, List[int]] = {}
+        for disk_id in range(self.num_disks):
+            if disk_id in self._failed_disks:
+                continue
+            rows = as_bytes_array(self.backends[disk_id].read(sectors.start * size, len(sectors) * size))
+            sums = crc32_rows(rows.reshape(len(sectors), size))
+            for k in self._checksums.verify_rows(disk_id, sectors.start, sums):
+                sector_number = sectors.start + int(k)
+                engine = self._rebuilds.get(disk_id)
+                if engine is None or engine.is_rebuilt(sector_number):
+                    corrupted.setdefault(sector_number, []).append(disk_id)
+
+        for sector_number, disk_ids in corrupted.items():
+            for disk_id in disk_ids:
+                self._mark_bad(disk_id, sector_number)
+            for disk_id in disk_ids:
+                result['checksum_errors'] += 1
+                if self.raid_type != 'RAID0' and self._rebuild_sector(disk_id, sector_number):
+                    result['repaired'] += 1
+                    logging.info(f"Scrub repaired disk {disk_id}, sector {sector_number}")
+                else:
+                    result['unrepaired'] += 1
+                    logging.error(f"Scrub could not repair disk {disk_id}, sector {sector_number}")
+
+        if self.raid_type not in PARITY_DISKS:
+            return result
+        for sector_number in sectors:
+            data_ids, parity_ids = self._stripe_layout(sector_number)
+            if sector_number in corrupted or not all(self._is_readable(disk, sector_number)
+                                                     for disk in data_ids + parity_ids):
+                continue
+            fragments = [as_bytes_array(self.backends[disk].read(sector_number * size, size))
+                         for disk in data_ids + parity_ids]
+            stripes = np.stack(fragments[:len(data_ids)])
+            with self._timed('parity'):
+                parities = compute_pq(stripes) if len(parity_ids) == 2 else (xor_stripes(stripes),)
+            stale = {disk: parity for disk, parity, stored in zip(parity_ids, parities, fragments[len(data_ids):])
+                     if not np.array_equal(parity, stored)}
+            if stale:
+                result['parity_errors'] += 1
+                logging.warning(f"Scrub found inconsistent parity in sector {sector_number}")
+                if self._write_fragments(sector_number, stale, parity_ids):
+                    result['repaired'] += 1
+                else:
+                    result['unrepaired'] += 1
+        return result
 
     # Metody "pomocnicze" do obsługi w razie potrzeby
+    def sync(self, disk_id: Optional[int] = None):
+        """
+        Punkt synchronizacji: opróżnia pamięć podręczną zapisu, a następnie utrwala
+        magazyny dysków (zrzuca zmodyfikowane strony obrazów do plików) i tablice sum
+        kontrolnych. Dla dysków w pamięci procesu kończy się na opróżnieniu pamięci podręcznej.
+
+        Args:
+            disk_id: Numer dysku do synchronizacji; None oznacza wszystkie dyski
+        """
+        disk_ids = range(self.num_disks) if disk_id is None else [disk_id]
+        self.flush()
+        with self._locked():
+            for i in disk_ids:
+                self.backends[i].flush()
+            self._checksums.flush()
+
     def stop_disks(self):
         """
-        Aktualnie nie tworzymy żadnych procesów, więc nic nie zatrzymujemy.
-        Zostawiamy metodę w razie przyszłej rozbudowy.
+        Zatrzymuje pracę macierzy: opróżnia pamięć podręczną zapisu, zatrzymuje przegląd,
+        przerywa trwające odbudowy (z zapisem punktu kontrolnego) i zamyka pulę wątków I/O.
+        Na koniec obrazy dysków zmapowane z plików są synchronizowane, a magazyny dysków zamykane.
         """
+        if self.write_cache is not None:
+            self.write_cache.close()
+        self.stop_scrub()
+        for disk_id in list(self._rebuilds):
+            self.stop_rebuild(disk_id)
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=True)
+        if self.storage_dir is not None:
+            self.sync()
+        for backend in self.backends:
+            backend.close()
+        self._checksums.close()
+        if self.storage_dir is not None:
+            logging.info(f"Disk images in {self.storage_dir} synced and closed.")
         logging.info("All disk processes would stop here if they existed.")
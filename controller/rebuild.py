@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from controller.throttle import TokenBucket
+
+
+class RebuildEngine(threading.Thread):
+    """
+    Odbudowa wymienionego dysku w tle, pasek po pasku.
+
+    Sektory odtwarzane są partiami; każda partia blokuje tylko swoje paski, więc
+    operacje pierwszoplanowe mogą być wykonywane pomiędzy partiami. Szybkość odbudowy
+    może być ograniczona (bajty/s i operacje/s), a postęp zapisywany jest w pliku
+    punktu kontrolnego, z którego odbudowę można wznowić.
+    """
+
+    def __init__(self, controller, disk_id: int, start_sector: int = 0, batch_sectors: int = 8,
+                 max_bytes_per_sec: Optional[float] = None, max_iops: Optional[float] = None,
+                 checkpoint_path: Optional[str] = None, checkpoint_every: int = 256):
+        """
+        Args:
+            controller: Kontroler RAID, którego dysk jest odbudowywany
+            disk_id: Numer odbudowywanego dysku
+            start_sector: Sektor, od którego zaczyna się (lub wznawia) odbudowa
+            batch_sectors: Liczba sektorów odbudowywanych pod jedną blokadą
+            max_bytes_per_sec: Limit przepustowości odbudowy (None - bez limitu)
+            max_iops: Limit odbudowywanych sektorów na sekundę (None - bez limitu)
+            checkpoint_path: Plik punktu kontrolnego (None - postęp tylko w pamięci)
+            checkpoint_every: Co ile sektorów zapisywać punkt kontrolny
+        """
+        super().__init__(name=f"rebuild-disk{disk_id}", daemon=True)
+        self.controller = controller
+        self.disk_id = disk_id
+        self.batch_sectors = batch_sectors
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.total_sectors = controller.num_sectors
+        self.state = 'pending'
+
+        self._cursor = start_sector
+        self._start_sector = start_sector
+        self._bandwidth = TokenBucket(max_bytes_per_sec)
+        self._iops = TokenBucket(max_iops)
+        self._stop_event = threading.Event()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @classmethod
+    def from_checkpoint(cls, controller, checkpoint_path: str, **kwargs) -> Optional['RebuildEngine']:
+        """
+        Tworzy (niewystartowany) silnik odbudowy na podstawie zapisanego punktu kontrolnego.
+
+        Returns:
+            Optional[RebuildEngine]: Silnik gotowy do wznowienia lub None, jeśli punktu kontrolnego brak
+        """
+        try:
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        engine = cls(controller, checkpoint['disk_id'], start_sector=checkpoint['next_sector'],
+                     checkpoint_path=checkpoint_path, **kwargs)
+        engine.state = 'stopped'
+        return engine
+
+    @property
+    def cursor(self) -> int:
+        """Pierwszy sektor, który nie został jeszcze odbudowany."""
+        return self._cursor
+
+    def is_rebuilt(self, sector_number: int) -> bool:
+        """
+        Sprawdza, czy dany sektor odbudowywanego dysku zawiera już poprawne dane.
+        """
+        return self.state == 'completed' or sector_number < self._cursor
+
+    def run(self):
+        """
+        Główna pętla odbudowy.
+        """
+        self.state = 'running'
+        self.started_at = time.time()
+        logging.info(f"Rebuild of disk {self.disk_id} started at sector {self._cursor}")
+        self._save_checkpoint()
+        last_checkpoint = self._cursor
+
+        while self._cursor < self.total_sectors:
+            if self._stop_event.is_set():
+                self.state = 'stopped'
+                self._save_checkpoint()
+                logging.info(f"Rebuild of disk {self.disk_id} stopped at sector {self._cursor}")
+                return
+
+            batch = range(self._cursor, min(self._cursor + self.batch_sectors, self.total_sectors))
+            self._iops.consume(len(batch))
+            self._bandwidth.consume(len(batch) * self.controller.sector_size)
+
+            with self.controller._locked(batch):
+                ok = all(self.controller._rebuild_sector(self.disk_id, sector) for sector in batch)
+                if ok:
+                    self._cursor = batch.stop
+            if not ok:
+                self.state = 'failed'
+                self.finished_at = time.time()
+                self._save_checkpoint()
+                logging.error(f"Rebuild of disk {self.disk_id} failed at sector {batch.start}")
+                return
+
+            if self._cursor - last_checkpoint >= self.checkpoint_every:
+                self._save_checkpoint()
+                last_checkpoint = self._cursor
+
+        self.state = 'completed'
+        self.finished_at = time.time()
+        self._remove_checkpoint()
+        logging.info(f"Rebuild of disk {self.disk_id} completed in {self.finished_at - self.started_at:.2f}s")
+
+    def stop(self):
+        """
+        Zatrzymuje odbudowę po bieżącej partii i zapisuje punkt kontrolny.
+        """
+        self._stop_event.set()
+
+    def progress(self) -> dict:
+        """
+        Zwraca postęp odbudowy: stan, liczbę odbudowanych sektorów, procent, szybkość
+        oraz szacowany czas do końca (ETA) i czas trwania okna degradacji.
+        """
+        now = self.finished_at or time.time()
+        elapsed = now - self.started_at if self.started_at else 0.0
+        done_in_session = self._cursor - self._start_sector
+        rate = done_in_session / elapsed if elapsed > 0 else 0.0
+        remaining = self.total_sectors - self._cursor
+        if self.state == 'completed':
+            eta = 0.0
+        elif rate > 0:
+            eta = remaining / rate
+        else:
+            eta = None
+
+        return {
+            'disk_id': self.disk_id,
+            'state': self.state,
+            'rebuilt_sectors': self._cursor,
+            'total_sectors': self.total_sectors,
+            'percent': 100.0 * self._cursor / self.total_sectors if self.total_sectors else 100.0,
+            'sectors_per_sec': rate,
+            'eta_seconds': eta,
+            'elapsed_seconds': elapsed,
+        }
+
+    def _save_checkpoint(self):
+        """
+        Atomowo zapisuje punkt kontrolny (zapis do pliku tymczasowego i podmiana).
+        """
+        if self.checkpoint_path is None:
+            return
+        tmp_path = self.checkpoint_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'disk_id': self.disk_id, 'next_sector': self._cursor}, f)
+            os.replace(tmp_path, self.checkpoint_path)
+        except OSError as e:
+            logging.error(f"Failed to save rebuild checkpoint for disk {self.disk_id}: {e}")
+
+    def _remove_checkpoint(self):
+        if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
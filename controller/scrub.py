@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from controller.throttle import TokenBucket
+
+
+class Scrubber(threading.Thread):
+    """
+    Przegląd (scrubbing) macierzy w tle.
+
+    Sektory sprawdzane są partiami: sumy kontrolne fragmentów wszystkich dysków liczone
+    są wektorowo dla całej partii, a dla poziomów z parzystością dodatkowo sprawdzana
+    jest zgodność parzystości. Uszkodzone fragmenty odtwarzane są z redundancji. Szybkość
+    przeglądu jest ograniczana tak jak szybkość odbudowy.
+    """
+
+    def __init__(self, controller, batch_sectors: int = 32, max_bytes_per_sec: Optional[float] = None,
+                 max_iops: Optional[float] = None, continuous: bool = False, interval: float = 60.0):
+        """
+        Args:
+            controller: Kontroler RAID, którego macierz jest przeglądana
+            batch_sectors: Liczba sektorów sprawdzanych pod jedną blokadą
+            max_bytes_per_sec: Limit przepustowości przeglądu (None - bez limitu)
+            max_iops: Limit sprawdzanych sektorów na sekundę (None - bez limitu)
+            continuous: Czy po zakończeniu przebiegu rozpoczynać kolejny
+            interval: Przerwa między przebiegami w trybie ciągłym (sekundy)
+        """
+        super().__init__(name="raid-scrubber", daemon=True)
+        self.controller = controller
+        self.batch_sectors = batch_sectors
+        self.continuous = continuous
+        self.interval = interval
+        self.total_sectors = controller.num_sectors
+        self.state = 'pending'
+
+        self._cursor = 0
+        self._bandwidth = TokenBucket(max_bytes_per_sec)
+        self._iops = TokenBucket(max_iops)
+        self._stop_event = threading.Event()
+
+        self.passes = 0
+        self.checksum_errors = 0
+        self.parity_errors = 0
+        self.repaired = 0
+        self.unrepaired = 0
+        self.started_at: Optional[float] = None
+
+    def run(self):
+        """
+        Główna pętla przeglądu.
+        """
+        self.state = 'running'
+        self.started_at = time.time()
+        logging.info("Scrub started")
+        while not self._stop_event.is_set():
+            self._scrub_pass()
+            if self._stop_event.is_set():
+                break
+            self.passes += 1
+            logging.info(f"Scrub pass {self.passes} finished: {self.checksum_errors} checksum errors, "
+                         f"{self.parity_errors} parity errors, {self.repaired} repaired, "
+                         f"{self.unrepaired} unrepaired")
+            if not self.continuous or self._stop_event.wait(self.interval):
+                break
+        self.state = 'stopped' if self._stop_event.is_set() else 'completed'
+
+    def _scrub_pass(self):
+        self._cursor = 0
+        row_bytes = self.controller.sector_size * self.controller.num_disks
+        while self._cursor < self.total_sectors and not self._stop_event.is_set():
+            batch = range(self._cursor, min(self._cursor + self.batch_sectors, self.total_sectors))
+            self._iops.consume(len(batch))
+            self._bandwidth.consume(len(batch) * row_bytes)
+
+            with self.controller._locked(batch):
+                result = self.controller._scrub_sectors(batch)
+            self.checksum_errors += result['checksum_errors']
+            self.parity_errors += result['parity_errors']
+            self.repaired += result['repaired']
+            self.unrepaired += result['unrepaired']
+            self._cursor = batch.stop
+
+    def stop(self):
+        """
+        Zatrzymuje przegląd po bieżącej partii.
+        """
+        self._stop_event.set()
+
+    def progress(self) -> dict:
+        """
+        Zwraca postęp bieżącego przebiegu oraz liczniki wykrytych i naprawionych błędów.
+        """
+        return {
+            'state': self.state,
+            'passes': self.passes,
+            'scrubbed_sectors': self._cursor,
+            'total_sectors': self.total_sectors,
+            'percent': 100.0 * self._cursor / self.total_sectors if self.total_sectors else 100.0,
+            'checksum_errors': self.checksum_errors,
+            'parity_errors': self.parity_errors,
+            'repaired': self.repaired,
+            'unrepaired': self.unrepaired,
+        }
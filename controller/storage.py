@@ -0,0 +1,36 @@
+import logging
+import mmap
+import os
+
+
+def open_disk_image(path: str, size: int) -> mmap.mmap:
+    """
+    Otwiera (lub tworzy) obraz dysku jako rzadki plik mapowany do pamięci.
+
+    Plik jest jedynie powiększany przez ftruncate, więc system plików nie alokuje
+    bloków, dopóki nic do nich nie zapisano. Strony są ładowane leniwie przy
+    pierwszym dostępie, a istniejąca zawartość pliku jest zachowywana, dzięki czemu
+    po ponownym uruchomieniu nie trzeba niczego wczytywać.
+
+    Args:
+        path: Ścieżka do pliku obrazu dysku
+        size: Rozmiar obrazu w bajtach
+
+    Returns:
+        mmap.mmap: Zmapowany obraz dysku (obsługuje wycinki jak bytearray)
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        image = mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)
+    finally:
+        # mmap przechowuje własny deskryptor, nasz można od razu zamknąć
+        os.close(fd)
+
+    # Dostęp do sektorów jest losowy - wyłączamy agresywny odczyt z wyprzedzeniem
+    if hasattr(image, 'madvise') and hasattr(mmap, 'MADV_RANDOM'):
+        image.madvise(mmap.MADV_RANDOM)
+
+    logging.info(f"Mapped disk image {path} ({size} bytes)")
+    return image
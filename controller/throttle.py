@@ -0,0 +1,38 @@
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Prosty ogranicznik szybkości (token bucket) dla zadań działających w tle,
+    np. odbudowy dysku. Pozwala na krótkie serie do wielkości jednej sekundy limitu,
+    a przy jego przekroczeniu usypia wywołujący wątek.
+    """
+
+    def __init__(self, rate: Optional[float]):
+        """
+        Args:
+            rate: Limit jednostek (bajtów, operacji) na sekundę; None lub 0 wyłącza limit
+        """
+        self.rate = rate
+        self._allowance = rate or 0.0
+        self._last = time.monotonic()
+
+    def consume(self, amount: float):
+        """
+        Pobiera `amount` jednostek, czekając, jeśli limit został wyczerpany.
+
+        Args:
+            amount: Liczba jednostek do zużycia
+        """
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+        self._last = now
+        if self._allowance >= amount:
+            self._allowance -= amount
+            return
+        time.sleep((amount - self._allowance) / self.rate)
+        self._allowance = 0.0
+        self._last = time.monotonic()
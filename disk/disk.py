@@ -1,47 +1,230 @@
 import threading
-from dataclasses import dataclass
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from typing import List, Optional
 
+import numpy as np
+
+from controller.checksum import ChecksumError, crc32_rows, fragment_checksum
+
 @dataclass
 class Sector:
     index: int
     data: bytearray
     checksum: int
 
+@dataclass
+class IORequest:
+    """
+    Żądanie I/O oczekujące w kolejce dysku.
+    """
+    operation: str
+    sector_idx: int
+    data: Optional[bytes] = None
+    deadline: float = 0.0
+    future: Future = field(default_factory=Future)
+
 class Disk(threading.Thread):
-    def __init__(self, disk_id: int, sector_size: int = 32, sector_count: int = 128):
-        super().__init__()
+    """
+    Dysk jako wątek roboczy I/O. Żądania trafiają do kolejki (submit_read/submit_write)
+    i są obsługiwane w tle, a wynik zwracany jest przez Future. Bezczynny wątek śpi
+    na zmiennej warunkowej zamiast aktywnie czekać.
+
+    Kolejność obsługi to algorytm windy (SCAN) z terminami (deadline): żądania są
+    obsługiwane w kierunku ruchu głowicy, ale żądanie, którego termin minął, ma
+    pierwszeństwo - odczyty mają krótszy termin niż zapisy, więc nie są zagładzane.
+    """
+
+    def __init__(self, disk_id: int, sector_size: int = 32, sector_count: int = 128,
+                 read_deadline: float = 0.05, write_deadline: float = 0.5):
+        """
+        Args:
+            disk_id: Numer dysku
+            sector_size: Rozmiar sektora w bajtach
+            sector_count: Liczba sektorów
+            read_deadline: Maksymalny czas oczekiwania odczytu w kolejce (sekundy)
+            write_deadline: Maksymalny czas oczekiwania zapisu w kolejce (sekundy)
+        """
+        super().__init__(name=f"disk{disk_id}", daemon=True)
         self.disk_id = disk_id
         self.sector_size = sector_size
         self.sector_count = sector_count
-        self.sectors: List[Optional[Sector]] = [None] * sector_count
         self.is_failed = False
+        self.read_deadline = read_deadline
+        self.write_deadline = write_deadline
         self._stop_event = threading.Event()
-        
+
+        self._pending: List[IORequest] = []
+        self._queue_cond = threading.Condition()
+        self._head = 0
+        self._direction = 1
+
+        # Zwarty magazyn sektorów: jeden ciągły bufor danych, bitmapa zajętości
+        # (bit na sektor) oraz tablica sum kontrolnych - bez obiektu na każdy sektor
+        self._data = bytearray(sector_size * sector_count)
+        self._occupied = np.zeros((sector_count + 7) // 8, dtype=np.uint8)
+        self._checksums = np.zeros(sector_count, dtype=np.uint32)
+        self._used = 0
+        self._store_lock = threading.Lock()
+
     def run(self):
         """
-        Jeśli potrzebujesz, możesz tutaj zaimplementować logikę wątku dysku.
-        Obecnie pusto.
+        Pętla obsługi kolejki żądań: czeka na żądania i wykonuje je w kolejności
+        wyznaczonej przez planistę. Po zatrzymaniu pozostałe żądania kończą się błędem.
         """
-        while not self._stop_event.is_set():
-            # Tu jakaś logika np. obsługa I/O
-            pass
-        
+        while True:
+            with self._queue_cond:
+                while not self._pending and not self._stop_event.is_set():
+                    self._queue_cond.wait()
+                if self._stop_event.is_set():
+                    pending, self._pending = self._pending, []
+                    break
+                request = self._next_request()
+            self._execute(request)
+
+        for request in pending:
+            request.future.set_exception(IOError(f"disk {self.disk_id} stopped"))
+
     def stop(self):
         """
         Bezpieczne zatrzymanie wątku.
         """
-        self._stop_event.set()
+        with self._queue_cond:
+            self._stop_event.set()
+            self._queue_cond.notify_all()
+
+    def submit(self, operation: str, sector_idx: int, data: Optional[bytes] = None) -> Future:
+        """
+        Dodaje żądanie do kolejki dysku.
+
+        Args:
+            operation: 'read' lub 'write'
+            sector_idx: Numer sektora
+            data: Dane do zapisania (dla 'write')
+
+        Returns:
+            Future: Wynik read_sector (dla 'read') lub write_sector (dla 'write')
+        """
+        if operation not in ('read', 'write'):
+            raise ValueError(f"Unsupported disk operation: {operation}")
+        timeout = self.read_deadline if operation == 'read' else self.write_deadline
+        request = IORequest(operation, sector_idx, data, time.monotonic() + timeout)
+        with self._queue_cond:
+            if self._stop_event.is_set():
+                request.future.set_exception(IOError(f"disk {self.disk_id} stopped"))
+                return request.future
+            self._pending.append(request)
+            self._queue_cond.notify()
+        return request.future
+
+    def submit_read(self, sector_idx: int) -> Future:
+        return self.submit('read', sector_idx)
+
+    def submit_write(self, sector_idx: int, data: bytes) -> Future:
+        return self.submit('write', sector_idx, data)
+
+    def queue_depth(self) -> int:
+        """
+        Zwraca liczbę żądań oczekujących w kolejce.
+        """
+        with self._queue_cond:
+            return len(self._pending)
+
+    def _next_request(self) -> IORequest:
+        """
+        Wybiera kolejne żądanie (wywoływane z zajętą blokadą kolejki): najpierw żądanie
+        z przekroczonym terminem, w przeciwnym razie najbliższe w kierunku ruchu głowicy;
+        gdy w tym kierunku nic nie ma, kierunek jest odwracany.
+        """
+        urgent = min(self._pending, key=lambda r: r.deadline)
+        if urgent.deadline <= time.monotonic():
+            request = urgent
+        else:
+            ahead = [r for r in self._pending if (r.sector_idx - self._head) * self._direction >= 0]
+            if not ahead:
+                self._direction = -self._direction
+                ahead = self._pending
+            request = min(ahead, key=lambda r: (abs(r.sector_idx - self._head), r.deadline))
+        self._pending.remove(request)
+        self._head = request.sector_idx
+        return request
+
+    def _execute(self, request: IORequest):
+        if not request.future.set_running_or_notify_cancel():
+            return
+        try:
+            if self.is_failed:
+                raise IOError(f"disk {self.disk_id} failed")
+            if request.operation == 'read':
+                result = self.read_sector(request.sector_idx)
+            else:
+                result = self.write_sector(request.sector_idx, request.data)
+            request.future.set_result(result)
+        except Exception as e:
+            request.future.set_exception(e)
+
+    def is_occupied(self, sector_idx: int) -> bool:
+        """
+        Sprawdza, czy sektor był kiedykolwiek zapisany.
+        """
+        return bool(self._occupied[sector_idx >> 3] & (1 << (sector_idx & 7)))
+
+    def used_sectors(self) -> int:
+        """
+        Zwraca liczbę zapisanych sektorów (licznik utrzymywany przy zapisie, bez przeglądania dysku).
+        """
+        return self._used
 
     def read_sector(self, sector_idx: int) -> Optional[Sector]:
-        # Implementacja odczytu sektora (przykład)
-        if 0 <= sector_idx < self.sector_count:
-            return self.sectors[sector_idx]
-        return None
-        
+        """
+        Odczytuje sektor. Zwracany Sector zawiera kopię danych, więc jego modyfikacja
+        nie zmienia zawartości dysku.
+
+        Returns:
+            Optional[Sector]: Sektor lub None, jeśli numer jest poza zakresem albo sektor nie był zapisany
+
+        Raises:
+            ChecksumError: Gdy dane sektora nie zgadzają się z sumą kontrolną
+        """
+        if not 0 <= sector_idx < self.sector_count or not self.is_occupied(sector_idx):
+            return None
+        start = sector_idx * self.sector_size
+        with self._store_lock:
+            sector = Sector(index=sector_idx, data=self._data[start:start + self.sector_size],
+                            checksum=int(self._checksums[sector_idx]))
+        if fragment_checksum(sector.data) != sector.checksum:
+            raise ChecksumError(f"disk {self.disk_id} sector {sector_idx}: checksum mismatch")
+        return sector
+
     def write_sector(self, sector_idx: int, data: bytearray) -> bool:
-        # Implementacja zapisu sektora (przykład)
-        if 0 <= sector_idx < self.sector_count:
-            self.sectors[sector_idx] = Sector(index=sector_idx, data=data, checksum=0)
-            return True
-        return False
+        """
+        Zapisuje sektor, kopiując dane do magazynu dysku (krótsze dane są dopełniane zerami).
+
+        Returns:
+            bool: True jeśli zapis się powiódł, False dla numeru spoza zakresu lub zbyt długich danych
+        """
+        if not 0 <= sector_idx < self.sector_count or len(data) > self.sector_size:
+            return False
+        start = sector_idx * self.sector_size
+        with self._store_lock:
+            self._data[start:start + len(data)] = data
+            self._data[start + len(data):start + self.sector_size] = bytes(self.sector_size - len(data))
+            self._checksums[sector_idx] = fragment_checksum(memoryview(self._data)[start:start + self.sector_size])
+            if not self.is_occupied(sector_idx):
+                self._occupied[sector_idx >> 3] |= 1 << (sector_idx & 7)
+                self._used += 1
+        return True
+
+    def verify_sectors(self) -> List[int]:
+        """
+        Sprawdza sumy kontrolne wszystkich zapisanych sektorów jednym przebiegiem wektorowym.
+
+        Returns:
+            List[int]: Numery sektorów, których dane nie zgadzają się z sumą kontrolną
+        """
+        with self._store_lock:
+            rows = np.frombuffer(self._data, dtype=np.uint8).reshape(self.sector_count, self.sector_size)
+            mismatched = crc32_rows(rows) != self._checksums
+        occupied = np.unpackbits(self._occupied, bitorder='little')[:self.sector_count].astype(bool)
+        return np.flatnonzero(mismatched & occupied).tolist()
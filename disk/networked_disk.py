@@ -1,53 +1,149 @@
 #/disk/networked_disk.py
 
 from disk.disk import Disk
-import socket
-import json
 import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+from network.connection_pool import ConnectionPool, PooledConnection
 from network.messages import DiskMessage
+from stats.disk_stats import DiskStats
 
 class NetworkedDisk(Disk):
     def __init__(self, disk_id: int, sector_size: int = 32, sector_count: int = 128):
         super().__init__(disk_id, sector_size, sector_count)
         self.stats = DiskStats()
-        self.network = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.connected = False
+        self.pool: Optional[ConnectionPool] = None
 
-    def connect_to_controller(self, host: str, port: int):
+    @property
+    def connected(self) -> bool:
+        return self.pool is not None and self.pool.healthy() > 0
+
+    def connect_to_controller(self, host: str, port: int, pool_size: int = 2, connect_timeout: float = 5.0,
+                              **pool_options) -> bool:
+        """
+        Łączy dysk z kontrolerem pulą połączeń, która sama odnawia zerwane połączenia.
+
+        Args:
+            host: Adres serwera kontrolera
+            port: Port serwera kontrolera
+            pool_size: Liczba równoległych połączeń z kontrolerem
+            connect_timeout: Czas oczekiwania na pierwsze połączenie (sekundy)
+            pool_options: Dodatkowe parametry ConnectionPool (kontrola stanu, odstępy ponownych prób)
+
+        Returns:
+            bool: True, jeśli w wyznaczonym czasie nawiązano co najmniej jedno połączenie
+                (w przeciwnym razie pula nadal próbuje połączyć się w tle)
+        """
+        self.disconnect()
+        self.pool = ConnectionPool(self.disk_id, host, port, self._handle_message, size=pool_size,
+                                   connect_timeout=connect_timeout, **pool_options)
+        self.pool.start()
+        return self.pool.wait_connected(connect_timeout)
+
+    def disconnect(self):
+        """
+        Zamyka wszystkie połączenia z kontrolerem.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def _handle_message(self, message: DiskMessage, connection: Optional[PooledConnection] = None):
+        """
+        Obsługuje żądanie kontrolera. Gdy wątek dysku działa, odczyty i zapisy trafiają
+        do jego kolejki (mogą zostać wykonane w innej kolejności niż przyszły), a
+        odpowiedź z tym samym request_id wysyłana jest po ich zakończeniu. Operacja
+        wsadowa rozbijana jest na sektory, a odpowiedź wysyłana po zakończeniu wszystkich.
+        """
+        start_time = time.time()
+        if message.operation in ('read', 'write'):
+            future = self._start(message.operation, message.sector, message.data)
+        elif message.operation in ('read_batch', 'write_batch') and message.sectors:
+            operation = message.operation[:-len('_batch')]
+            size = len(message.data) // len(message.sectors) if message.data else 0
+            future = self._gather([
+                self._start(operation, sector, message.data[k * size:(k + 1) * size] if message.data else None)
+                for k, sector in enumerate(message.sectors)
+            ])
+        else:
+            future = Future()
+            future.set_exception(ValueError(f"Unsupported operation: {message.operation}"))
+        future.add_done_callback(lambda done: self._send_response(message, connection, start_time, done))
+
+    def _start(self, operation: str, sector_idx: int, data=None) -> Future:
+        """
+        Rozpoczyna operację na sektorze: przez kolejkę dysku, jeśli jego wątek działa,
+        a w przeciwnym razie od razu, w bieżącym wątku.
+        """
+        if self.is_alive():
+            return self.submit(operation, sector_idx, data)
+        future = Future()
         try:
-            self.network.connect((host, port))
-            self.connected = True
-            threading.Thread(target=self._listen_for_messages).start()
-        except:
-            self.connected = False
-
-    def _listen_for_messages(self):
-        while self.connected:
+            if operation == 'read':
+                future.set_result(self.read_sector(sector_idx))
+            else:
+                future.set_result(self.write_sector(sector_idx, data))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    @staticmethod
+    def _gather(futures: List[Future]) -> Future:
+        """
+        Łączy wyniki wielu operacji: zwraca Future z listą wyników albo z pierwszym błędem.
+        """
+        combined = Future()
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
             try:
-                data = self.network.recv(1024)
-                if not data:
-                    break
-                message = DiskMessage(**json.loads(data.decode()))
-                self._handle_message(message)
-            except:
-                break
-        self.connected = False
-
-    def _handle_message(self, message: DiskMessage):
-        start_time = time.time()
+                combined.set_result([future.result() for future in futures])
+            except Exception as e:
+                combined.set_exception(e)
+
+        for future in futures:
+            future.add_done_callback(done)
+        return combined
+
+    def _send_response(self, message: DiskMessage, connection: Optional[PooledConnection], start_time: float,
+                       future: Future):
         try:
+            result = future.result()
             if message.operation == 'read':
-                sector = self.read_sector(message.sector)
-                response = DiskMessage('read_response', self.disk_id, 
-                                    data=sector.data if sector else None)
+                response = DiskMessage('read_response', self.disk_id, sector=message.sector,
+                                       data=bytes(result.data) if result else None,
+                                       request_id=message.request_id)
             elif message.operation == 'write':
-                success = self.write_sector(message.sector, message.data)
-                response = DiskMessage('write_response', self.disk_id, data=success)
+                response = DiskMessage('write_response', self.disk_id, sector=message.sector, data=result,
+                                       request_id=message.request_id)
+            elif message.operation == 'read_batch':
+                # Niezapisane sektory odsyłane są jako zera, więc każdy ma w odpowiedzi pełny rozmiar
+                data = b''.join(bytes(sector.data) if sector else bytes(self.sector_size) for sector in result)
+                response = DiskMessage('read_batch_response', self.disk_id, data=data,
+                                       request_id=message.request_id, sectors=message.sectors)
+            else:
+                response = DiskMessage('write_batch_response', self.disk_id, data=all(result),
+                                       request_id=message.request_id, sectors=message.sectors)
         except Exception as e:
-            response = DiskMessage('error', self.disk_id, data=str(e))
+            response = DiskMessage('error', self.disk_id, sector=message.sector, data=str(e),
+                                   request_id=message.request_id)
 
         latency = time.time() - start_time
-        self.stats.add_operation(message.operation, len(message.data) if message.data else 0, latency)
-        
-        if self.connected:
-            self.network.send(json.dumps(asdict(response)).encode())
+        if message.operation in ('read_batch', 'write_batch') and message.sectors:
+            size = len(message.data) // len(message.sectors) if message.data else 0
+            for _ in message.sectors:
+                self.stats.add_operation(message.operation[:-len('_batch')], size, latency)
+        else:
+            self.stats.add_operation(message.operation, len(message.data) if message.data else 0, latency)
+
+        # Odpowiedź wraca połączeniem, którym przyszło żądanie, a gdy zostało zerwane -
+        # innym połączeniem puli; bez żadnego połączenia kontroler ponowi żądanie sam
+        pool = self.pool
+        if pool is not None:
+            pool.send(response, preferred=connection)
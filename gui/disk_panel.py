@@ -1,5 +1,5 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QPushButton, QProgressBar
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 
 class DiskPanel(QWidget):
     def __init__(self, controller):
@@ -14,6 +14,11 @@ class DiskPanel(QWidget):
         self.controller = controller
         self.init_ui()
 
+        # Stan dysków i postęp odbudowy odświeżane co sekundę
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_status)
+        self.status_timer.start(1000)
+
     def init_ui(self):
         """
         Inicjalizuje elementy graficzne panelu, takie jak pasek postępu dla każdego dysku,
@@ -21,8 +26,9 @@ class DiskPanel(QWidget):
         """
         layout = QVBoxLayout(self)
         self.disk_widgets = []
+        self.rebuild_labels = []
 
-        for disk_id in range(len(self.controller.shared_memory)):
+        for disk_id in range(self.controller.num_disks):
             disk_layout = QHBoxLayout()
             
             # Etykieta identyfikatora dysku
@@ -43,29 +49,33 @@ class DiskPanel(QWidget):
             repair_button = QPushButton("Repair Disk")
             repair_button.clicked.connect(lambda _, d=disk_id: self.repair_disk(d))
 
+            # Etykieta postępu odbudowy dysku
+            rebuild_label = QLabel("")
+
             # Dodanie elementów do layoutu
             disk_layout.addWidget(label)
             disk_layout.addWidget(progress_bar)
             disk_layout.addWidget(inject_error_button)
             disk_layout.addWidget(repair_button)
+            disk_layout.addWidget(rebuild_label)
 
             layout.addLayout(disk_layout)
             self.disk_widgets.append((progress_bar, inject_error_button, repair_button))
+            self.rebuild_labels.append(rebuild_label)
 
         self.setLayout(layout)
 
     def update_status(self):
         """
         Aktualizuje stan dysków na podstawie danych z kontrolera RAID, w tym postęp użycia sektorów
-        oraz status awarii.
+        oraz status awarii i odbudowy.
         """
+        disk_status = self.controller.get_disk_status()
         for disk_id, (progress_bar, inject_error_button, repair_button) in enumerate(self.disk_widgets):
-            disk_stats = self.controller.get_disk_status()[disk_id]
-            
+            disk_stats = disk_status[disk_id]
+
             # Aktualizacja paska postępu
-            used_sectors = disk_stats['stats']['total_bytes_written'] / (
-                self.controller.sector_size * self.controller.num_sectors
-            ) * 100
+            used_sectors = disk_stats['used_sectors'] / self.controller.num_sectors * 100
             progress_bar.setValue(int(used_sectors))
 
             # Aktualizacja przycisków w zależności od statusu dysku
@@ -73,11 +83,34 @@ class DiskPanel(QWidget):
                 inject_error_button.setEnabled(False)
                 repair_button.setEnabled(True)
                 progress_bar.setStyleSheet("QProgressBar::chunk { background-color: red; }")
+            elif disk_stats['state'] == 'rebuilding':
+                inject_error_button.setEnabled(True)
+                repair_button.setEnabled(False)
+                progress_bar.setStyleSheet("QProgressBar::chunk { background-color: orange; }")
             else:
                 inject_error_button.setEnabled(True)
                 repair_button.setEnabled(False)
                 progress_bar.setStyleSheet("")
 
+        self.update_rebuild_progress()
+
+    def update_rebuild_progress(self):
+        """
+        Aktualizuje etykiety postępu odbudowy dysków (procent oraz szacowany czas do końca).
+        """
+        for disk_id, rebuild_label in enumerate(self.rebuild_labels):
+            progress = self.controller.get_rebuild_progress(disk_id)
+            if progress is None:
+                rebuild_label.setText("")
+            elif progress['state'] == 'running':
+                eta = progress['eta_seconds']
+                eta_text = f"{eta:.0f}s" if eta is not None else "?"
+                rebuild_label.setText(f"Rebuild {progress['percent']:.1f}% (ETA {eta_text})")
+            elif progress['state'] == 'completed':
+                rebuild_label.setText(f"Rebuilt in {progress['elapsed_seconds']:.1f}s")
+            else:
+                rebuild_label.setText(f"Rebuild {progress['state']} at {progress['percent']:.1f}%")
+
     def inject_error(self, disk_id):
         """
         Wstrzykuje błąd do wybranego dysku.
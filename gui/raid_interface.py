@@ -84,9 +84,12 @@ class VisualizationPanel(QWidget):
         """
         while True:
             try:
-                # Aktualizacja statystyk RAID
-                throughput = sum(disk.stats.get_throughput() for disk in self.controller.shared_memory) / len(self.controller.shared_memory)
-                error_rate = sum(disk.stats.get_error_rate() for disk in self.controller.shared_memory) / len(self.controller.shared_memory)
+                # Aktualizacja statystyk RAID: przepustowość operacji logicznych macierzy
+                # oraz łączna częstość błędów wszystkich dysków
+                for stats in self.controller.disk_stats + [self.controller.array_stats]:
+                    stats.update_throughput()
+                throughput = self.controller.array_stats.get_throughput()
+                error_rate = sum(stats.get_error_rate() for stats in self.controller.disk_stats)
 
                 # Aktualizacja tekstów
                 self.throughput_label.setText(f"Throughput: {throughput:.2f} MB/s")
@@ -4,7 +4,7 @@
 from PyQt6.QtWidgets import QWidget, QGridLayout
 #from PyQt6.QtChart import QChart, QChartView, QLineSeries
 import datetime
-from controller.raid_controller import RaidController
+from controller.raid_controller import RAIDController
 
 class DataVisualization(QWidget):
     def __init__(self, controller: RAIDController):
@@ -25,7 +25,7 @@ class DataVisualization(QWidget):
         usage_layout = QGridLayout(self.disk_usage)
         self.usage_bars = []
         
-        for i, disk in enumerate(self.controller.disks):
+        for i in range(self.controller.num_disks):
             label = QLabel(f"Disk {i} Usage")
             progress = QProgressBar()
             self.usage_bars.append(progress)
@@ -62,22 +62,21 @@ class DataVisualization(QWidget):
         current_time = datetime.datetime.now()
         
         # Update charts
-        for disk in self.controller.disks:
+        for stats in self.controller.disk_stats:
             # Throughput
             self.throughput_chart.chart().series()[0].append(
-                current_time.timestamp(), disk.stats.get_throughput())
+                current_time.timestamp(), stats.get_throughput())
             
             # Latency
             self.latency_chart.chart().series()[0].append(
-                current_time.timestamp(), disk.stats.get_average_latency() * 1000)
+                current_time.timestamp(), stats.get_average_latency() * 1000)
             
             # Error rate
             self.error_chart.chart().series()[0].append(
-                current_time.timestamp(), disk.stats.get_error_rate())
+                current_time.timestamp(), stats.get_error_rate())
         
         # Update usage bars
-        for i, disk in enumerate(self.controller.disks):
-            used_sectors = sum(1 for sector in disk.sectors if sector is not None)
-            usage_percentage = (used_sectors / disk.sector_count) * 100
+        for i, status in enumerate(self.controller.get_disk_status()):
+            usage_percentage = (status['used_sectors'] / self.controller.num_sectors) * 100
             self.usage_bars[i].setValue(int(usage_percentage))
 
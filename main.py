@@ -14,8 +14,8 @@ def initialize_components():
     network.start_server()
 
     logging.info("Initializing RAID Controller...")
-    # Uproszczona wersja: RAID0, 4 dyski
-    controller = RAIDController('RAID0', num_disks=4)
+    # Uproszczona wersja: RAID0, 4 dyski; statystyki dla GUI wymagają włączonej instrumentacji
+    controller = RAIDController('RAID0', num_disks=4, instrumentation=True)
     return network, controller
 
 def shutdown_components(network, controller):
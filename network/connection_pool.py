@@ -0,0 +1,201 @@
+import socket
+import threading
+import time
+from typing import Callable, List, Optional
+
+from network.messages import DiskMessage, MessageReader, ProtocolError, send_message
+
+
+class PooledConnection:
+    """
+    Jedno połączenie puli: gniazdo (None, gdy rozłączone), blokada wysyłania
+    i znaczniki czasu potrzebne do kontroli stanu.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.sock: Optional[socket.socket] = None
+        self.last_received = 0.0
+        self.ping_sent: Optional[float] = None
+        self._send_lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    def send(self, message: DiskMessage) -> bool:
+        """
+        Wysyła wiadomość tym połączeniem.
+
+        Returns:
+            bool: False, jeśli połączenie jest zamknięte lub wysłanie się nie powiodło
+        """
+        sock = self.sock
+        if sock is None:
+            return False
+        try:
+            with self._send_lock:
+                send_message(sock, message)
+            return True
+        except OSError:
+            self.shutdown()
+            return False
+
+    def shutdown(self):
+        """
+        Zrywa połączenie; wątek połączenia wykrywa to przy odczycie i łączy się ponownie.
+        """
+        sock = self.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class ConnectionPool:
+    """
+    Pula połączeń dysku z kontrolerem.
+
+    Każde połączenie obsługuje własny wątek: łączy się z serwerem, przedstawia się
+    wiadomością 'hello' (z numerem połączenia w polu sector), a następnie odbiera
+    żądania. Zerwane połączenie jest nawiązywane ponownie z wykładniczo rosnącym
+    odstępem między próbami. Wątek kontroli stanu wysyła 'ping' na połączeniach,
+    którymi od dłuższego czasu nic nie przyszło, i zrywa te, które nie odpowiedziały.
+    """
+
+    def __init__(self, disk_id: int, host: str, port: int, handler: Callable[[DiskMessage, PooledConnection], None],
+                 size: int = 2, health_interval: float = 1.0, health_timeout: Optional[float] = None,
+                 initial_backoff: float = 0.1, max_backoff: float = 5.0, connect_timeout: float = 5.0):
+        """
+        Args:
+            disk_id: Numer dysku
+            host: Adres serwera kontrolera
+            port: Port serwera kontrolera
+            handler: Funkcja wywoływana dla każdej odebranej wiadomości (wiadomość, połączenie)
+            size: Liczba połączeń w puli
+            health_interval: Czas bezczynności połączenia, po którym wysyłany jest 'ping' (sekundy)
+            health_timeout: Czas oczekiwania na odpowiedź na 'ping' (domyślnie 2 * health_interval)
+            initial_backoff: Odstęp przed pierwszą ponowną próbą połączenia (sekundy)
+            max_backoff: Maksymalny odstęp między próbami połączenia (sekundy)
+            connect_timeout: Limit czasu pojedynczej próby połączenia (sekundy)
+        """
+        self.disk_id = disk_id
+        self.host = host
+        self.port = port
+        self.handler = handler
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout if health_timeout is not None else 2 * health_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        self.connections: List[PooledConnection] = [PooledConnection(i) for i in range(size)]
+        self.reconnects = 0
+        self._closed = threading.Event()
+        self._next = 0
+
+    def start(self):
+        """
+        Uruchamia wątki połączeń i wątek kontroli stanu.
+        """
+        for connection in self.connections:
+            threading.Thread(target=self._run_connection, args=(connection,),
+                             name=f"disk{self.disk_id}-conn{connection.index}", daemon=True).start()
+        threading.Thread(target=self._health_loop, name=f"disk{self.disk_id}-health", daemon=True).start()
+
+    def wait_connected(self, timeout: float) -> bool:
+        """
+        Czeka, aż co najmniej jedno połączenie zostanie nawiązane.
+        """
+        deadline = time.monotonic() + timeout
+        while not self.healthy():
+            if time.monotonic() >= deadline or self._closed.is_set():
+                return False
+            time.sleep(0.01)
+        return True
+
+    def healthy(self) -> int:
+        """
+        Zwraca liczbę nawiązanych połączeń.
+        """
+        return sum(connection.connected for connection in self.connections)
+
+    def send(self, message: DiskMessage, preferred: Optional[PooledConnection] = None) -> bool:
+        """
+        Wysyła wiadomość preferowanym połączeniem (zwykle tym, którym przyszło żądanie),
+        a gdy jest ono zerwane - kolejnym działającym połączeniem puli.
+
+        Returns:
+            bool: False, jeśli żadne połączenie nie jest dostępne
+        """
+        if preferred is not None and preferred.send(message):
+            return True
+        self._next += 1
+        for k in range(len(self.connections)):
+            connection = self.connections[(self._next + k) % len(self.connections)]
+            if connection is not preferred and connection.send(message):
+                return True
+        return False
+
+    def close(self):
+        """
+        Zamyka wszystkie połączenia i zatrzymuje ponowne łączenie.
+        """
+        self._closed.set()
+        for connection in self.connections:
+            connection.shutdown()
+
+    def _run_connection(self, connection: PooledConnection):
+        backoff = self.initial_backoff
+        while not self._closed.is_set():
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+                sock.settimeout(None)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                send_message(sock, DiskMessage('hello', self.disk_id, sector=connection.index))
+            except OSError as e:
+                print(f"Disk {self.disk_id} connection {connection.index} failed: {e}; "
+                      f"retrying in {backoff:.2f}s")
+                if self._closed.wait(backoff):
+                    break
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = self.initial_backoff
+            connection.last_received = time.monotonic()
+            connection.ping_sent = None
+            connection.sock = sock
+            if self._closed.is_set():
+                connection.shutdown()
+            try:
+                reader = MessageReader(sock)
+                while True:
+                    message = reader.read_message()
+                    if message is None:
+                        break
+                    connection.last_received = time.monotonic()
+                    connection.ping_sent = None
+                    if message.operation != 'pong':
+                        self.handler(message, connection)
+            except (OSError, ProtocolError) as e:
+                if not self._closed.is_set():
+                    print(f"Disk {self.disk_id} connection {connection.index} lost: {e}")
+            finally:
+                connection.sock = None
+                sock.close()
+            if not self._closed.is_set():
+                self.reconnects += 1
+
+    def _health_loop(self):
+        while not self._closed.wait(self.health_interval / 2):
+            now = time.monotonic()
+            for connection in self.connections:
+                if not connection.connected:
+                    continue
+                if connection.ping_sent is not None:
+                    if now - connection.ping_sent > self.health_timeout:
+                        print(f"Disk {self.disk_id} connection {connection.index} failed health check")
+                        connection.shutdown()
+                elif now - connection.last_received >= self.health_interval:
+                    connection.ping_sent = now
+                    connection.send(DiskMessage('ping', self.disk_id))
@@ -1,13 +1,264 @@
 #/network/messages.py
 
-from dataclasses import dataclass
-from typing import Optional
+import asyncio
+import socket
+import struct
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
 import time
 
 @dataclass
 class DiskMessage:
-    operation: str  # 'read', 'write', 'status', 'error'
+    operation: str  # 'read', 'write', 'status', 'error', 'read_response', 'write_response', 'hello',
+                    # 'read_batch', 'write_batch', 'read_batch_response', 'write_batch_response', 'ping', 'pong'
     disk_id: int
     sector: Optional[int] = None
-    data: Optional[bytes] = None
-    timestamp: float = time.time()
\ No newline at end of file
+    data: Optional[Union[bytes, bool, str]] = None
+    timestamp: float = field(default_factory=time.time)
+    request_id: int = 0  # identyfikator żądania, powtarzany w odpowiedzi (0 - wiadomość bez odpowiedzi)
+    sectors: Optional[List[int]] = None  # numery sektorów operacji wsadowej; data to ich kolejne zawartości
+
+# Kody operacji przesyłane w nagłówku ramki; 'hello' to pierwsza wiadomość dysku po
+# połączeniu, w której dysk podaje swój stały identyfikator (i numer połączenia w swojej
+# puli w polu sector). Operacje wsadowe obejmują
+# wiele sektorów w jednej ramce (dane sektorów sklejone w kolejności listy sectors).
+# 'ping'/'pong' służą do kontroli stanu bezczynnych połączeń.
+OPERATIONS = ('read', 'write', 'status', 'error', 'read_response', 'write_response', 'hello',
+              'read_batch', 'write_batch', 'read_batch_response', 'write_batch_response', 'ping', 'pong')
+OPERATION_CODES = {operation: code for code, operation in enumerate(OPERATIONS)}
+
+# Typ zawartości pola data: brak, surowe bajty, wartość logiczna, tekst UTF-8
+DATA_NONE, DATA_BYTES, DATA_BOOL, DATA_TEXT = range(4)
+
+PROTOCOL_VERSION = 4
+
+# Nagłówek ramki: wersja, kod operacji, typ danych, (wyrównanie), numer dysku,
+# identyfikator żądania, numer sektora (-1 gdy brak), znacznik czasu, liczba numerów
+# sektorów operacji wsadowej, długość danych. Po nagłówku następuje tablica numerów
+# sektorów (uint32), a po niej dane.
+HEADER = struct.Struct('!BBBxIQqdII')
+SECTOR_NUMBER_SIZE = 4
+
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """
+    Ramka niezgodna z protokołem (zła wersja, nieznana operacja, zbyt duży ładunek).
+    """
+
+
+def encode_frame(message: DiskMessage) -> List[Union[bytes, memoryview]]:
+    """
+    Koduje wiadomość jako listę buforów ramki: nagłówek o stałej długości, tablicę
+    numerów sektorów (dla operacji wsadowych) i surowy ładunek. Bufory wysyłane są
+    osobno (sendmsg), więc dane sektorów nie są kopiowane do wspólnego bufora.
+
+    Args:
+        message: Wiadomość do zakodowania
+
+    Returns:
+        List: Kolejne bufory ramki
+    """
+    data = message.data
+    if data is None:
+        data_type, payload = DATA_NONE, b''
+    elif isinstance(data, bool):
+        data_type, payload = DATA_BOOL, b'\x01' if data else b'\x00'
+    elif isinstance(data, str):
+        data_type, payload = DATA_TEXT, data.encode()
+    else:
+        data_type, payload = DATA_BYTES, memoryview(data).cast('B')
+
+    operation = OPERATION_CODES.get(message.operation)
+    if operation is None:
+        raise ProtocolError(f"Unknown operation: {message.operation}")
+    sector = -1 if message.sector is None else message.sector
+    sectors = message.sectors or ()
+
+    header = HEADER.pack(PROTOCOL_VERSION, operation, data_type, message.disk_id, message.request_id,
+                         sector, message.timestamp, len(sectors), len(payload))
+    frame = [header]
+    if sectors:
+        frame.append(struct.pack(f'!{len(sectors)}I', *sectors))
+    if len(payload):
+        frame.append(payload)
+    return frame
+
+
+def encode_message(message: DiskMessage) -> bytes:
+    """
+    Koduje wiadomość jako jedną ciągłą ramkę.
+
+    Args:
+        message: Wiadomość do zakodowania
+
+    Returns:
+        bytes: Gotowa do wysłania ramka
+    """
+    return b''.join(encode_frame(message))
+
+
+def decode_header(header) -> tuple:
+    """
+    Dekoduje i sprawdza nagłówek ramki.
+
+    Returns:
+        tuple: (kod operacji, typ danych, numer dysku, identyfikator żądania, numer sektora,
+            znacznik czasu, liczba numerów sektorów, długość danych)
+
+    Raises:
+        ProtocolError: Gdy nagłówek jest niepoprawny
+    """
+    version, operation, data_type, disk_id, request_id, sector, timestamp, count, length = \
+        HEADER.unpack_from(header)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version: {version}")
+    if operation >= len(OPERATIONS):
+        raise ProtocolError(f"Unknown operation code: {operation}")
+    if length + count * SECTOR_NUMBER_SIZE > MAX_PAYLOAD:
+        raise ProtocolError(f"Payload too large: {length + count * SECTOR_NUMBER_SIZE}")
+    return operation, data_type, disk_id, request_id, sector, timestamp, count, length
+
+
+def payload_size(header: tuple) -> int:
+    """
+    Zwraca liczbę bajtów ramki następujących po nagłówku (tablica sektorów i dane).
+    """
+    return header[-2] * SECTOR_NUMBER_SIZE + header[-1]
+
+
+def decode_message(header: tuple, payload) -> DiskMessage:
+    """
+    Składa wiadomość z zdekodowanego nagłówka i ładunku (tablicy sektorów i danych).
+    """
+    operation, data_type, disk_id, request_id, sector, timestamp, count, _ = header
+    payload = memoryview(payload)
+    table_size = count * SECTOR_NUMBER_SIZE
+    sectors = list(struct.unpack_from(f'!{count}I', payload)) if count else None
+    data = _decode_data(data_type, payload[table_size:])
+    return DiskMessage(OPERATIONS[operation], disk_id, None if sector < 0 else sector, data, timestamp,
+                       request_id, sectors)
+
+
+def _decode_data(data_type: int, payload: memoryview):
+    if data_type == DATA_NONE:
+        return None
+    if data_type == DATA_BOOL:
+        return payload[0] != 0
+    if data_type == DATA_TEXT:
+        return str(payload, 'utf-8')
+    if data_type == DATA_BYTES:
+        return bytes(payload)
+    raise ProtocolError(f"Unknown data type: {data_type}")
+
+
+class MessageReader:
+    """
+    Odczytuje z gniazda pełne ramki protokołu. Dane odbierane są przez recv_into
+    do bufora wielokrotnego użytku, więc podzielone lub sklejone przez TCP ramki
+    są poprawnie składane.
+    """
+
+    def __init__(self, sock: socket.socket, max_payload: int = MAX_PAYLOAD):
+        """
+        Args:
+            sock: Połączone gniazdo
+            max_payload: Maksymalny akceptowany rozmiar ładunku ramki
+        """
+        self.sock = sock
+        self.max_payload = max_payload
+        self._buffer = bytearray(HEADER.size + 4096)
+
+    def _recv_exact(self, size: int, frame_start: bool) -> bool:
+        """
+        Wczytuje dokładnie `size` bajtów na początek bufora.
+
+        Returns:
+            bool: False, jeśli połączenie zamknięto przed początkiem ramki
+        """
+        if len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        view = memoryview(self._buffer)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:size])
+            if count == 0:
+                if frame_start and received == 0:
+                    return False
+                raise ConnectionError("Connection closed in the middle of a frame")
+            received += count
+        return True
+
+    def read_message(self) -> Optional[DiskMessage]:
+        """
+        Odczytuje kolejną wiadomość.
+
+        Returns:
+            Optional[DiskMessage]: Wiadomość lub None, jeśli połączenie zostało zamknięte
+
+        Raises:
+            ProtocolError: Gdy ramka jest niepoprawna
+        """
+        if not self._recv_exact(HEADER.size, frame_start=True):
+            return None
+        header = decode_header(self._buffer)
+        length = payload_size(header)
+        if length > self.max_payload:
+            raise ProtocolError(f"Payload too large: {length}")
+
+        self._recv_exact(length, frame_start=False)
+        return decode_message(header, memoryview(self._buffer)[:length])
+
+
+def send_buffers(sock: socket.socket, buffers: List[Union[bytes, memoryview]]):
+    """
+    Wysyła bufory jednym wywołaniem systemowym sendmsg (scatter-gather), powtarzając
+    je dla niewysłanej reszty, gdy jądro przyjęło tylko część danych. Na platformach
+    bez sendmsg bufory są sklejane i wysyłane przez sendall.
+    """
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(buffers))
+        return
+    pending = [memoryview(buffer).cast('B') for buffer in buffers if len(buffer)]
+    while pending:
+        sent = sock.sendmsg(pending)
+        while sent:
+            if sent >= len(pending[0]):
+                sent -= len(pending.pop(0))
+            else:
+                pending[0] = pending[0][sent:]
+                sent = 0
+
+
+def send_message(sock: socket.socket, message: DiskMessage):
+    """
+    Wysyła wiadomość jako jedną ramkę (nagłówek i dane jako osobne bufory).
+    """
+    send_buffers(sock, encode_frame(message))
+
+
+async def read_message_async(reader: asyncio.StreamReader) -> Optional[DiskMessage]:
+    """
+    Odczytuje kolejną wiadomość ze strumienia asyncio.
+
+    Returns:
+        Optional[DiskMessage]: Wiadomość lub None, jeśli połączenie zostało zamknięte między ramkami
+
+    Raises:
+        ProtocolError: Gdy ramka jest niepoprawna
+        ConnectionError: Gdy połączenie zostało zamknięte w środku ramki
+    """
+    try:
+        header_bytes = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ConnectionError("Connection closed in the middle of a frame") from e
+    header = decode_header(header_bytes)
+    length = payload_size(header)
+    try:
+        payload = await reader.readexactly(length) if length else b''
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError("Connection closed in the middle of a frame") from e
+    return decode_message(header, payload)
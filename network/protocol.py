@@ -1,81 +1,251 @@
-import json
+import asyncio
+import itertools
 import socket
 import threading
-from dataclasses import dataclass, asdict
-from typing import Dict, Optional
-import time
-
-@dataclass
-class DiskMessage:
-    operation: str  # 'read', 'write', 'status', 'error'
-    disk_id: int
-    sector: Optional[int] = None
-    data: Optional[bytes] = None
-    timestamp: float = time.time()
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from network.messages import (DiskMessage, MessageReader, ProtocolError, encode_frame, read_message_async,
+                              send_message)
+
+
+class _PendingRequest:
+    """
+    Żądanie oczekujące na odpowiedź dysku.
+    """
+    __slots__ = ('disk_id', 'connection', 'future', 'message', 'replays')
+
+    def __init__(self, disk_id: int, connection, future: Future, message: DiskMessage):
+        self.disk_id = disk_id
+        self.connection = connection
+        self.future = future
+        self.message = message
+        self.replays = 0
+
 
 class NetworkProtocol:
-    def __init__(self, host: str = 'localhost', port: int = 5000):
+    def __init__(self, host: str = 'localhost', port: int = 5000, mode: str = 'thread',
+                 max_outstanding: int = 32, max_replays: int = 2):
         """
         Obsługuje komunikację sieciową między kontrolerem RAID a procesami dysków.
 
+        Każdy dysk po połączeniu wysyła wiadomość 'hello' ze swoim identyfikatorem
+        i numerem połączenia w swojej puli, więc dysk zachowuje ten sam numer po
+        ponownym połączeniu i może utrzymywać kilka połączeń naraz. Żądania rozkładane
+        są na połączenia dysku po kolei (round-robin).
+
+        Żądania są potokowane: każde dostaje identyfikator (request_id), który dysk
+        powtarza w odpowiedzi, więc na jednym połączeniu może oczekiwać wiele żądań,
+        a odpowiedzi mogą wracać w dowolnej kolejności. Żądania oczekujące na zerwanym
+        połączeniu są wysyłane ponownie innym połączeniem dysku (odczyty i zapisy
+        całych sektorów są idempotentne), a gdy takiego nie ma - kończą się błędem.
+
         Args:
             host: Adres hosta serwera sieciowego.
             port: Port serwera sieciowego.
+            mode: 'thread' (wątek na połączenie, blokujące gniazda) lub 'asyncio'
+                (jedna pętla zdarzeń obsługująca wszystkie dyski).
+            max_outstanding: Maksymalna liczba żądań oczekujących na odpowiedź od jednego dysku.
+            max_replays: Ile razy żądanie może zostać wysłane ponownie po zerwaniu połączenia.
         """
+        if mode not in ('thread', 'asyncio'):
+            raise ValueError(f"Unsupported network mode: {mode}")
         self.host = host
         self.port = port
+        self.mode = mode
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.clients: Dict[int, socket.socket] = {}
+        # Połączenia dysków: numer dysku -> numer połączenia w puli dysku -> gniazdo
+        # (w trybie asyncio strumień zapisu)
+        self.clients: Dict[int, Dict[int, object]] = {}
         self.running = True
+        self._clients_lock = threading.Lock()
+        self._send_locks: Dict[socket.socket, threading.Lock] = {}
+        self._round_robin = itertools.count()
+
+        # Tryb asyncio: pętla zdarzeń działa we własnym wątku
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+
+        # Żądania oczekujące na odpowiedź (request_id -> żądanie); okno (semafor)
+        # ogranicza liczbę oczekujących żądań na dysk
+        self.max_outstanding = max_outstanding
+        self.max_replays = max_replays
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, _PendingRequest] = {}
+        self._pending_lock = threading.Lock()
+        self._windows: Dict[int, threading.BoundedSemaphore] = {}
 
     def start_server(self):
         """
         Uruchamia serwer sieciowy do obsługi komunikacji z procesami dysków.
         """
+        if self.mode == 'asyncio':
+            self._start_async_server()
+            return
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.socket.bind((self.host, self.port))
         self.socket.listen(5)
         threading.Thread(target=self._accept_connections, daemon=True).start()
         print(f"Server started on {self.host}:{self.port}")
 
+    def connected_disks(self) -> List[int]:
+        """
+        Zwraca identyfikatory aktualnie połączonych dysków.
+        """
+        with self._clients_lock:
+            return sorted(disk_id for disk_id, connections in self.clients.items() if connections)
+
+    def _register(self, disk_id: int, slot: int, connection):
+        """
+        Rejestruje połączenie dysku; połączenie o tym samym numerze w puli zastępuje poprzednie.
+
+        Returns:
+            Poprzednie połączenie o tym numerze lub None
+        """
+        with self._clients_lock:
+            connections = self.clients.setdefault(disk_id, {})
+            previous = connections.get(slot)
+            connections[slot] = connection
+            if self.mode == 'thread':
+                self._send_locks[connection] = threading.Lock()
+        return previous
+
+    def _unregister(self, disk_id: int, slot: int, connection) -> bool:
+        """
+        Wyrejestrowuje połączenie (jeśli nie zostało już zastąpione nowszym).
+
+        Returns:
+            bool: True, jeśli dysk nie ma już żadnego połączenia
+        """
+        with self._clients_lock:
+            self._send_locks.pop(connection, None)
+            connections = self.clients.get(disk_id, {})
+            if connections.get(slot) is connection:
+                del connections[slot]
+            return not connections
+
+    def _connection_for(self, disk_id: int, exclude=None):
+        """
+        Wybiera kolejne (round-robin) połączenie dysku, pomijając `exclude`.
+        """
+        with self._clients_lock:
+            connections = [c for c in self.clients.get(disk_id, {}).values() if c is not exclude]
+        if not connections:
+            return None
+        return connections[next(self._round_robin) % len(connections)]
+
     def _accept_connections(self):
         """
-        Akceptuje połączenia od klientów (dysków) i rejestruje je.
+        Akceptuje połączenia od klientów (dysków); rejestracja następuje po wiadomości 'hello'.
         """
         while self.running:
             try:
                 client, _ = self.socket.accept()
-                disk_id = len(self.clients)
-                self.clients[disk_id] = client
-                threading.Thread(target=self._handle_client, args=(client, disk_id), daemon=True).start()
-                print(f"Disk {disk_id} connected.")
+                threading.Thread(target=self._handle_client, args=(client,), daemon=True).start()
             except Exception as e:
-                print(f"Error accepting connection: {e}")
+                if self.running:
+                    print(f"Error accepting connection: {e}")
 
-    def _handle_client(self, client: socket.socket, disk_id: int):
+    def _handle_client(self, client: socket.socket):
         """
-        Obsługuje komunikację z pojedynczym dyskiem.
+        Obsługuje jedno połączenie dysku.
 
         Args:
             client: Obiekt socket reprezentujący połączenie z dyskiem.
-            disk_id: Identyfikator dysku.
         """
+        reader = MessageReader(client)
+        try:
+            hello = reader.read_message()
+            if hello is None or hello.operation != 'hello':
+                raise ProtocolError("Expected 'hello' as the first message")
+        except Exception as e:
+            print(f"Error during handshake: {e}")
+            client.close()
+            return
+        disk_id, slot = hello.disk_id, hello.sector or 0
+        previous = self._register(disk_id, slot, client)
+        if previous is not None:
+            # shutdown budzi wątek poprzedniego połączenia zablokowany na odczycie
+            try:
+                previous.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        print(f"Disk {disk_id} connected (connection {slot}).")
+
         while self.running:
             try:
-                data = client.recv(1024)
-                if not data:
+                message = reader.read_message()
+                if message is None:
                     break
-                message = DiskMessage(**json.loads(data.decode()))
-                self.handle_message(message)
+                self._dispatch(message, client)
             except Exception as e:
                 print(f"Error handling client {disk_id}: {e}")
                 break
         client.close()
-        del self.clients[disk_id]
-        print(f"Disk {disk_id} disconnected.")
+        if self._unregister(disk_id, slot, client):
+            print(f"Disk {disk_id} disconnected.")
+        self._recover_pending(client)
+
+    def _start_async_server(self):
+        """
+        Uruchamia serwer asyncio w pętli zdarzeń działającej w osobnym wątku.
+        """
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        errors = []
+
+        def run_loop():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._serve_async, self.host, self.port, backlog=1024))
+            except Exception as e:
+                errors.append(e)
+                return
+            finally:
+                started.set()
+            self._loop.run_forever()
+
+        self._loop_thread = threading.Thread(target=run_loop, name="network-loop", daemon=True)
+        self._loop_thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        print(f"Server started on {self.host}:{self.port} (asyncio)")
+
+    async def _serve_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Obsługuje jedno połączenie dysku w trybie asyncio.
+        """
+        disk_id = slot = None
+        try:
+            hello = await read_message_async(reader)
+            if hello is None or hello.operation != 'hello':
+                raise ProtocolError("Expected 'hello' as the first message")
+            disk_id, slot = hello.disk_id, hello.sector or 0
+            previous = self._register(disk_id, slot, writer)
+            if previous is not None:
+                previous.close()
+            print(f"Disk {disk_id} connected (connection {slot}).")
+
+            while self.running:
+                message = await read_message_async(reader)
+                if message is None:
+                    break
+                self._dispatch(message, writer)
+        except Exception as e:
+            print(f"Error handling client {disk_id}: {e}")
+        finally:
+            writer.close()
+            if disk_id is not None:
+                if self._unregister(disk_id, slot, writer):
+                    print(f"Disk {disk_id} disconnected.")
+                self._recover_pending(writer)
 
     def handle_message(self, message: DiskMessage):
         """
-        Obsługuje odebrane wiadomości od dysków.
+        Obsługuje odebrane wiadomości od dysków, które nie są odpowiedzią na żądanie.
 
         Args:
             message: Wiadomość odebrana od dysku.
@@ -83,32 +253,183 @@ class NetworkProtocol:
         print(f"Received message: {message}")
         # Tutaj należy zaimplementować logikę obsługi wiadomości
 
-    def send_message(self, disk_id: int, message: DiskMessage) -> bool:
+    def _dispatch(self, message: DiskMessage, connection):
+        """
+        Kończy Future żądania, którego identyfikator powtarza odpowiedź, i zwalnia
+        miejsce w oknie dysku. Na 'ping' (kontrola stanu połączenia) odpowiada 'pong'.
+        Odpowiedzi na żądania już zakończone (np. po ponownym wysłaniu) są pomijane.
+        """
+        if message.operation == 'ping':
+            self._transmit(connection, DiskMessage('pong', message.disk_id, request_id=message.request_id))
+            return
+        if not message.request_id:
+            self.handle_message(message)
+            return
+        with self._pending_lock:
+            request = self._pending.pop(message.request_id, None)
+        if request is None:
+            return
+        self._windows[request.disk_id].release()
+        if message.operation == 'error':
+            request.future.set_exception(IOError(f"Disk {request.disk_id}: {message.data}"))
+        else:
+            request.future.set_result(message)
+
+    def _recover_pending(self, connection):
+        """
+        Żądania oczekujące na zamkniętym połączeniu wysyła ponownie innym połączeniem
+        tego samego dysku, a gdy to niemożliwe - kończy błędem.
+        """
+        with self._pending_lock:
+            requests = [(request_id, request) for request_id, request in self._pending.items()
+                        if request.connection is connection]
+        for request_id, request in requests:
+            self._replay(request_id, request, connection)
+
+    def _replay(self, request_id: int, request: _PendingRequest, failed_connection):
+        while True:
+            replacement = None
+            if request.replays < self.max_replays:
+                replacement = self._connection_for(request.disk_id, exclude=failed_connection)
+            with self._pending_lock:
+                if self._pending.get(request_id) is not request:
+                    return
+                if replacement is None:
+                    del self._pending[request_id]
+                else:
+                    request.connection = replacement
+                    request.replays += 1
+            if replacement is None:
+                self._windows[request.disk_id].release()
+                request.future.set_exception(ConnectionError(f"Disk {request.disk_id} disconnected"))
+                return
+            try:
+                self._transmit(replacement, request.message)
+                return
+            except Exception as e:
+                print(f"Error resending message to Disk {request.disk_id}: {e}")
+                failed_connection = replacement
+
+    def _transmit(self, connection, message: DiskMessage):
+        """
+        Wysyła wiadomość wybranym połączeniem.
+
+        Raises:
+            OSError: Gdy wysłanie się nie powiodło
+        """
+        if self.mode == 'thread':
+            with self._clients_lock:
+                send_lock = self._send_locks.get(connection)
+            if send_lock is None:
+                raise ConnectionError("Connection closed")
+            with send_lock:
+                send_message(connection, message)
+        elif threading.current_thread() is self._loop_thread:
+            # Wewnątrz pętli zdarzeń nie można czekać na jej własne zadania - ramka
+            # trafia od razu do bufora strumienia
+            if connection.is_closing():
+                raise ConnectionError("Connection closed")
+            connection.writelines(encode_frame(message))
+        else:
+            asyncio.run_coroutine_threadsafe(self._send_async(connection, message), self._loop).result()
+
+    def _window(self, disk_id: int) -> threading.BoundedSemaphore:
+        with self._pending_lock:
+            window = self._windows.get(disk_id)
+            if window is None:
+                window = self._windows[disk_id] = threading.BoundedSemaphore(self.max_outstanding)
+            return window
+
+    def send_message(self, disk_id: int, message: DiskMessage, timeout: Optional[float] = None) -> Future:
         """
-        Wysyła wiadomość do określonego dysku.
+        Wysyła żądanie do określonego dysku bez czekania na odpowiedź. Gdy dysk ma już
+        max_outstanding oczekujących żądań, wywołanie blokuje się do nadejścia odpowiedzi
+        (w trybie asyncio nie wolno go więc wywoływać z wątku pętli zdarzeń).
+
+        Żądanie, na którego odpowiedź wywołujący przestał czekać, należy anulować przez
+        cancel(), aby zwolnić jego miejsce w oknie dysku.
 
         Args:
             disk_id: Identyfikator docelowego dysku.
-            message: Obiekt wiadomości do wysłania.
+            message: Obiekt wiadomości do wysłania; otrzymuje nowy request_id.
+            timeout: Maksymalny czas oczekiwania na miejsce w oknie dysku (None - bez limitu).
 
         Returns:
-            bool: True, jeśli wiadomość została pomyślnie wysłana, False w przeciwnym razie.
+            Future: Kończy się odpowiedzią dysku (DiskMessage), a wyjątkiem, gdy dysk
+                zgłosi błąd, nie jest połączony, okno nie zwolniło się w czasie `timeout`
+                lub wszystkie próby wysłania zawiodły.
         """
-        if disk_id in self.clients:
-            try:
-                self.clients[disk_id].send(json.dumps(asdict(message)).encode())
-                print(f"Message sent to Disk {disk_id}: {message}")
-                return True
-            except Exception as e:
-                print(f"Error sending message to Disk {disk_id}: {e}")
-        return False
+        future = Future()
+        window = self._window(disk_id)
+        if not window.acquire(timeout=timeout):
+            future.set_exception(TimeoutError(f"Disk {disk_id}: too many outstanding requests"))
+            return future
+        message.request_id = next(self._request_ids)
+
+        connection = self._connection_for(disk_id)
+        if connection is None:
+            window.release()
+            future.set_exception(ConnectionError(f"Disk {disk_id} is not connected"))
+            return future
+
+        request = _PendingRequest(disk_id, connection, future, message)
+        with self._pending_lock:
+            self._pending[message.request_id] = request
+        try:
+            self._transmit(connection, message)
+        except Exception as e:
+            print(f"Error sending message to Disk {disk_id}: {e}")
+            self._replay(message.request_id, request, connection)
+        return future
+
+    def cancel(self, request_id: int) -> bool:
+        """
+        Anuluje oczekujące żądanie (np. po upływie limitu czasu): usuwa je z oczekujących,
+        zwalnia miejsce w oknie dysku i kończy jego Future wyjątkiem TimeoutError.
+        Późniejsza odpowiedź dysku na to żądanie jest pomijana.
+
+        Args:
+            request_id: Identyfikator żądania (message.request_id po send_message).
+
+        Returns:
+            bool: True, jeśli żądanie jeszcze oczekiwało na odpowiedź
+        """
+        with self._pending_lock:
+            request = self._pending.pop(request_id, None)
+        if request is None:
+            return False
+        self._windows[request.disk_id].release()
+        if not request.future.done():
+            request.future.set_exception(TimeoutError(f"Disk {request.disk_id}: request {request_id} cancelled"))
+        return True
+
+    async def _send_async(self, writer: asyncio.StreamWriter, message: DiskMessage):
+        # Zamykane połączenie mogło już przekazać swoje żądania dalej - wysłanie musi się nie udać
+        if writer.is_closing():
+            raise ConnectionError("Connection closed")
+        writer.writelines(encode_frame(message))
+        await writer.drain()
 
     def stop(self):
         """
         Zatrzymuje serwer i zamyka wszystkie połączenia.
         """
         self.running = False
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._stop_async(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
         self.socket.close()
-        for client in self.clients.values():
-            client.close()
-        print("Server stopped.")
\ No newline at end of file
+        if self.mode == 'thread':
+            with self._clients_lock:
+                connections = [c for slots in self.clients.values() for c in slots.values()]
+            for client in connections:
+                client.close()
+        print("Server stopped.")
+
+    async def _stop_async(self):
+        if self._server is not None:
+            self._server.close()
+        with self._clients_lock:
+            writers = [w for slots in self.clients.values() for w in slots.values()]
+        for writer in writers:
+            writer.close()
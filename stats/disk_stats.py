@@ -1,27 +1,68 @@
+import threading
 import time
-from typing import List, Tuple
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from stats.histogram import HistogramRecorder, LatencyHistogram
+from stats.rate_counter import RateCounter
+from stats.ring_buffer import RingBuffer
+
+# Okna (w sekundach), dla których raportowane są szybkości
+RATE_WINDOWS = (1, 10, 60)
 
 class DiskStats:
-    def __init__(self):
+    def __init__(self, history_size: int = 1024, snapshot_interval: float = 10.0, snapshot_count: int = 60):
         """
         Inicjalizuje obiekt statystyk dla dysku, przechowujący dane dotyczące operacji I/O,
         błędów, opóźnień oraz przepustowości.
+
+        Historie opóźnień, przepustowości i błędów mają stałą pojemność (najstarsze wpisy
+        są nadpisywane), a średnie liczone są z sum aktualizowanych przy każdej operacji.
+
+        Rozkład opóźnień (percentyle) zbierany jest w histogramach osobno dla każdego
+        typu operacji, z migawkami co `snapshot_interval` sekund. Bieżąca przepustowość,
+        IOPS i częstość błędów liczone są z liczników z koszykami sekundowymi (okna 1/10/60 s).
+
+        Metody rejestrujące mogą być wywoływane równolegle z wielu wątków (np. z puli I/O
+        kontrolera) - liczniki aktualizowane są pod blokadą.
+
+        Args:
+            history_size: Liczba ostatnich próbek przechowywanych w każdej historii.
+            snapshot_interval: Długość przedziału migawki histogramu opóźnień (sekundy).
+            snapshot_count: Liczba przechowywanych migawek na typ operacji.
         """
+        self.history_size = history_size
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_count = snapshot_count
+        self._lock = threading.Lock()
         self.reset()
 
     def reset(self):
         """
         Resetuje wszystkie statystyki dysku do wartości początkowych.
         """
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
         self.reads = 0
         self.writes = 0
         self.errors = 0
-        self.latency_history: List[float] = []
-        self.error_history: List[Tuple[str, float]] = []
-        self.throughput_history: List[float] = []
+        self.latency_history = RingBuffer(self.history_size)
+        self.error_history: Deque[Tuple[str, float]] = deque(maxlen=self.history_size)
+        self.error_counts: Dict[str, int] = {}
+        self.throughput_history = RingBuffer(self.history_size)
+        self.latency_recorders: Dict[str, HistogramRecorder] = {}
+        self.rates: Dict[str, RateCounter] = {name: RateCounter(max(RATE_WINDOWS))
+                                              for name in ('bytes', 'reads', 'writes', 'errors')}
+        self.timings: Dict[str, LatencyHistogram] = {}
+        self.events: Dict[str, int] = {}
         self.current_load = 0
         self.total_bytes_read = 0
         self.total_bytes_written = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
         self.start_time = time.time()
 
     def add_operation(self, op_type: str, size: int, latency: float):
@@ -33,15 +74,48 @@ class DiskStats:
             size: Rozmiar danych operacji w bajtach.
             latency: Opóźnienie operacji w sekundach.
         """
+        now = time.time()
+        self.add_operations(op_type, 1, size, now)
+        self.add_latency(op_type, latency, 1, now)
+
+    def add_operations(self, op_type: str, count: int, size: int, now: Optional[float] = None):
+        """
+        Rejestruje partię operacji jednego typu bez ich opóźnień (zliczanych osobno
+        przez add_latency, np. tylko dla próbki operacji).
+
+        Args:
+            op_type: Typ operacji ('read' lub 'write').
+            count: Liczba operacji.
+            size: Łączny rozmiar danych operacji w bajtach.
+            now: Bieżący czas (time.time()), jeśli wywołujący już go zna.
+        """
+        if now is None:
+            now = time.time()
         if op_type == 'read':
-            self.reads += 1
-            self.total_bytes_read += size
+            with self._lock:
+                self.reads += count
+                self.total_bytes_read += size
+            self.rates['reads'].add(count, now)
         elif op_type == 'write':
-            self.writes += 1
-            self.total_bytes_written += size
+            with self._lock:
+                self.writes += count
+                self.total_bytes_written += size
+            self.rates['writes'].add(count, now)
+        if size:
+            self.rates['bytes'].add(size, now)
 
+    def add_latency(self, op_type: str, latency: float, count: int = 1, now: Optional[float] = None):
+        """
+        Rejestruje opóźnienie operacji.
+
+        Args:
+            op_type: Typ operacji.
+            latency: Opóźnienie w sekundach.
+            count: Liczba operacji, które reprezentuje próbka (waga w histogramie).
+            now: Bieżący czas (time.time()), jeśli wywołujący już go zna.
+        """
         self.latency_history.append(latency)
-        self.update_throughput()
+        self._recorder(op_type).record(latency, now, count)
 
     def add_error(self, error_type: str, timestamp: float):
         """
@@ -51,29 +125,148 @@ class DiskStats:
             error_type: Typ błędu (np. 'disk_failure').
             timestamp: Czas wystąpienia błędu.
         """
-        self.errors += 1
-        self.error_history.append((error_type, timestamp))
+        with self._lock:
+            self.errors += 1
+            self.error_history.append((error_type, timestamp))
+            self.error_counts[error_type] = self.error_counts.get(error_type, 0) + 1
+        self.rates['errors'].add(1, timestamp)
+
+    def add_timing(self, name: str, seconds: float, count: int = 1):
+        """
+        Rejestruje czas etapu operacji (np. oczekiwania na blokadę lub liczenia parzystości).
+        Czasy etapów nie wchodzą do opóźnień operacji.
+
+        Args:
+            name: Nazwa etapu (np. 'lock_wait', 'parity').
+            seconds: Czas trwania etapu w sekundach.
+            count: Liczba wystąpień etapu, które reprezentuje próbka.
+        """
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings.setdefault(name, LatencyHistogram())
+        histogram.record(seconds, count)
+
+    def add_event(self, name: str, count: int = 1):
+        """
+        Zwiększa licznik zdarzenia (np. odtworzenia danych z parzystości).
+
+        Args:
+            name: Nazwa zdarzenia (np. 'reconstructions').
+            count: Liczba zdarzeń.
+        """
+        with self._lock:
+            self.events[name] = self.events.get(name, 0) + count
+
+    def add_cache_access(self, hit: bool):
+        """
+        Rejestruje odwołanie do pamięci podręcznej odczytu.
+
+        Args:
+            hit: True dla trafienia, False dla chybienia.
+        """
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def add_cache_eviction(self, count: int = 1):
+        """
+        Rejestruje usunięcie wpisów z pamięci podręcznej odczytu.
+
+        Args:
+            count: Liczba usuniętych wpisów.
+        """
+        with self._lock:
+            self.cache_evictions += count
 
     def update_throughput(self):
         """
-        Aktualizuje przepustowość na podstawie całkowitej ilości danych odczytanych i zapisanych
-        od początku działania dysku.
+        Dopisuje bieżącą przepustowość do historii (wywoływane okresowo, np. przez GUI,
+        a nie przy każdej operacji).
         """
-        elapsed = time.time() - self.start_time
-        if elapsed > 0:
-            current_throughput = (self.total_bytes_read + self.total_bytes_written) / elapsed / (1024 * 1024)
-            self.throughput_history.append(current_throughput)
+        self.throughput_history.append(self.get_throughput())
 
     def get_average_latency(self) -> float:
         """
         Oblicza średnie opóźnienie dla operacji dysku.
 
+        Returns:
+            Średnie opóźnienie w sekundach (ze wszystkich operacji, w O(1)).
+        """
+        return self.latency_history.lifetime_mean()
+
+    def get_recent_latency(self) -> float:
+        """
+        Oblicza średnie opóźnienie ostatnich operacji (mieszczących się w historii).
+
         Returns:
             Średnie opóźnienie w sekundach.
         """
-        return sum(self.latency_history) / len(self.latency_history) if self.latency_history else 0.0
+        return self.latency_history.mean()
 
-    def get_error_rate(self) -> float:
+    def _copy(self, counters: Dict[str, int]) -> Dict[str, int]:
+        with self._lock:
+            return dict(counters)
+
+    def _recorder(self, op_type: str) -> HistogramRecorder:
+        recorder = self.latency_recorders.get(op_type)
+        if recorder is None:
+            recorder = self.latency_recorders.setdefault(
+                op_type, HistogramRecorder(self.snapshot_interval, self.snapshot_count))
+        return recorder
+
+    def get_latency_histogram(self, op_type: Optional[str] = None) -> LatencyHistogram:
+        """
+        Zwraca histogram opóźnień od początku pracy dysku.
+
+        Args:
+            op_type: Typ operacji ('read', 'write', ...); None łączy wszystkie typy.
+
+        Returns:
+            Nowy histogram (można go łączyć z histogramami innych dysków przez merge).
+        """
+        recorders = self.latency_recorders.values() if op_type is None else \
+            [self.latency_recorders[op_type]] if op_type in self.latency_recorders else []
+        return LatencyHistogram.merged(recorder.total for recorder in list(recorders))
+
+    def get_latency_percentiles(self, op_type: Optional[str] = None) -> Dict[str, float]:
+        """
+        Zwraca percentyle opóźnień p50/p90/p99/p999 w sekundach.
+
+        Args:
+            op_type: Typ operacji; None łączy wszystkie typy.
+        """
+        return self.get_latency_histogram(op_type).percentiles()
+
+    def get_latency_snapshots(self, op_type: str) -> List[Tuple[float, LatencyHistogram]]:
+        """
+        Zwraca migawki histogramu opóźnień danego typu operacji: (początek przedziału, histogram).
+        """
+        recorder = self.latency_recorders.get(op_type)
+        return recorder.snapshot_list() if recorder is not None else []
+
+    def get_timings(self) -> Dict[str, dict]:
+        """
+        Zwraca dla każdego etapu liczbę pomiarów, łączny czas, średnią, minimum, maksimum
+        i percentyle (w sekundach).
+        """
+        return {name: dict(histogram.summary(), total=histogram.total)
+                for name, histogram in list(self.timings.items())}
+
+    def get_error_rate(self, window: int = 10) -> float:
+        """
+        Oblicza częstość błędów w ostatnim oknie czasowym.
+
+        Args:
+            window: Długość okna w sekundach (1, 10 lub 60).
+
+        Returns:
+            Liczba błędów na sekundę.
+        """
+        return self.rates['errors'].rate(window)
+
+    def get_error_ratio(self) -> float:
         """
         Oblicza wskaźnik błędów w stosunku do wszystkich operacji.
 
@@ -83,14 +276,45 @@ class DiskStats:
         total_ops = self.reads + self.writes
         return self.errors / total_ops if total_ops > 0 else 0.0
 
-    def get_throughput(self) -> float:
+    def get_iops(self, window: int = 1) -> float:
+        """
+        Oblicza liczbę operacji (odczytów i zapisów) na sekundę w ostatnim oknie czasowym.
+
+        Args:
+            window: Długość okna w sekundach (1, 10 lub 60).
+        """
+        now = time.time()
+        return self.rates['reads'].rate(window, now) + self.rates['writes'].rate(window, now)
+
+    def get_rates(self) -> Dict[str, Dict[str, float]]:
         """
-        Pobiera ostatnio zarejestrowaną przepustowość.
+        Zwraca szybkości dla okien 1 s, 10 s i 60 s: bajty, odczyty, zapisy i błędy na sekundę.
+        """
+        now = time.time()
+        return {f'{window}s': {name: counter.rate(window, now) for name, counter in self.rates.items()}
+                for window in RATE_WINDOWS}
+
+    def get_cache_hit_rate(self) -> float:
+        """
+        Oblicza współczynnik trafień pamięci podręcznej odczytu.
+
+        Returns:
+            Współczynnik trafień jako wartość dziesiętna (np. 0.9 dla 90%).
+        """
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total > 0 else 0.0
+
+    def get_throughput(self, window: int = 1) -> float:
+        """
+        Oblicza przepustowość w ostatnim oknie czasowym.
+
+        Args:
+            window: Długość okna w sekundach (1, 10 lub 60).
 
         Returns:
             Przepustowość w MB/s.
         """
-        return self.throughput_history[-1] if self.throughput_history else 0.0
+        return self.rates['bytes'].rate(window) / (1024 * 1024)
 
     def get_stats(self) -> dict:
         """
@@ -103,9 +327,22 @@ class DiskStats:
             'reads': self.reads,
             'writes': self.writes,
             'errors': self.errors,
+            'error_counts': self._copy(self.error_counts),
             'average_latency': self.get_average_latency(),
+            'recent_latency': self.get_recent_latency(),
+            'latency_percentiles': {op_type: recorder.total.percentiles()
+                                    for op_type, recorder in list(self.latency_recorders.items())},
             'error_rate': self.get_error_rate(),
+            'error_ratio': self.get_error_ratio(),
             'throughput': self.get_throughput(),
+            'iops': self.get_iops(),
+            'rates': self.get_rates(),
+            'timings': self.get_timings(),
+            'events': self._copy(self.events),
             'total_bytes_read': self.total_bytes_read,
-            'total_bytes_written': self.total_bytes_written
+            'total_bytes_written': self.total_bytes_written,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_evictions': self.cache_evictions,
+            'cache_hit_rate': self.get_cache_hit_rate()
         }
\ No newline at end of file
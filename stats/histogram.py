@@ -0,0 +1,226 @@
+import math
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Percentyle raportowane domyślnie (klucz w wyniku -> percentyl)
+DEFAULT_PERCENTILES: Dict[str, float] = {'p50': 50.0, 'p90': 90.0, 'p99': 99.0, 'p999': 99.9}
+
+
+class LatencyHistogram:
+    """
+    Histogram opóźnień o koszykach logarytmiczno-liniowych (w stylu HdrHistogram).
+
+    Opóźnienie w nanosekundach rozkładane jest na wykładnik i mantysę (math.frexp):
+    każdy przedział [2^k, 2^(k+1)) dzielony jest na SUB_BUCKETS równych koszyków, więc
+    błąd względny nie przekracza 1/SUB_BUCKETS niezależnie od wielkości opóźnienia.
+    Liczba koszyków jest stała, dlatego zapis jest O(1), zapytanie o percentyl nie
+    zależy od liczby próbek, a histogramy różnych dysków łączy się przez dodanie liczników.
+    """
+
+    SUB_BUCKETS = 64
+    MAX_EXPONENT = 48  # 2^48 ns to ok. 78 godzin - dłuższe opóźnienia trafiają do ostatniego koszyka
+
+    def __init__(self):
+        self._counts = array('q', bytes(8 * self.SUB_BUCKETS * self.MAX_EXPONENT))
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _bucket(cls, latency: float) -> int:
+        nanoseconds = latency * 1e9
+        if nanoseconds < 1.0:
+            return 0
+        mantissa, exponent = math.frexp(nanoseconds)
+        if exponent > cls.MAX_EXPONENT:
+            return cls.SUB_BUCKETS * cls.MAX_EXPONENT - 1
+        return (exponent - 1) * cls.SUB_BUCKETS + int((mantissa - 0.5) * 2 * cls.SUB_BUCKETS)
+
+    @classmethod
+    def _bucket_values(cls) -> np.ndarray:
+        """
+        Reprezentatywne wartości (środki) wszystkich koszyków w sekundach.
+        """
+        index = np.arange(cls.SUB_BUCKETS * cls.MAX_EXPONENT)
+        exponent, sub = np.divmod(index, cls.SUB_BUCKETS)
+        return np.ldexp(0.5 + (sub + 0.5) / (2 * cls.SUB_BUCKETS), exponent + 1) / 1e9
+
+    def record(self, latency: float, count: int = 1):
+        """
+        Rejestruje opóźnienie (w sekundach).
+        """
+        bucket = self._bucket(latency)
+        with self._lock:
+            self._counts[bucket] += count
+            self.count += count
+            self.total += latency * count
+            if latency < self.min:
+                self.min = latency
+            if latency > self.max:
+                self.max = latency
+
+    def counts(self) -> np.ndarray:
+        """
+        Zwraca kopię liczników koszyków.
+        """
+        with self._lock:
+            return np.frombuffer(self._counts, dtype=np.int64).copy()
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """
+        Dodaje liczniki innego histogramu do bieżącego.
+
+        Returns:
+            LatencyHistogram: Bieżący histogram
+        """
+        counts = other.counts()
+        with self._lock:
+            np.frombuffer(self._counts, dtype=np.int64)[:] += counts
+            self.count += other.count
+            self.total += other.total
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        return self
+
+    @classmethod
+    def merged(cls, histograms: Iterable['LatencyHistogram']) -> 'LatencyHistogram':
+        """
+        Tworzy nowy histogram będący sumą podanych (np. wszystkich dysków macierzy).
+        """
+        result = cls()
+        for histogram in histograms:
+            result.merge(histogram)
+        return result
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Zwraca opóźnienie (w sekundach), poniżej którego mieści się podany procent próbek.
+
+        Args:
+            percentile: Percentyl z przedziału [0, 100]
+        """
+        return self.percentiles({'p': percentile})['p']
+
+    def percentiles(self, percentiles: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        Zwraca kilka percentyli naraz (jedna suma skumulowana liczników).
+
+        Args:
+            percentiles: Słownik nazwa -> percentyl; domyślnie p50, p90, p99 i p999
+
+        Returns:
+            Dict[str, float]: Opóźnienia w sekundach (0.0 dla pustego histogramu)
+        """
+        percentiles = percentiles or DEFAULT_PERCENTILES
+        counts = self.counts()
+        total = int(counts.sum())
+        if not total:
+            return {name: 0.0 for name in percentiles}
+        cumulative = np.cumsum(counts)
+        values = _BUCKET_VALUES
+        result = {}
+        for name, percentile in percentiles.items():
+            rank = max(1, math.ceil(percentile / 100.0 * total))
+            value = float(values[np.searchsorted(cumulative, rank)])
+            # Środek koszyka może wykraczać poza faktycznie zarejestrowany zakres
+            result[name] = min(max(value, self.min), self.max)
+        return result
+
+    def summary(self) -> dict:
+        """
+        Zwraca liczbę próbek, średnią, minimum, maksimum oraz domyślne percentyle.
+        """
+        summary = {'count': self.count, 'mean': self.mean(),
+                   'min': self.min if self.count else 0.0, 'max': self.max}
+        summary.update(self.percentiles())
+        return summary
+
+
+_BUCKET_VALUES = LatencyHistogram._bucket_values()
+
+
+class HistogramRecorder:
+    """
+    Rejestrator opóźnień z migawkami w stałych odstępach czasu.
+
+    Próbki trafiają tylko do histogramu bieżącego przedziału; po upływie `interval`
+    sekund jest on zapisywany jako migawka (przechowywanych jest `keep` ostatnich),
+    dodawany do sumy zamkniętych przedziałów i zaczynany jest nowy. Histogram
+    całkowity to suma zamkniętych przedziałów i bieżącego.
+    """
+
+    def __init__(self, interval: float = 10.0, keep: int = 60):
+        """
+        Args:
+            interval: Długość przedziału migawki w sekundach
+            keep: Liczba przechowywanych migawek
+        """
+        self.interval = interval
+        self._closed = LatencyHistogram()
+        self.snapshots: Deque[Tuple[float, LatencyHistogram]] = deque(maxlen=keep)
+        self._current = LatencyHistogram()
+        self._interval_start = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, now: Optional[float] = None, count: int = 1):
+        """
+        Rejestruje opóźnienie (w sekundach).
+
+        Args:
+            now: Bieżący czas (time.time()), jeśli wywołujący już go zna
+            count: Liczba operacji, które reprezentuje próbka
+        """
+        if now is None:
+            now = time.time()
+        # Sprawdzenie przedziału i zapis pod jedną blokadą - inaczej próbka mogłaby trafić
+        # do przedziału, który inny wątek właśnie zamknął (i zniknąć z histogramu całkowitego)
+        with self._lock:
+            if now - self._interval_start >= self.interval:
+                self._rotate(now)
+            self._current.record(latency, count)
+
+    @property
+    def total(self) -> LatencyHistogram:
+        """
+        Histogram wszystkich próbek (nowy obiekt).
+        """
+        with self._lock:
+            return LatencyHistogram.merged((self._closed, self._current))
+
+    def rotate(self, now: Optional[float] = None):
+        """
+        Kończy bieżący przedział, zapisując go jako migawkę (wywoływane również ręcznie).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._rotate(now)
+
+    def _rotate(self, now: float):
+        if self._current.count:
+            self.snapshots.append((self._interval_start, self._current))
+            self._closed.merge(self._current)
+        self._current = LatencyHistogram()
+        self._interval_start = now
+
+    def current(self) -> LatencyHistogram:
+        """
+        Histogram trwającego przedziału.
+        """
+        return self._current
+
+    def snapshot_list(self) -> List[Tuple[float, LatencyHistogram]]:
+        """
+        Zwraca migawki (czas rozpoczęcia przedziału, histogram) od najstarszej.
+        """
+        with self._lock:
+            return list(self.snapshots)
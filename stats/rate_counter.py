@@ -0,0 +1,68 @@
+import threading
+import time
+from array import array
+from typing import Optional
+
+
+class RateCounter:
+    """
+    Licznik zdarzeń w przesuwnym oknie czasowym z koszykami sekundowymi.
+
+    Każdy koszyk sumuje wartości z jednej sekundy i pamięta, której sekundy dotyczy,
+    więc nieaktualne koszyki są zerowane leniwie przy ponownym użyciu. Dodanie jest
+    O(1), a szybkość liczona jest z co najwyżej `window` koszyków.
+    """
+
+    def __init__(self, window: int = 60):
+        """
+        Args:
+            window: Najdłuższe okno, dla którego można pytać o szybkość (sekundy)
+        """
+        self.window = window
+        # Dodatkowy koszyk na trwającą sekundę, która nie wchodzi do okna
+        size = window + 1
+        self._values = array('d', bytes(8 * size))
+        self._seconds = array('q', [-1]) * size
+        self._start = int(time.time())
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, amount: float = 1.0, now: Optional[float] = None):
+        """
+        Dodaje wartość do koszyka bieżącej sekundy.
+
+        Args:
+            amount: Dodawana wartość (np. liczba bajtów lub 1 dla zdarzenia)
+            now: Bieżący czas (time.time()), jeśli wywołujący już go zna
+        """
+        second = int(time.time() if now is None else now)
+        slot = second % len(self._values)
+        with self._lock:
+            if self._seconds[slot] != second:
+                self._seconds[slot] = second
+                self._values[slot] = 0.0
+            self._values[slot] += amount
+            self.total += amount
+
+    def rate(self, period: int = 1, now: Optional[float] = None) -> float:
+        """
+        Średnia szybkość (na sekundę) z ostatnich `period` pełnych sekund; trwająca
+        sekunda jest pomijana, aby niepełny koszyk nie zaniżał wyniku.
+
+        Args:
+            period: Długość okna w sekundach (najwyżej `window`)
+            now: Bieżący czas (time.time())
+        """
+        if not 0 < period <= self.window:
+            raise ValueError(f"Rate period must be between 1 and {self.window} seconds")
+        current = int(time.time() if now is None else now)
+        # Tuż po utworzeniu licznika okno obejmuje tylko sekundy, które już minęły
+        span = min(period, max(1, current - self._start))
+        size = len(self._values)
+        total = 0.0
+        with self._lock:
+            for second in range(current - span, current):
+                slot = second % size
+                if self._seconds[slot] == second:
+                    total += self._values[slot]
+        return total / span
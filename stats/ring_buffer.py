@@ -0,0 +1,85 @@
+import threading
+from array import array
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Bufor cykliczny o stałej pojemności na próbki liczbowe. Próbki trzymane są
+    w tablicy array('d') (szybki dostęp do pojedynczych elementów), a NumPy
+    używany jest tylko do operacji na całym buforze.
+
+    Po zapełnieniu nowe próbki nadpisują najstarsze, więc pamięć nie rośnie. Suma
+    próbek w buforze oraz suma i liczba wszystkich kiedykolwiek dodanych próbek są
+    aktualizowane przy każdym dodaniu, dzięki czemu średnie odczytywane są w O(1).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity: Maksymalna liczba przechowywanych próbek
+        """
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive")
+        self.capacity = capacity
+        self._values = array('d', bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+        self._window_sum = 0.0
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def append(self, value: float):
+        """
+        Dodaje próbkę (O(1)), nadpisując najstarszą, gdy bufor jest pełny.
+        """
+        with self._lock:
+            if self._size == self.capacity:
+                self._window_sum -= self._values[self._next]
+            else:
+                self._size += 1
+            self._values[self._next] = value
+            self._window_sum += value
+            self.total += value
+            self.count += 1
+            self._next += 1
+            if self._next == self.capacity:
+                self._next = 0
+                # Raz na pełny obieg suma okna liczona jest od nowa, aby błędy
+                # zaokrągleń odejmowania się nie kumulowały
+                self._window_sum = float(np.frombuffer(self._values).sum())
+
+    def __len__(self) -> int:
+        return self._size
+
+    def last(self, default: float = 0.0) -> float:
+        """
+        Zwraca ostatnio dodaną próbkę.
+        """
+        if not self._size:
+            return default
+        return self._values[self._next - 1]
+
+    def mean(self) -> float:
+        """
+        Średnia próbek przechowywanych w buforze (ostatnich `capacity` próbek).
+        """
+        return self._window_sum / self._size if self._size else 0.0
+
+    def lifetime_mean(self) -> float:
+        """
+        Średnia wszystkich kiedykolwiek dodanych próbek.
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def to_array(self) -> np.ndarray:
+        """
+        Zwraca kopię przechowywanych próbek w kolejności dodania (od najstarszej).
+        """
+        with self._lock:
+            values = np.frombuffer(self._values)
+            if self._size < self.capacity:
+                return values[:self._size].copy()
+            return np.concatenate((values[self._next:], values[:self._next]))